@@ -0,0 +1,54 @@
+import numpy as np
+
+from Software.Camera.frame_log import get_bitmap_stride
+
+
+class BitmapImage:
+    """
+    Stand-in for a camera image after img.to_bitmap(). It stores the pixels in the same layout as the
+    firmware (see frame_log.get_bitmap_stride()), so the BitmapPixelGetter can be used on a PC.
+    Only the methods used by the pixel getters are implemented.
+    """
+
+    def __init__(self, pixels):
+        """
+        Parameters:
+            pixels (numpy.ndarray): Boolean array with the shape (height, width).
+        """
+        self.pixels = np.asarray(pixels, dtype=bool)
+        height, width = self.pixels.shape
+        stride = get_bitmap_stride(width)
+        rows = np.zeros((height, stride * 8), dtype=bool)
+        rows[:, :width] = self.pixels
+        self.data = bytearray(np.packbits(rows, axis=1, bitorder="little").tobytes())
+
+    @classmethod
+    def from_gray(cls, gray, threshold=200):
+        """
+        Creates a bitmap from a grayscale image the same way the VirtualCamPixelGetter reads it.
+        """
+        return cls(np.asarray(gray) > threshold)
+
+    def width(self):
+        return self.pixels.shape[1]
+
+    def height(self):
+        return self.pixels.shape[0]
+
+    def bytearray(self):
+        return self.data
+
+    def get_pixel(self, x, y):
+        return int(self.pixels[y, x])
+
+
+def generate_random_bitmaps(count, sizes, seed):
+    """
+    Yields count random BitmapImages with the (width, height) of sizes in turn and different densities, including
+    empty and full ones.
+    """
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        width, height = sizes[i % len(sizes)]
+        density = (0.0, 0.002, 0.02, 0.2, 0.6, 1.0)[i % 6]
+        yield BitmapImage(rng.random((height, width)) < density)
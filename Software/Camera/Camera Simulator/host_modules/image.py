@@ -0,0 +1,254 @@
+"""
+Stand-in for the image module of the OpenMV firmware, so the camera code can be run on a PC.
+
+The pixels are kept in a numpy array: uint8 for GRAYSCALE, bool for BINARY. Only the functions used by the
+camera code are implemented. sobel(), binary() and to_bitmap() work in place like on the camera.
+Images created from frames that were already preprocessed on the camera (recorded clips, bitmap logs) have
+preprocessed=True, sobel(), binary() and invert() do not change them.
+"""
+import numpy as np
+
+# Pixel formats (also available as sensor.GRAYSCALE, ...)
+BINARY = 1
+GRAYSCALE = 2
+RGB565 = 3
+JPEG = 4
+
+BINARY_THRESHOLD = 128 # to_bitmap(): Pixels with at least this value are set
+
+
+def get_bitmap_stride(width):
+    """
+    Bytes per row of a bitmap, rows are aligned to 32 bits like on the camera.
+    """
+    return ((width + 31) // 32) * 4
+
+
+class Blob:
+    """
+    Stand-in for the blobs returned by find_blobs().
+    """
+    def __init__(self, xs, ys):
+        self.x_min, self.x_max = int(min(xs)), int(max(xs))
+        self.y_min, self.y_max = int(min(ys)), int(max(ys))
+        self.pixel_count = len(xs)
+        self.center_x = int(sum(xs)) // self.pixel_count
+        self.center_y = int(sum(ys)) // self.pixel_count
+
+    def x(self):
+        return self.x_min
+
+    def y(self):
+        return self.y_min
+
+    def w(self):
+        return self.x_max - self.x_min + 1
+
+    def h(self):
+        return self.y_max - self.y_min + 1
+
+    def cx(self):
+        return self.center_x
+
+    def cy(self):
+        return self.center_y
+
+    def pixels(self):
+        return self.pixel_count
+
+    def rect(self):
+        return self.x_min, self.y_min, self.w(), self.h()
+
+
+class Image:
+    def __init__(self, width, height, pixformat=GRAYSCALE, data=None, preprocessed=False):
+        if data is None:
+            data = np.zeros((height, width), dtype=bool if pixformat == BINARY else np.uint8)
+        self.pixels = data
+        self.pixformat = pixformat
+        self.preprocessed = preprocessed
+        self.jpeg = None # Encoded data of a JPEG image
+
+    # region Properties
+
+    def width(self):
+        return self.pixels.shape[1]
+
+    def height(self):
+        return self.pixels.shape[0]
+
+    def format(self):
+        return self.pixformat
+
+    def size(self):
+        if self.pixformat == JPEG:
+            return len(self.jpeg)
+        if self.pixformat == BINARY:
+            return get_bitmap_stride(self.width()) * self.height()
+        return self.pixels.size
+
+    def bytearray(self):
+        """
+        Returns the raw data like on the camera. The data is a copy, changes are not written back.
+        """
+        if self.pixformat == JPEG:
+            return bytearray(self.jpeg)
+        if self.pixformat == BINARY:
+            stride = get_bitmap_stride(self.width())
+            rows = np.zeros((self.height(), stride * 8), dtype=bool)
+            rows[:, :self.width()] = self.pixels
+            return bytearray(np.packbits(rows, axis=1, bitorder="little").tobytes())
+        return bytearray(self.pixels.tobytes())
+
+    def get_pixel(self, x, y):
+        if not (0 <= x < self.width() and 0 <= y < self.height()):
+            return None
+        return int(self.pixels[y, x])
+
+    # endregion
+
+    # region Copies
+
+    def copy(self):
+        image = Image(self.width(), self.height(), self.pixformat, self.pixels.copy(), self.preprocessed)
+        image.jpeg = self.jpeg
+        return image
+
+    def replace(self, image):
+        self.pixels = image.pixels.copy()
+        self.pixformat = image.pixformat
+        self.preprocessed = image.preprocessed
+        self.jpeg = image.jpeg
+        return self
+
+    def to_jpeg(self, quality=90, copy=False):
+        import cv2
+        gray = self.pixels.astype(np.uint8) * 255 if self.pixformat == BINARY else self.pixels
+        success, encoded = cv2.imencode(".jpg", gray, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+        if not success:
+            raise OSError("JPEG encoding failed")
+        image = self.copy() if copy else self
+        image.pixformat = JPEG
+        image.jpeg = encoded.tobytes()
+        return image
+
+    # endregion
+
+    # region Filters
+
+    def get_mask(self, mask):
+        if mask is None:
+            return None
+        return mask.pixels.astype(bool)
+
+    def apply(self, result, mask):
+        """
+        Writes the result of a filter, only where the mask is set (the firmware skips the other pixels).
+        """
+        mask = self.get_mask(mask)
+        if mask is None:
+            self.pixels = result
+        else:
+            self.pixels = np.where(mask, result, self.pixels)
+
+    def sobel(self, mask=None):
+        """
+        3x3 sobel magnitude (|gx| + |gy|, saturated at 255). The border pixels are 0.
+        """
+        if self.preprocessed:
+            return self
+        gray = self.pixels.astype(np.int32)
+        gx = np.zeros_like(gray)
+        gy = np.zeros_like(gray)
+        gx[1:-1, 1:-1] = (gray[:-2, 2:] + 2 * gray[1:-1, 2:] + gray[2:, 2:]) - \
+                         (gray[:-2, :-2] + 2 * gray[1:-1, :-2] + gray[2:, :-2])
+        gy[1:-1, 1:-1] = (gray[2:, :-2] + 2 * gray[2:, 1:-1] + gray[2:, 2:]) - \
+                         (gray[:-2, :-2] + 2 * gray[:-2, 1:-1] + gray[:-2, 2:])
+        self.apply(np.minimum(np.abs(gx) + np.abs(gy), 255).astype(np.uint8), mask)
+        return self
+
+    def binary(self, thresholds, invert=False, mask=None):
+        """
+        Sets the pixels within one of the thresholds [(low, high), ...] to 255 and all other pixels to 0
+        (the other way round with invert=True).
+        """
+        if self.preprocessed:
+            return self
+        inside = np.zeros(self.pixels.shape, dtype=bool)
+        for low, high in thresholds:
+            inside |= (self.pixels >= low) & (self.pixels <= high)
+        if invert:
+            inside = ~inside
+        if self.pixformat == BINARY:
+            self.apply(inside, mask)
+        else:
+            self.apply(inside.astype(np.uint8) * 255, mask)
+        return self
+
+    def invert(self):
+        if self.preprocessed:
+            return self
+        self.pixels = ~self.pixels if self.pixformat == BINARY else 255 - self.pixels
+        return self
+
+    def to_bitmap(self):
+        if self.pixformat != BINARY:
+            self.pixels = self.pixels >= BINARY_THRESHOLD
+            self.pixformat = BINARY
+        return self
+
+    # endregion
+
+    # region Drawing and blobs
+
+    def draw_rectangle(self, rect, color=255, thickness=1, fill=False):
+        x, y, w, h = rect
+        value = bool(color) if self.pixformat == BINARY else color
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(self.width(), x + w), min(self.height(), y + h)
+        if x0 >= x1 or y0 >= y1:
+            return self
+        if fill:
+            self.pixels[y0:y1, x0:x1] = value
+        else:
+            self.pixels[y0:min(y1, y0 + thickness), x0:x1] = value
+            self.pixels[max(y0, y1 - thickness):y1, x0:x1] = value
+            self.pixels[y0:y1, x0:min(x1, x0 + thickness)] = value
+            self.pixels[y0:y1, max(x0, x1 - thickness):x1] = value
+        return self
+
+    def find_blobs(self, thresholds, roi=None, x_stride=1, y_stride=1, pixels_threshold=1, area_threshold=0,
+                   merge=False, **kwargs):
+        """
+        Returns the 8-connected blobs of pixels within the thresholds inside roi. Bitmap pixels have the value 0 or 1.
+        """
+        roi_x, roi_y, roi_w, roi_h = roi if roi is not None else (0, 0, self.width(), self.height())
+        roi_x, roi_y = max(0, roi_x), max(0, roi_y)
+        region = self.pixels[roi_y:roi_y + roi_h, roi_x:roi_x + roi_w].astype(np.int32)
+        inside = np.zeros(region.shape, dtype=bool)
+        for low, high in thresholds:
+            inside |= (region >= low) & (region <= high)
+        visited = np.zeros(region.shape, dtype=bool)
+        height, width = region.shape
+        blobs = []
+        for start_y, start_x in zip(*np.nonzero(inside)):
+            if visited[start_y, start_x]:
+                continue
+            visited[start_y, start_x] = True
+            queue = [(start_y, start_x)]
+            xs, ys = [], []
+            while queue:
+                y, x = queue.pop()
+                xs.append(x + roi_x)
+                ys.append(y + roi_y)
+                for ny in range(max(0, y - 1), min(height, y + 2)):
+                    for nx in range(max(0, x - 1), min(width, x + 2)):
+                        if inside[ny, nx] and not visited[ny, nx]:
+                            visited[ny, nx] = True
+                            queue.append((ny, nx))
+            blob = Blob(xs, ys)
+            if blob.pixels() >= pixels_threshold and blob.w() * blob.h() >= area_threshold:
+                blobs.append(blob)
+        return blobs
+
+    # endregion
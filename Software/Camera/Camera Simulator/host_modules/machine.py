@@ -0,0 +1,222 @@
+"""
+Stand-in for the machine module of the OpenMV firmware, so the camera code can be run on a PC.
+
+Add this folder to sys.path before the camera code is imported. The pins keep their value in memory,
+set_value() simulates an external signal and calls the interrupt handler on the matching edge.
+PWM duties are stored with a timestamp (time.perf_counter()) in PWM.history. Timers only call their callback when
+fire() is called, unless Timer.background is True (set by host_runner.py): then every timer runs in a thread.
+SPI is a loopback: the written bytes are stored and read back by the next read.
+I2C stores the written bytes per address.
+"""
+import threading
+import time
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    PULL_NONE = 0
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 1
+    IRQ_RISING = 2
+
+    pins = {} # All created pins by their name, so a test can set the value of a pin created somewhere else
+
+    def __init__(self, pin_id, mode=IN, pull=PULL_NONE):
+        self.pin_id = pin_id
+        self.mode = mode
+        self.pull = pull
+        self.level = 0
+        self.handler = None
+        self.trigger = 0
+        existing = Pin.pins.get(pin_id)
+        if existing is not None: # The firmware keeps the state of a pin if it is created again
+            self.level = existing.level
+            self.handler = existing.handler
+            self.trigger = existing.trigger
+        Pin.pins[pin_id] = self
+
+    def value(self, level=None):
+        if level is None:
+            return self.level
+        self.set_value(level)
+
+    def high(self):
+        self.set_value(1)
+
+    def low(self):
+        self.set_value(0)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self.handler = handler
+        self.trigger = trigger
+
+    def set_value(self, level):
+        """
+        Sets the level of the pin and calls the interrupt handler if the edge matches its trigger.
+        """
+        level = 1 if level else 0
+        previous = self.level
+        self.level = level
+        if self.handler is None or level == previous:
+            return
+        if (level and self.trigger & Pin.IRQ_RISING) or (not level and self.trigger & Pin.IRQ_FALLING):
+            self.handler(self)
+
+
+class PWM:
+    def __init__(self, pin, freq=50, duty_u16=0):
+        self.pin = pin
+        self.frequency = freq
+        self.duty = duty_u16
+        self.writes = 0 # Number of duty writes, e.g. to check that only changed values are written
+        self.history = [] # (time.perf_counter(), duty) of every write
+
+    def freq(self, value=None):
+        if value is None:
+            return self.frequency
+        self.frequency = value
+
+    def duty_u16(self, value=None):
+        if value is None:
+            return self.duty
+        self.duty = value
+        self.writes += 1
+        self.history.append((time.perf_counter(), value))
+
+    def deinit(self):
+        pass
+
+
+class SPI:
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, bus, baudrate=1000000, polarity=0, phase=0, **kwargs):
+        self.bus = bus
+        self.baudrate = baudrate
+        self.written = [] # Every write as bytes, e.g. to decode the frames in a test
+        self.loopback = bytearray()
+        self.fail_next = 0 # Number of following writes that raise an OSError
+
+    def write(self, data):
+        if self.fail_next:
+            self.fail_next -= 1
+            raise OSError(5) # EIO
+        self.written.append(bytes(data))
+        self.loopback = bytearray(data)
+
+    def read(self, length, write=0x00):
+        data = bytes(self.loopback[:length])
+        return data + bytes([write]) * (length - len(data))
+
+    def readinto(self, buffer, write=0x00):
+        data = self.read(len(buffer), write)
+        buffer[:] = data
+
+    def write_readinto(self, write_buffer, read_buffer):
+        self.write(write_buffer)
+        read_buffer[:] = bytes(write_buffer)
+
+
+class I2C:
+    def __init__(self, bus, freq=400000, **kwargs):
+        self.bus = bus
+        self.frequency = freq
+        self.written = {} # Every write as bytes by the address of the slave
+        self.fail_next = 0 # Number of following writes that raise an OSError
+
+    def writeto(self, address, data, stop=True):
+        if self.fail_next:
+            self.fail_next -= 1
+            raise OSError(19) # ENODEV, the slave did not acknowledge
+        self.written.setdefault(address, []).append(bytes(data))
+        return len(data)
+
+    def readfrom(self, address, length, stop=True):
+        written = self.written.get(address)
+        data = written[-1][:length] if written else b""
+        return data + bytes(length - len(data))
+
+    def scan(self):
+        return list(self.written)
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    background = False # True: The callbacks are called by a thread with the frequency of the timer
+    timers = [] # All created timers, so they can be stopped after a run
+
+    def __init__(self, timer_id=-1, **kwargs):
+        self.callback = None
+        self.frequency = None
+        self.mode = None
+        self.generation = 0 # Incremented by init() and deinit(), a thread of an older generation stops
+        Timer.timers.append(self)
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, freq=None, period=None, mode=PERIODIC, callback=None):
+        self.frequency = freq if freq is not None else (1000 / period if period else None)
+        self.mode = mode
+        self.callback = callback
+        self.generation += 1
+        if Timer.background and callback is not None and self.frequency:
+            threading.Thread(target=self.run, args=(self.generation,), daemon=True).start()
+
+    def run(self, generation):
+        interval = 1 / self.frequency
+        next_time = time.perf_counter() + interval
+        while self.generation == generation:
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+            if self.generation != generation:
+                return
+            self.fire()
+            if self.mode == Timer.ONE_SHOT:
+                return
+            next_time += interval
+
+    def fire(self):
+        """
+        Calls the callback once, like one period of the timer elapsed. One shot timers are stopped afterwards.
+        """
+        callback = self.callback
+        if self.mode == Timer.ONE_SHOT:
+            self.callback = None
+        if callback is not None:
+            callback(self)
+
+    def deinit(self):
+        self.callback = None
+        self.generation += 1
+
+    @classmethod
+    def stop_all(cls):
+        for timer in cls.timers:
+            timer.deinit()
+
+
+class LED:
+    def __init__(self, name):
+        self.name = name
+        self.state = False
+
+    def on(self):
+        self.state = True
+
+    def off(self):
+        self.state = False
+
+    def toggle(self):
+        self.state = not self.state
+
+
+class WDT:
+    def __init__(self, timeout=5000):
+        self.timeout = timeout
+
+    def feed(self):
+        pass
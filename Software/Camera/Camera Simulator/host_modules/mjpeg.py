@@ -0,0 +1,27 @@
+"""
+Stand-in for the mjpeg module of the OpenMV firmware.
+
+The frames are appended as JPEGs to the file (a plain concatenation of JPEGs, most video players and
+stream_receiver.py style parsers can read it). Use host_runner.py, which maps /sdcard to a temporary folder.
+"""
+
+
+class Mjpeg:
+    def __init__(self, filename, width=None, height=None, quality=90):
+        self.filename = filename
+        self.quality = quality
+        self.frames = 0
+        self.file = open(filename, "wb")
+
+    def add_frame(self, image, quality=None):
+        jpeg = image.to_jpeg(quality=quality or self.quality, copy=True)
+        self.file.write(jpeg.bytearray())
+        self.frames += 1
+
+    def count(self):
+        return self.frames
+
+    def close(self, fps=None):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
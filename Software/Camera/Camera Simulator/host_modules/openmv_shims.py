@@ -0,0 +1,82 @@
+"""
+Adds the MicroPython functions of the time and gc modules to the modules of CPython.
+
+time and gc are built into CPython, a file with the same name in this folder would never be imported.
+install() adds the missing functions (ticks_ms, ticks_us, ticks_diff, sleep_ms, clock, gc.mem_free, ...)
+to the real modules instead. Existing functions are not replaced.
+"""
+import gc
+import time
+
+TICKS_PERIOD = 1 << 30 # The ticks of MicroPython wrap around at this value
+TICKS_MAX = TICKS_PERIOD - 1
+HEAP_SIZE = 256 * 1024 # gc.mem_free() returns this value, the heap of the camera is not simulated
+START = time.perf_counter()
+
+
+def ticks_ms():
+    return int((time.perf_counter() - START) * 1000) & TICKS_MAX
+
+
+def ticks_us():
+    return int((time.perf_counter() - START) * 1000000) & TICKS_MAX
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+def ticks_diff(end, start):
+    return ((end - start + TICKS_PERIOD // 2) & TICKS_MAX) - TICKS_PERIOD // 2
+
+
+def sleep_ms(ms):
+    time.sleep(ms / 1000)
+
+
+def sleep_us(us):
+    time.sleep(us / 1000000)
+
+
+class Clock:
+    """
+    Stand-in for time.clock() of the firmware.
+    """
+    def __init__(self):
+        self.last = None
+        self.frame_time = 0
+
+    def tick(self):
+        now = time.perf_counter()
+        if self.last is not None:
+            self.frame_time = now - self.last
+        self.last = now
+
+    def fps(self):
+        return 1 / self.frame_time if self.frame_time else 0.0
+
+    def avg(self):
+        return self.frame_time * 1000
+
+
+def mem_free():
+    return HEAP_SIZE
+
+
+def mem_alloc():
+    return 0
+
+
+def threshold(amount=None):
+    return -1 if amount is None else None
+
+
+def install():
+    for name, function in (("ticks_ms", ticks_ms), ("ticks_us", ticks_us), ("ticks_add", ticks_add),
+                           ("ticks_diff", ticks_diff), ("sleep_ms", sleep_ms), ("sleep_us", sleep_us),
+                           ("clock", Clock)):
+        if not hasattr(time, name):
+            setattr(time, name, function)
+    for name, function in (("mem_free", mem_free), ("mem_alloc", mem_alloc), ("threshold", threshold)):
+        if not hasattr(gc, name):
+            setattr(gc, name, function)
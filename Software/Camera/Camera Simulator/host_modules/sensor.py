@@ -0,0 +1,199 @@
+"""
+Stand-in for the sensor module of the OpenMV firmware, so the camera code can be run on a PC.
+
+snapshot() replays frames which are set with set_source(): a video file, a bitmap log of the BitmapRecorder
+(".rbm"), a folder of images or any iterable of grayscale numpy arrays. The frames are scaled to the frame
+size and cropped to the window like on the camera. When all frames were returned, snapshot() raises
+ReplayFinished. It is a BaseException, so it is not caught by the crash handler of the main loop.
+
+Recorded clips and bitmap logs were already preprocessed on the camera, their images have preprocessed=True
+(see image.py). Bitmap logs are detected automatically, for clips set preprocessed=True.
+"""
+import os
+import numpy as np
+# noinspection PyUnresolvedReferences
+from image import Image, BINARY, GRAYSCALE, RGB565, JPEG
+
+QQQVGA = 0
+QQVGA = 1
+QVGA = 2
+VGA = 3
+FRAME_SIZES = {QQQVGA: (80, 60), QQVGA: (160, 120), QVGA: (320, 240), VGA: (640, 480)}
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".pgm")
+BITMAP_LOG_EXTENSION = ".rbm" # FRAME_LOG_EXTENSION of frame_log.py
+
+
+class ReplayFinished(BaseException):
+    """
+    Raised by snapshot() after the last frame of the source.
+    """
+    pass
+
+
+class Source:
+    def __init__(self):
+        self.frames = iter(())
+        self.preprocessed = False
+        self.max_frames = None
+        self.frame_count = 0
+
+
+source = Source()
+state = {"pixformat": GRAYSCALE, "framesize": QQVGA, "window": None, "framebuffers": 1}
+
+
+# region Replay
+
+def read_video(path):
+    import cv2
+    capture = cv2.VideoCapture(path)
+    try:
+        while True:
+            success, frame = capture.read()
+            if not success:
+                return
+            yield cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    finally:
+        capture.release()
+
+
+def read_folder(path):
+    import cv2
+    for name in sorted(os.listdir(path)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            yield cv2.imread(os.path.join(path, name), cv2.IMREAD_GRAYSCALE)
+
+
+def read_bitmap_log(path):
+    from log_reader import read_bitmap_frames # Camera Simulator has to be in sys.path
+    for _, _, frame in read_bitmap_frames(path):
+        yield frame[:, :, 0] if frame.ndim == 3 else frame
+
+
+def set_source(frames, preprocessed=None, max_frames=None, loop=False):
+    """
+    Sets the frames returned by snapshot().
+
+    Args:
+        frames: Path of a video, a bitmap log (.rbm) or a folder of images, or an iterable of numpy arrays
+        preprocessed: True if the frames were already preprocessed on the camera (default: True for bitmap logs)
+        max_frames: Number of frames after which the replay stops, None for all frames
+        loop: Start again with the first frame after the last one (paths only)
+    """
+    if isinstance(frames, str):
+        path = frames
+        if os.path.isdir(path):
+            reader = read_folder
+        elif path.lower().endswith(BITMAP_LOG_EXTENSION):
+            reader = read_bitmap_log
+            preprocessed = True if preprocessed is None else preprocessed
+        else:
+            reader = read_video
+
+        def read_all():
+            while True:
+                count = 0
+                for frame in reader(path):
+                    count += 1
+                    yield frame
+                if not loop or count == 0:
+                    return
+        frames = read_all()
+    source.frames = iter(frames)
+    source.preprocessed = bool(preprocessed)
+    source.max_frames = max_frames
+    source.frame_count = 0
+
+
+def frame_count():
+    """
+    Returns the number of frames returned by snapshot() since set_source().
+    """
+    return source.frame_count
+
+# endregion
+
+
+# region Settings
+
+def reset():
+    state["window"] = None
+
+
+def set_pixformat(pixformat):
+    state["pixformat"] = pixformat
+
+
+def set_framesize(framesize):
+    state["framesize"] = framesize
+    state["window"] = None
+
+
+def set_windowing(roi):
+    """
+    roi: (x, y, w, h) or (w, h) centered in the frame.
+    """
+    frame_width, frame_height = FRAME_SIZES[state["framesize"]]
+    if len(roi) == 2:
+        roi = ((frame_width - roi[0]) // 2, (frame_height - roi[1]) // 2, roi[0], roi[1])
+    state["window"] = tuple(roi)
+
+
+def set_framebuffers(count):
+    state["framebuffers"] = count
+
+
+def skip_frames(n=None, time=None):
+    pass
+
+
+def set_auto_gain(enable, **kwargs):
+    pass
+
+
+def set_auto_exposure(enable, **kwargs):
+    pass
+
+
+def set_auto_whitebal(enable, **kwargs):
+    pass
+
+
+def set_contrast(value):
+    pass
+
+
+def width():
+    return state["window"][2] if state["window"] else FRAME_SIZES[state["framesize"]][0]
+
+
+def height():
+    return state["window"][3] if state["window"] else FRAME_SIZES[state["framesize"]][1]
+
+# endregion
+
+
+def snapshot():
+    """
+    Returns the next frame of the source as a grayscale Image in the frame size and window.
+    """
+    if source.max_frames is not None and source.frame_count >= source.max_frames:
+        raise ReplayFinished()
+    frame = next(source.frames, None)
+    if frame is None:
+        raise ReplayFinished()
+    source.frame_count += 1
+
+    frame = np.asarray(frame)
+    if frame.dtype == bool:
+        frame = frame.astype(np.uint8) * 255
+    frame_width, frame_height = FRAME_SIZES[state["framesize"]]
+    if frame.shape[1] != frame_width or frame.shape[0] != frame_height:
+        import cv2
+        interpolation = cv2.INTER_NEAREST if source.preprocessed else cv2.INTER_AREA
+        frame = cv2.resize(frame, (frame_width, frame_height), interpolation=interpolation)
+    if state["window"]:
+        x, y, w, h = state["window"]
+        frame = frame[y:y + h, x:x + w]
+    return Image(frame.shape[1], frame.shape[0], GRAYSCALE, np.ascontiguousarray(frame, dtype=np.uint8),
+                 source.preprocessed)
@@ -0,0 +1,156 @@
+import ast
+import builtins
+import os
+import sys
+import tempfile
+import time
+import types
+
+CAMERA_SIMULATOR_FOLDER = os.path.dirname(os.path.abspath(__file__))
+CAMERA_FOLDER = os.path.dirname(CAMERA_SIMULATOR_FOLDER)
+OPENMV_FOLDER = os.path.join(CAMERA_FOLDER, "OpenMV")
+HOST_MODULES_FOLDER = os.path.join(CAMERA_SIMULATOR_FOLDER, "host_modules")
+REPOSITORY_FOLDER = os.path.dirname(os.path.dirname(CAMERA_FOLDER))
+MAIN_FILE = os.path.join(OPENMV_FOLDER, "main.py")
+SDCARD = "/sdcard"
+
+# Replay source and settings for running this file directly
+SOURCE = os.path.join(CAMERA_SIMULATOR_FOLDER, "input")
+MAX_FRAMES = None
+
+
+def setup_paths():
+    """
+    Makes the imports of the camera work on a PC: the stand-in modules, the shared modules (common, telemetry, ...)
+    and the "libraries" package of the camera, which is put together from Camera and Camera/OpenMV.
+    """
+    for folder in (REPOSITORY_FOLDER, CAMERA_SIMULATOR_FOLDER, CAMERA_FOLDER, HOST_MODULES_FOLDER):
+        if folder not in sys.path:
+            sys.path.insert(0, folder)
+    import openmv_shims
+    openmv_shims.install()
+    if "libraries" not in sys.modules:
+        libraries = types.ModuleType("libraries")
+        libraries.__path__ = [CAMERA_FOLDER, OPENMV_FOLDER]
+        sys.modules["libraries"] = libraries
+
+
+class SdCard:
+    """
+    Maps the paths on the sd card (/sdcard/...) to a folder on the PC while the runner is active.
+    Only open(), os.listdir() and os.mkdir() are used by the camera code.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.originals = None
+
+    def map(self, path):
+        if isinstance(path, str) and (path == SDCARD or path.startswith(SDCARD + "/")):
+            return os.path.join(self.folder, path[len(SDCARD):].lstrip("/"))
+        return path
+
+    def __enter__(self):
+        self.originals = (builtins.open, os.listdir, os.mkdir)
+        original_open, original_listdir, original_mkdir = self.originals
+        builtins.open = lambda path, *args, **kwargs: original_open(self.map(path), *args, **kwargs)
+        os.listdir = lambda path=".": original_listdir(self.map(path))
+        os.mkdir = lambda path, *args, **kwargs: original_mkdir(self.map(path), *args, **kwargs)
+        return self
+
+    def __exit__(self, *args):
+        builtins.open, os.listdir, os.mkdir = self.originals
+
+
+def set_start_pins(driving_mode, start_mode):
+    """
+    Bridges the pins which are read by set_driving_mode() and set_start_mode() of main.py.
+    """
+    import machine
+    for mode_pin in range(2, 4):
+        machine.Pin("P" + str(mode_pin)).set_value(1 if driving_mode == mode_pin - 1 else 0)
+    machine.Pin("P5").set_value(1 if start_mode else 0)
+
+
+def replace_constants(source, constants):
+    """
+    Returns the syntax tree of source in which the values of the top level assignments to the names in constants
+    are replaced, the rest of the source is unchanged. Raises a KeyError if a name is not assigned.
+    """
+    tree = ast.parse(source)
+    replaced = set()
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            name = node.targets[0].id
+            if name in constants:
+                node.value = ast.copy_location(ast.parse(repr(constants[name]), mode="eval").body, node.value)
+                replaced.add(name)
+    missing = set(constants) - replaced
+    if missing:
+        raise KeyError("Not assigned in main.py: {}".format(", ".join(sorted(missing))))
+    return ast.fix_missing_locations(tree)
+
+
+def run_main(source, preprocessed=None, max_frames=None, driving_mode=0, start_mode=False, arming_ms=0,
+             sdcard_folder=None, constants=None):
+    """
+    Runs OpenMV/main.py unmodified with the stand-in modules until all frames of the source were processed.
+
+    Args:
+        source: The frames for sensor.snapshot(), see sensor.set_source()
+        preprocessed: True if the frames were already preprocessed on the camera (recorded clips)
+        max_frames: Number of frames after which the run stops
+        driving_mode: Driving mode selected by the pins (0 - 2)
+        start_mode: True to select the start mode by the pins
+        arming_ms: Arming time of the esc (ARMING_MS of DirectPWM), 0 to start immediately
+        sdcard_folder: Folder used as sd card, a temporary folder if None
+        constants: {name: value} replacing the values of module constants of main.py, e.g. GEOMETRY_SETTINGS
+
+    Returns:
+        dict: "frames", "seconds", "fps", "sdcard" (folder with the clips and telemetry), "esc_history" and
+              "servo_history" ((time.perf_counter(), duty) of every PWM write) and "globals" of main.py.
+    """
+    setup_paths()
+    import machine
+    import sensor
+
+    sdcard_folder = sdcard_folder or tempfile.mkdtemp(prefix="rapid_sdcard_")
+    os.makedirs(os.path.join(sdcard_folder, "clips"), exist_ok=True)
+    machine.Timer.background = True # The safety refresh and the arming of DirectPWM run like on the camera
+    set_start_pins(driving_mode, start_mode)
+    sensor.set_source(source, preprocessed, max_frames)
+
+    # The module constants of DirectPWM can only be changed after the import and before main.py uses them
+    import importlib
+    direct_pwm = importlib.import_module("libraries.communication_management.DirectPWM")
+    direct_pwm.ARMING_MS = arming_ms
+
+    main_globals = {"__name__": "__main__", "__file__": MAIN_FILE}
+    with open(MAIN_FILE) as file:
+        code = compile(replace_constants(file.read(), constants or {}), MAIN_FILE, "exec")
+    start = None
+    with SdCard(sdcard_folder):
+        try:
+            start = time.perf_counter()
+            exec(code, main_globals)
+        except sensor.ReplayFinished:
+            pass
+        finally:
+            seconds = time.perf_counter() - start
+            machine.Timer.stop_all() # The recorder, streamer and telemetry were closed by main.py
+
+    frames = sensor.frame_count()
+    return {
+        "frames": frames,
+        "seconds": seconds,
+        "fps": frames / seconds if seconds > 0 else 0.0,
+        "sdcard": sdcard_folder,
+        "esc_history": direct_pwm.esc_pwm.history,
+        "servo_history": direct_pwm.servo_pwm.history,
+        "globals": main_globals,
+    }
+
+
+if __name__ == "__main__":
+    result = run_main(SOURCE, max_frames=MAX_FRAMES)
+    print("Frames: {}, {:.1f} fps, sd card: {}".format(result["frames"], result["fps"], result["sdcard"]))
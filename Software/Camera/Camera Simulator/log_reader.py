@@ -0,0 +1,137 @@
+import struct
+import numpy as np
+
+from Software.Camera.telemetry import TELEMETRY_MAGIC, HEADER_FORMAT, BLOCK_SIZE
+from Software.Camera.frame_log import FRAME_LOG_MAGIC, FILE_HEADER_FORMAT, FRAME_HEADER_FORMAT, FRAME_HEADER_SIZE
+
+# Numpy types for the struct formats used in the logs (all logs are little endian)
+NUMPY_TYPES = {
+    "b": "i1",
+    "B": "u1",
+    "h": "<i2",
+    "H": "<u2",
+    "i": "<i4",
+    "I": "<u4",
+    "f": "<f4",
+}
+
+
+def parse_telemetry_header(header):
+    """
+    Reads the header block of a telemetry file.
+
+    Returns:
+        tuple: (fields, heights, record_size) with fields being a list of (name, struct format).
+    """
+    magic, version, height_count, record_size, description_length = struct.unpack_from(HEADER_FORMAT, header, 0)
+    if magic != TELEMETRY_MAGIC:
+        raise ValueError("Not a telemetry file")
+    offset = struct.calcsize(HEADER_FORMAT)
+    description = bytes(header[offset:offset + description_length]).decode()
+    field_description, height_description = description.split(";")
+    fields = [tuple(field.split(":")) for field in field_description.split(",")]
+    heights = [int(height) for height in height_description.split(",")] if height_description else []
+    if len(heights) != height_count:
+        raise ValueError("Telemetry header is corrupted")
+    return fields, heights, record_size
+
+
+def get_telemetry_dtype(fields, record_size):
+    """
+    Creates a numpy dtype for a record. Lane fields ("5s") become arrays with one value per height.
+    """
+    names, formats, offsets = [], [], []
+    offset = 0
+    for name, code in fields:
+        if code.endswith("s"):
+            count = int(code[:-1])
+            formats.append(("u1", (count,)))
+            size = count
+        else:
+            formats.append(NUMPY_TYPES[code])
+            size = struct.calcsize("<" + code)
+        names.append(name)
+        offsets.append(offset)
+        offset += size
+    return np.dtype({"names": names, "formats": formats, "offsets": offsets, "itemsize": record_size})
+
+
+def load_telemetry(path):
+    """
+    Loads a telemetry file written by telemetry.TelemetryLog.
+
+    Returns:
+        dict: A numpy array for every field (lane fields have the shape (frames, heights)) and
+              "heights" with the heights of the lane values.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    fields, heights, record_size = parse_telemetry_header(data[:BLOCK_SIZE])
+    body = data[BLOCK_SIZE:]
+    body = body[:len(body) - len(body) % record_size]
+    records = np.frombuffer(body, dtype=get_telemetry_dtype(fields, record_size))
+    records = records[records["frame"] != 0]  # Unused records of a partly filled block
+    telemetry = {name: records[name].copy() for name, _ in fields}
+    telemetry["heights"] = np.array(heights)
+    return telemetry
+
+
+def summarize_timings(telemetry):
+    """
+    Summarizes the throughput of the main loop from a loaded telemetry file, e.g. to compare two settings
+    (such as SAFETY_REFRESH_FREQUENCY of DirectPWM) on the same track.
+
+    Returns:
+        dict: "fps" (frames per second from the frame ticks), the mean of every "..._us" field and
+              "skipped_fraction" (fraction of the unchanged frames that reused the last results) and
+              "record_dropped" (frames the recorder dropped for lack of time during the recording).
+    """
+    summary = {}
+    ticks = telemetry["ticks"].astype(np.int64)
+    if len(ticks) > 1 and ticks[-1] > ticks[0]:
+        summary["fps"] = float((len(ticks) - 1) * 1000 / (ticks[-1] - ticks[0]))
+    for name, values in telemetry.items():
+        if name.endswith("_us") and len(values):
+            summary[name] = float(np.mean(values))
+    if "skipped" in telemetry and len(telemetry["skipped"]):
+        summary["skipped_fraction"] = float(np.mean(telemetry["skipped"]))
+    if "record_dropped" in telemetry and len(telemetry["record_dropped"]):
+        summary["record_dropped"] = int(telemetry["record_dropped"][-1] - telemetry["record_dropped"][0])
+    return summary
+
+
+def unpack_bitmap(data, width, height, stride):
+    """
+    Converts a raw bitmap of the camera into a boolean array with the shape (height, width).
+    Every row has stride bytes, the pixels are stored starting with the lowest bit.
+    """
+    rows = np.frombuffer(data, dtype=np.uint8, count=stride * height).reshape(height, stride)
+    return np.unpackbits(rows, axis=1, bitorder="little")[:, :width].astype(bool)
+
+
+def read_bitmap_frames(path):
+    """
+    Reads a bitmap log written by frame_log.BitmapFrameLog frame by frame.
+
+    The frames are returned as BGR images with white (255) for set pixels, so they can be passed directly
+    to process_frame() of virtual_cam.py. The recognizers then see exactly the pixels they saw on the camera.
+
+    Yields:
+        tuple: (frame_index, ticks, frame)
+    """
+    with open(path, "rb") as file:
+        header = file.read(BLOCK_SIZE)
+        magic, version, width, height, stride, record_size = struct.unpack_from(FILE_HEADER_FORMAT, header, 0)
+        if magic != FRAME_LOG_MAGIC:
+            raise ValueError("Not a bitmap log")
+        while True:
+            record = file.read(record_size)
+            if len(record) < record_size:
+                break
+            frame_index, ticks = struct.unpack_from(FRAME_HEADER_FORMAT, record, 0)
+            if frame_index == 0:  # Preallocated record that was never written
+                break
+            pixels = unpack_bitmap(record[FRAME_HEADER_SIZE:], width, height, stride)
+            frame = np.zeros((height, width, 3), dtype=np.uint8)
+            frame[pixels] = 255
+            yield frame_index, ticks, frame
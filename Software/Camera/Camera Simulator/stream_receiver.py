@@ -0,0 +1,90 @@
+import os
+import socket
+import time
+
+# Address of the camera (access point of the camera) or 127.0.0.1 for a streamer running on this PC
+HOST = "192.168.4.1"
+PORT = 8080
+OUTPUT_FOLDER = "stream"
+
+
+def read_until(connection, buffer, delimiter):
+    """
+    Reads from the connection until the buffer contains the delimiter.
+
+    Returns:
+        tuple: (data before the delimiter, remaining buffer) or (None, buffer) if the connection was closed
+    """
+    while delimiter not in buffer:
+        data = connection.recv(4096)
+        if not data:
+            return None, buffer
+        buffer += data
+    index = buffer.index(delimiter)
+    return buffer[:index], buffer[index + len(delimiter):]
+
+
+def read_exactly(connection, buffer, length):
+    while len(buffer) < length:
+        data = connection.recv(max(4096, length - len(buffer)))
+        if not data:
+            return None, buffer
+        buffer += data
+    return buffer[:length], buffer[length:]
+
+
+def receive_stream(host=HOST, port=PORT, output_folder=OUTPUT_FOLDER, max_frames=None, timeout=10):
+    """
+    Connects to the WiFiStreamer of the camera and records the mjpeg stream.
+
+    Every jpeg is saved as frame_00000.jpg, ... in output_folder and appended to stream.mjpeg
+    (concatenated jpegs, can be opened by most video players). Recording stops when the camera closes the
+    connection, after max_frames or if nothing was received for timeout seconds.
+
+    Returns:
+        list: (receive time in s since the start, size in bytes) of every frame
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    frames = []
+    start = time.time()
+    with socket.create_connection((host, port), timeout=timeout) as connection, \
+            open(os.path.join(output_folder, "stream.mjpeg"), "wb") as stream_file:
+        connection.sendall(b"GET / HTTP/1.1\r\n\r\n")
+        _, buffer = read_until(connection, b"", b"\r\n\r\n") # HTTP header of the response
+        while max_frames is None or len(frames) < max_frames:
+            try:
+                part_header, buffer = read_until(connection, buffer, b"\r\n\r\n")
+                if part_header is None:
+                    break
+                length = None
+                for line in part_header.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length is None:
+                    raise ValueError("Stream part without Content-Length")
+                jpeg, buffer = read_exactly(connection, buffer, length)
+            except socket.timeout:
+                break
+            if jpeg is None:
+                break
+            with open(os.path.join(output_folder, "frame_{:05d}.jpg".format(len(frames))), "wb") as frame_file:
+                frame_file.write(jpeg)
+            stream_file.write(jpeg)
+            frames.append((time.time() - start, length))
+    return frames
+
+
+def summarize_stream(frames):
+    """
+    Returns: (frame count, frames per second, mean frame size in bytes)
+    """
+    if len(frames) < 2:
+        return len(frames), 0.0, float(frames[0][1]) if frames else 0.0
+    duration = frames[-1][0] - frames[0][0]
+    fps = (len(frames) - 1) / duration if duration > 0 else 0.0
+    return len(frames), fps, sum(size for _, size in frames) / len(frames)
+
+
+if __name__ == "__main__":
+    received = receive_stream()
+    print("Frames: {}, fps: {:.1f}, mean size: {:.0f} bytes".format(*summarize_stream(received)))
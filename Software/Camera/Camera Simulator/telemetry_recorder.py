@@ -0,0 +1,78 @@
+import os
+
+from Software.Camera.telemetry import BLOCK_SIZE, RECORD_SIZE, STREAM_TYPE_HEADER, STREAM_TYPE_RECORD, \
+    STREAM_FRAME_HEADER_SIZE, STREAM_CRC_SIZE, decode_stream_frames
+from log_reader import parse_telemetry_header
+
+# Serial port of the camera, e.g. "COM5" on Windows or "/dev/ttyACM0" on Linux
+PORT = "/dev/ttyACM0"
+OUTPUT_FILE = "telemetry.bin"
+
+
+def open_serial(port=PORT, timeout=1):
+    """
+    Opens the USB serial port of the camera (needs pyserial). The baudrate is ignored by USB VCP.
+    """
+    import serial
+    return serial.Serial(port, 115200, timeout=timeout)
+
+
+def record_telemetry(stream, path=OUTPUT_FILE, max_records=None, read_size=4096):
+    """
+    Records the telemetry stream of TelemetryStream into a telemetry file.
+
+    The file has the same format as the one of TelemetryLog, so it can be loaded with load_telemetry() of
+    log_reader.py. Recording starts with the first header in the stream, records before it are skipped.
+    It stops when the stream ends (read() returns no data) or after max_records.
+
+    Args:
+        stream: Object with read(size), e.g. a serial port (open_serial()) or a pipe / pty opened with os.fdopen
+        path: The telemetry file to write
+        max_records: Number of records after which the recording stops, None to record until the stream ends
+
+    Returns:
+        tuple: (recorded records, skipped bytes)
+    """
+    header = None
+    buffer = b""
+    records = 0
+    skipped = 0
+    block = bytearray()
+    with open(path, "wb") as file:
+        while max_records is None or records < max_records:
+            try:
+                data = stream.read(read_size)
+            except OSError: # e.g. the other side of a pty was closed
+                data = b""
+            if not data:
+                break
+            buffer += data
+            frames, remaining = decode_stream_frames(buffer)
+            frame_bytes = sum(STREAM_FRAME_HEADER_SIZE + len(payload) + STREAM_CRC_SIZE for _, payload in frames)
+            skipped += len(buffer) - len(remaining) - frame_bytes
+            buffer = remaining
+            for frame_type, payload in frames:
+                if frame_type == STREAM_TYPE_HEADER:
+                    if header is None:
+                        parse_telemetry_header(payload) # Raises a ValueError if it is not a telemetry header
+                        header = payload
+                        file.write(header)
+                    elif payload != header:
+                        raise ValueError("The telemetry header changed during the recording")
+                elif frame_type == STREAM_TYPE_RECORD and header is not None and len(payload) == RECORD_SIZE:
+                    block += payload
+                    records += 1
+                    if len(block) == BLOCK_SIZE:
+                        file.write(block)
+                        block = bytearray()
+                    if max_records is not None and records >= max_records:
+                        break
+        if block: # The unused records of the last block are zero and ignored by load_telemetry()
+            file.write(block + bytes(BLOCK_SIZE - len(block)))
+    return records, skipped
+
+
+if __name__ == "__main__":
+    with open_serial() as port:
+        count, skipped_bytes = record_telemetry(port, os.path.abspath(OUTPUT_FILE))
+    print("Recorded {} records, skipped {} bytes".format(count, skipped_bytes))
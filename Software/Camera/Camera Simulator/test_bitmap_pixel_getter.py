@@ -0,0 +1,111 @@
+"""
+Checks the scans of BitmapPixelGetter (lane_recognition) on a PC (run with pytest or directly with python).
+
+The scans are compared with the scans of BitmapPixelGetter as they were before the kernels existed
+(ReferenceBitmapPixelGetter below) and with the pixel by pixel scans of the PixelGetter base class on random
+bitmaps (bitmap_image.py stands in for the bitmap of the camera).
+"""
+import random
+
+import host_runner
+
+host_runner.setup_paths()
+
+from bitmap_image import generate_random_bitmaps
+from libraries.lane_recognition import PixelGetter, BitmapPixelGetter
+
+SEED = 7
+BITMAPS = 200
+SIZES = [(160, 120), (80, 60), (33, 7)] # The last one has a row that ends inside a 32-bit word
+
+
+class ReferenceBitmapPixelGetter(PixelGetter):
+    """
+    Scans of BitmapPixelGetter before they were moved into kernels.py. find_row_in_columns() is the pixel by
+    pixel scan of the PixelGetter base class.
+    """
+    def __init__(self):
+        self.data = None
+        self.stride = 0
+
+    def set_image(self, img):
+        self.data = memoryview(img.bytearray())
+        self.stride = ((img.width() + 31) // 32) * 4
+
+    def get_pixel(self, img, x, y):
+        return (self.data[y * self.stride + (x >> 3)] >> (x & 7)) & 1
+
+    def find_pixel(self, img, y, start_x, end_x):
+        data = self.data
+        row = y * self.stride
+        x = start_x
+        if start_x < end_x:
+            while x < end_x:
+                byte = data[row + (x >> 3)]
+                if byte == 0: # No pixel set in this byte, continue with the next byte
+                    x = (x | 7) + 1
+                elif (byte >> (x & 7)) & 1:
+                    return x
+                else:
+                    x += 1
+        else:
+            while x > end_x:
+                byte = data[row + (x >> 3)]
+                if byte == 0: # No pixel set in this byte, continue with the previous byte
+                    x = (x & ~7) - 1
+                elif (byte >> (x & 7)) & 1:
+                    return x
+                else:
+                    x -= 1
+        return None
+
+    def count_pixels(self, img, y, start_x, end_x):
+        data = self.data
+        row = y * self.stride
+        count = 0
+        for x in range(start_x, end_x):
+            count += (data[row + (x >> 3)] >> (x & 7)) & 1
+        return count
+
+
+def generate_ranges(width, rng):
+    """
+    Returns the (start_x, end_x) ranges of a row which are checked, end_x is exclusive.
+    """
+    ranges = [(0, width), (0, 0), (width - 1, width), (width // 3, 2 * width // 3)]
+    for _ in range(6):
+        start_x = rng.randrange(width)
+        ranges.append((start_x, rng.randrange(start_x, width + 1)))
+    return ranges
+
+
+def test_scans_match_reference():
+    rng = random.Random(SEED)
+    reference = ReferenceBitmapPixelGetter()
+    pixel_getter = BitmapPixelGetter()
+    for img in generate_random_bitmaps(BITMAPS, SIZES, SEED):
+        reference.set_image(img)
+        pixel_getter.set_image(img)
+        width, height = img.width(), img.height()
+        for y in range(height):
+            for start_x, end_x in generate_ranges(width, rng):
+                assert pixel_getter.find_pixel(img, y, start_x, end_x) == \
+                    reference.find_pixel(img, y, start_x, end_x) == \
+                    PixelGetter.find_pixel(reference, img, y, start_x, end_x)
+                assert pixel_getter.find_pixel(img, y, end_x - 1, start_x - 1) == \
+                    reference.find_pixel(img, y, end_x - 1, start_x - 1) == \
+                    PixelGetter.find_pixel(reference, img, y, end_x - 1, start_x - 1)
+                assert pixel_getter.count_pixels(img, y, start_x, end_x) == \
+                    reference.count_pixels(img, y, start_x, end_x) == \
+                    PixelGetter.count_pixels(reference, img, y, start_x, end_x)
+        for _ in range(10):
+            x1, x2 = rng.randrange(width), rng.randrange(width)
+            start_y = rng.randrange(height)
+            end_y = rng.randrange(-1, start_y)
+            assert pixel_getter.find_row_in_columns(img, x1, x2, start_y, end_y) == \
+                reference.find_row_in_columns(img, x1, x2, start_y, end_y)
+
+
+if __name__ == "__main__":
+    test_scans_match_reference()
+    print("All bitmap pixel getter checks passed")
@@ -0,0 +1,80 @@
+"""
+Checks the flush of BlackBoxRecorder (OpenMV/recording) on a PC (run with pytest or directly with python): a
+triggered flush has to progress even if the frames take longer than the budget, and a flush that was started
+before the script stops is completed by close() in the finally block of main.py.
+"""
+import os
+import tempfile
+
+import host_runner
+
+host_runner.setup_paths()
+
+# noinspection PyUnresolvedReferences
+import image
+# noinspection PyUnresolvedReferences
+import machine
+# noinspection PyUnresolvedReferences
+import time
+from libraries.communication_management.EmergencyStop import EmergencyStop
+from libraries.recording.BlackBoxRecorder import BlackBoxRecorder
+from log_reader import load_telemetry, read_bitmap_frames
+from telemetry import TelemetryLog
+
+WIDTH = 80
+HEIGHT = 60
+RING_FRAMES = 12
+
+
+def create_black_box(emergency_stop=None):
+    folder = tempfile.mkdtemp(prefix="rapid_black_box_")
+    telemetry = TelemetryLog(None, [30, 45])
+    black_box = BlackBoxRecorder(folder, WIDTH, HEIGHT, RING_FRAMES, budget_ms=5, telemetry_header=telemetry.header,
+                                 emergency_stop=emergency_stop)
+    return folder, telemetry, black_box
+
+
+def record_frame(black_box, telemetry, frame, frame_ms=0):
+    black_box.submit(image.Image(WIDTH, HEIGHT, image.BINARY))
+    telemetry.log(frame, frame, None, None, 0, 50, 50, False, 0, 0, 0, 0, 0, 0, 0, False, 0, 0, 0, 0)
+    black_box.add_telemetry(telemetry.record)
+    time.sleep_ms(frame_ms) # The rest of the frame
+    black_box.service()
+
+
+def check_black_box(folder, frames):
+    frame_indices = [frame_index for frame_index, _, _ in read_bitmap_frames(os.path.join(folder, "blackbox000.rbm"))]
+    assert frame_indices == list(range(frames - RING_FRAMES + 1, frames + 1))
+    assert list(load_telemetry(os.path.join(folder, "blackbox000.bin"))["frame"]) == \
+        list(range(frames - RING_FRAMES + 1, frames + 1))
+
+
+def test_flush_progresses_on_slow_frames():
+    pin = machine.Pin("TEST_BLACK_BOX_STOP", machine.Pin.IN, machine.Pin.PULL_DOWN)
+    folder, telemetry, black_box = create_black_box(EmergencyStop(pin, lambda: None, False))
+    for frame in range(1, 21):
+        record_frame(black_box, telemetry, frame, frame_ms=8)
+    pin.set_value(1)
+    pin.set_value(0) # The stop ended before the next frame
+    frame = 21
+    while black_box.flush_count == 0:
+        assert frame < 21 + RING_FRAMES + 5, "The flush does not progress"
+        record_frame(black_box, telemetry, frame, frame_ms=8)
+        frame += 1
+    check_black_box(folder, 20)
+
+
+def test_flush_is_completed_by_close():
+    folder, telemetry, black_box = create_black_box()
+    for frame in range(1, 31):
+        record_frame(black_box, telemetry, frame)
+    black_box.trigger("Main loop crash")
+    black_box.close()
+    assert black_box.flush_count == 1
+    check_black_box(folder, 30)
+
+
+if __name__ == "__main__":
+    test_flush_progresses_on_slow_frames()
+    test_flush_is_completed_by_close()
+    print("All black box checks passed")
@@ -0,0 +1,106 @@
+"""
+Replays recorded frames through BlobBandLaneFinder (lane_recognition) on a PC (run with pytest or directly with
+python). The frames are rendered by track_frames.py, run through OpenMV/main.py with host_runner and recorded
+by the BitmapRecorder, so the lane finder gets the bitmaps main.py saw. Bitmap logs (*.rbm) in the input folder
+are replayed as well.
+
+The lanes found with the pure Python find_blobs() of PixelGetter have to match the lanes found with the
+find_blobs() of the firmware (image stand-in) and the lane lines of the rendered frames.
+"""
+import glob
+import os
+
+import numpy as np
+
+import host_runner
+
+host_runner.setup_paths()
+
+# noinspection PyUnresolvedReferences
+import image
+import track_frames
+from bitmap_image import BitmapImage
+from geometry import Geometry
+from libraries.lane_recognition import PixelGetter, BitmapPixelGetter, CameraPixelGetter
+from libraries.lane_recognition import BlobBandLaneFinder as blob_band_lane_finder
+from log_reader import read_bitmap_frames
+
+FRAMES = 20
+MAX_OFFSET = 3 # Largest distance between a lane element and the rendered lane line (the bands have 4 rows)
+
+
+class PythonBlobPixelGetter(BitmapPixelGetter):
+    """
+    BitmapPixelGetter with the pure Python find_blobs() of the PixelGetter base class.
+    """
+    find_blobs = PixelGetter.find_blobs
+
+
+def record_frames(frames):
+    result = host_runner.run_main(iter(frames), preprocessed=False, constants={"RECORDING_MODE": "Bitmap"})
+    paths = glob.glob(os.path.join(result["sdcard"], "clips", "*", "*.rbm"))
+    assert len(paths) == 1
+    return paths[0]
+
+
+def create_lane_finder(pixel_getter):
+    # Other tests may have run main.py in another resolution, the recorded frames are QQVGA
+    blob_band_lane_finder.configure_geometry(Geometry("QQVGA", 0, 120))
+    lane_finder = blob_band_lane_finder.BlobBandLaneFinder()
+    lane_finder.setup(pixel_getter)
+    return lane_finder
+
+
+def recognize_lanes(path):
+    """
+    Yields (frame index, lanes of the pure Python find_blobs(), lanes of the firmware find_blobs()) per frame.
+    """
+    pixel_getter = PythonBlobPixelGetter()
+    python_lane_finder = create_lane_finder(pixel_getter)
+    camera_lane_finder = create_lane_finder(CameraPixelGetter())
+    for frame_index, _, frame in read_bitmap_frames(path):
+        pixels = frame[:, :, 0] > 0
+        bitmap = BitmapImage(pixels)
+        pixel_getter.set_image(bitmap)
+        camera_image = image.Image(bitmap.width(), bitmap.height(), image.BINARY, data=pixels)
+        yield frame_index, python_lane_finder.recognize_lanes(bitmap), camera_lane_finder.recognize_lanes(camera_image)
+
+
+def get_rendered_lanes(frame, y):
+    """
+    Returns the inner edges (left, right) of the lane lines in row y of a rendered frame, None for a gap.
+    """
+    xs = np.nonzero(frame[y] > track_frames.ROAD)[0]
+    left, right = xs[xs < track_frames.WIDTH // 2], xs[xs >= track_frames.WIDTH // 2]
+    return int(left.max()) if len(left) else None, int(right.min()) if len(right) else None
+
+
+def test_lanes_of_recorded_frames():
+    frames = list(track_frames.drive(FRAMES))
+    found = 0
+    replayed = 0
+    for frame_index, lanes, camera_lanes in recognize_lanes(record_frames(frames)):
+        assert lanes == camera_lanes
+        frame = frames[frame_index - 1]
+        for side, lane in enumerate(lanes):
+            elements = dict(lane)
+            for y in blob_band_lane_finder.CHECK_HEIGHTS:
+                expected = get_rendered_lanes(frame, y)[side]
+                if expected is not None and y in elements: # The band can reach over the end of a gap
+                    assert abs(elements[y] - expected) <= MAX_OFFSET
+                    found += 1
+        replayed += 1
+    assert replayed == FRAMES
+    assert found >= 0.9 * FRAMES * 2 * len(blob_band_lane_finder.CHECK_HEIGHTS)
+
+
+def test_python_blobs_match_firmware_blobs_on_recordings():
+    for path in glob.glob(os.path.join(host_runner.SOURCE, "*.rbm")):
+        for _, lanes, camera_lanes in recognize_lanes(path):
+            assert lanes == camera_lanes
+
+
+if __name__ == "__main__":
+    test_lanes_of_recorded_frames()
+    test_python_blobs_match_firmware_blobs_on_recordings()
+    print("All blob band lane finder checks passed")
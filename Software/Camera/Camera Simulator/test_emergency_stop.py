@@ -0,0 +1,133 @@
+"""
+Checks the stop logic of EmergencyStop and the brake of DirectPWM (OpenMV/communication_management) with the
+machine.Pin stand-in of host_modules (run with pytest or directly with python). set_value() of the stand-in calls
+the interrupt handler on the matching edge like the pin interrupt of the camera.
+"""
+import importlib
+
+import host_runner
+
+host_runner.setup_paths()
+
+# noinspection PyUnresolvedReferences
+import machine
+from libraries.communication_management.EmergencyStop import EmergencyStop
+
+# The package exports the class DirectPWM under the name of the module
+direct_pwm = importlib.import_module("libraries.communication_management.DirectPWM")
+
+
+class StopCounter:
+    def __init__(self):
+        self.calls = 0
+
+    def on_stop(self):
+        self.calls += 1
+
+
+def create_emergency_stop(pin_name, latch, level=0):
+    pin = machine.Pin(pin_name, machine.Pin.IN, machine.Pin.PULL_DOWN)
+    pin.set_value(level)
+    counter = StopCounter()
+    return pin, counter, EmergencyStop(pin, counter.on_stop, latch)
+
+
+def test_latched_stop_is_kept_until_release():
+    pin, counter, emergency_stop = create_emergency_stop("TEST_LATCH", latch=True)
+    assert not emergency_stop.stopped
+    pin.set_value(1)
+    assert emergency_stop.stopped and emergency_stop.active
+    assert counter.calls == 1 and emergency_stop.stop_count == 1
+    pin.set_value(0)
+    assert emergency_stop.stopped and not emergency_stop.active
+    assert emergency_stop.release()
+    assert not emergency_stop.stopped
+
+
+def test_release_is_refused_while_the_pin_is_set():
+    pin, counter, emergency_stop = create_emergency_stop("TEST_REFUSE", latch=True)
+    pin.set_value(1)
+    assert not emergency_stop.release()
+    assert emergency_stop.stopped
+    pin.set_value(0)
+    assert emergency_stop.release()
+
+
+def test_unlatched_stop_ends_with_the_falling_edge():
+    pin, counter, emergency_stop = create_emergency_stop("TEST_NO_LATCH", latch=False)
+    for stop in range(1, 4):
+        pin.set_value(1)
+        assert emergency_stop.stopped
+        pin.set_value(0)
+        assert not emergency_stop.stopped
+        assert counter.calls == stop and emergency_stop.stop_count == stop
+
+
+def test_pin_set_before_the_interrupt_was_enabled():
+    pin, counter, emergency_stop = create_emergency_stop("TEST_EARLY", latch=False, level=1)
+    assert emergency_stop.stopped and counter.calls == 1
+    pin.set_value(0)
+    assert not emergency_stop.stopped
+
+
+def create_direct_pwm():
+    machine.Timer.background = False # The timer is fired by the tests, host_runner.run_main() may have enabled it
+    direct_pwm.ARMING_MS = 0
+    direct_pwm.TRIGGER_PIN.set_value(0)
+    communication = direct_pwm.DirectPWM(0)
+    communication.update_pwm(None) # The timer ends the arming
+    assert communication.is_ready()
+    return communication
+
+
+def interrupt_before_write(pwm, duty):
+    """
+    Replaces pwm.duty_u16(), so the trigger pin is set right before duty is written (after the emergency stop
+    was checked). Returns the function which restores pwm.duty_u16().
+    """
+    write = pwm.duty_u16
+
+    def interrupted_write(value=None):
+        if value == duty and not direct_pwm.TRIGGER_PIN.value():
+            direct_pwm.TRIGGER_PIN.set_value(1) # The interrupt brakes
+        return write(value)
+
+    pwm.duty_u16 = interrupted_write
+    return lambda: delattr(pwm, "duty_u16")
+
+
+def test_brake_is_not_overwritten_by_write_pwm():
+    communication = create_direct_pwm()
+    communication.send_movement_data(0, 50)
+    restore = interrupt_before_write(direct_pwm.esc_pwm, communication.esc_duties[60])
+    try:
+        communication.send_movement_data(60, 50)
+    finally:
+        restore()
+    assert direct_pwm.esc_pwm.duty_u16() == direct_pwm.BRAKE_DUTY
+    assert communication.esc_duty == direct_pwm.BRAKE_DUTY
+    direct_pwm.TRIGGER_PIN.set_value(0)
+    communication.send_movement_data(60, 50)
+    assert direct_pwm.esc_pwm.duty_u16() == communication.esc_duties[60]
+
+
+def test_brake_is_not_overwritten_by_the_timer():
+    communication = create_direct_pwm()
+    communication.send_movement_data(60, 50)
+    restore = interrupt_before_write(direct_pwm.esc_pwm, communication.esc_duties[60])
+    try:
+        communication.update_pwm(None)
+    finally:
+        restore()
+    assert direct_pwm.esc_pwm.duty_u16() == direct_pwm.BRAKE_DUTY
+    direct_pwm.TRIGGER_PIN.set_value(0)
+
+
+if __name__ == "__main__":
+    test_latched_stop_is_kept_until_release()
+    test_release_is_refused_while_the_pin_is_set()
+    test_unlatched_stop_ends_with_the_falling_edge()
+    test_pin_set_before_the_interrupt_was_enabled()
+    test_brake_is_not_overwritten_by_write_pwm()
+    test_brake_is_not_overwritten_by_the_timer()
+    print("All emergency stop checks passed")
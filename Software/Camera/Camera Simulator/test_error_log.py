@@ -0,0 +1,106 @@
+"""
+Checks the counting of ErrorLog (error_log.py) on a PC (run with pytest or directly with python): the exceptions
+are counted by type and location. The MicroPython path, which finds the location in the text printed by
+sys.print_exception(), is checked with printed tracebacks.
+"""
+import os
+import sys
+import tempfile
+
+import host_runner
+
+host_runner.setup_paths()
+
+import error_log
+from error_log import ErrorLog
+
+TRACEBACK = 'Traceback (most recent call last):\n  File "main.py", line 385, in <module>\n{}OSError: {}\n'
+SEND_FRAME = '  File "libraries/communication_management/SPITeensy.py", line {}, in send_movement_data\n'
+
+
+def create_error_log():
+    return ErrorLog(os.path.join(tempfile.mkdtemp(prefix="rapid_error_log_"), "log.txt"))
+
+
+def divide(value):
+    return 1 / value
+
+
+def index(values):
+    return values[3]
+
+
+def test_same_type_at_two_locations():
+    log = create_error_log()
+    for frame in range(10):
+        try:
+            divide(0) if frame % 2 else divide(0.0) # One location
+        except Exception as exception:
+            log.record(exception, frame)
+        try:
+            1 / 0 # Another location with the same type
+        except Exception as exception:
+            log.record(exception, frame)
+        try:
+            index([])
+        except Exception as exception:
+            log.record(exception, frame)
+    assert log.get_statistics() == (30, 3, 30)
+    assert sorted(log.counts.values()) == [10, 10, 10]
+    log.flush()
+    with open(log.filename) as file:
+        text = file.read()
+    assert "ZeroDivisionError at test_error_log.py:" in text and "IndexError at test_error_log.py:" in text
+    assert text.count("ZeroDivisionError at") == 4 # Two counts and two messages
+
+
+def test_other_kinds():
+    log = create_error_log()
+    for kind in range(error_log.MAX_ERROR_KINDS + 3):
+        try:
+            exec(compile("raise KeyError()", "kind{}.py".format(kind), "exec"), {}) # Another location every time
+        except Exception as exception:
+            log.record(exception)
+    assert len(log.counts) == error_log.MAX_ERROR_KINDS + 1
+    assert log.counts[error_log.OTHER] == 3
+
+
+def print_traceback(text):
+    """
+    Returns a stand-in for sys.print_exception() of MicroPython that prints text.
+    """
+    return lambda exception, stream: stream.write(text.encode())
+
+
+def record_printed(log, text):
+    exception = OSError("printed") # Never raised, so it has no __traceback__ like on MicroPython
+    sys.print_exception = print_traceback(text)
+    try:
+        return log.record(exception), log.get_location_hash(exception)
+    finally:
+        del sys.print_exception
+
+
+def test_location_of_printed_tracebacks():
+    log = create_error_log()
+    new_kind, line_88 = record_printed(log, TRACEBACK.format(SEND_FRAME.format(88), "EIO"))
+    assert new_kind and line_88 != 0
+    # The message is not part of the location, a line starting with "File" of the message neither
+    assert record_printed(log, TRACEBACK.format(SEND_FRAME.format(88), 'failed\n File "x"')) == (False, line_88)
+    new_kind, line_90 = record_printed(log, TRACEBACK.format(SEND_FRAME.format(90), "EIO"))
+    assert new_kind and line_90 != line_88
+    # A traceback longer than the buffer, only its end is searched
+    long_traceback = TRACEBACK.format(SEND_FRAME.format(12) * 20 + SEND_FRAME.format(90), "EIO")
+    assert len(long_traceback) > error_log.TRACEBACK_BUFFER_SIZE
+    assert record_printed(log, long_traceback) == (False, line_90)
+    # A short traceback after the long one, the rest of the long one in the stream is not searched
+    new_kind, main_line = record_printed(log, TRACEBACK.format("", "EIO"))
+    assert new_kind and main_line == record_printed(create_error_log(), TRACEBACK.format("", "EIO"))[1]
+    assert log.counts == {(OSError, line_88): 2, (OSError, line_90): 2, (OSError, main_line): 1}
+
+
+if __name__ == "__main__":
+    test_same_type_at_two_locations()
+    test_other_kinds()
+    test_location_of_printed_tracebacks()
+    print("All error log checks passed")
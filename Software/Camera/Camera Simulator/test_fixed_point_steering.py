@@ -0,0 +1,128 @@
+"""
+Compares the fixed-point path of StraightAwareCenterLaneDriver (movement_params) with the float path on a PC (run
+with pytest or directly with python). Speed and steering have to be the same:
+- for every combination of adjusted deviations at the CHECK_HEIGHTS of the driver
+- on recorded traces: the lanes in the telemetry of OpenMV/main.py run by host_runner on rendered frames
+  (track_frames.py) in every driving mode, the telemetry files (*.bin) in the input folder and random lanes
+"""
+import glob
+import importlib
+import itertools
+import os
+import random
+
+import host_runner
+
+host_runner.setup_paths()
+
+import track_frames
+from log_reader import load_telemetry
+from telemetry import LANE_MISSING
+
+# The package exports the class StraightAwareCenterLaneDriver under the name of the module
+driver_module = importlib.import_module("libraries.movement_params.StraightAwareCenterLaneDriver")
+
+DRIVING_MODES = (0, 1, 2)
+TRACE_FRAMES = 80
+RANDOM_FRAMES = 20000
+SEED = 11
+
+
+def get_lanes(telemetry, index):
+    """
+    Returns (left lane, right lane, lane distance) of a frame of a telemetry file.
+    """
+    heights = telemetry["heights"]
+    lanes = []
+    for side in ("left_x", "right_x"):
+        lanes.append([(int(y), int(x)) for y, x in zip(heights, telemetry[side][index]) if x != LANE_MISSING])
+    return lanes[0], lanes[1], int(telemetry["lane_distance"][index])
+
+
+def drive(driving_mode, fixed_point, frames):
+    """
+    Returns (speed, steering) of every frame ((left lane, right lane, lane distance)) like main.py uses them.
+    """
+    driver_module.CROSSING_DETECTED = False # Module state, every run starts without a crossing
+    driver = driver_module.StraightAwareCenterLaneDriver(driving_mode, fixed_point=fixed_point)
+    results = []
+    for left_lane, right_lane, lane_distance in frames:
+        speed, steering = driver.get_movement_params(left_lane, right_lane, lane_distance)
+        results.append((int(speed), int(steering)))
+    return results
+
+
+def check_trace(driving_mode, frames):
+    assert drive(driving_mode, False, frames) == drive(driving_mode, True, frames)
+
+
+def get_representative_deviations(driver):
+    """
+    Returns one deviation of calculate_deviation_fixed() for every value the thresholds of the driver adjust to.
+    """
+    representatives = {}
+    for right in range(-160, 321):
+        deviation = driver_module.calculate_deviation_fixed(0, right)
+        adjusted = driver_module.adjust_deviation_fixed(deviation, driver.steering_thresholds_fixed)
+        representatives.setdefault(adjusted, deviation)
+    return sorted(representatives.values())
+
+
+def test_all_adjusted_deviations():
+    for driving_mode in DRIVING_MODES:
+        float_driver = driver_module.StraightAwareCenterLaneDriver(driving_mode)
+        fixed_driver = driver_module.StraightAwareCenterLaneDriver(driving_mode, fixed_point=True)
+        values = get_representative_deviations(fixed_driver)
+        for count in range(1, len(driver_module.CHECK_HEIGHTS) + 1):
+            for heights in itertools.combinations(driver_module.CHECK_HEIGHTS, count):
+                for deviations in itertools.product(values, repeat=count):
+                    fixed_deviations = list(zip(heights, deviations))
+                    float_deviations = [(height, deviation / driver_module.DEVIATION_SCALE)
+                                        for height, deviation in fixed_deviations]
+                    steering = float_driver.calculate_steering(float_deviations)
+                    assert fixed_driver.calculate_steering(fixed_deviations) == steering
+                    # The branch without a crossing guess halves the steering
+                    assert float_driver.calculate_speed(steering * 0.5, 50) == \
+                        fixed_driver.calculate_speed(fixed_driver.calculate_steering(fixed_deviations) * 0.5, 50)
+
+
+def test_traces_of_rendered_frames():
+    for driving_mode in DRIVING_MODES:
+        result = host_runner.run_main(track_frames.drive(TRACE_FRAMES, seed=driving_mode), preprocessed=False,
+                                      driving_mode=driving_mode)
+        paths = glob.glob(os.path.join(result["sdcard"], "clips", "*", "telemetry.bin"))
+        assert len(paths) == 1
+        telemetry = load_telemetry(paths[0])
+        frames = [get_lanes(telemetry, index) for index in range(len(telemetry["frame"]))]
+        assert len(frames) == TRACE_FRAMES
+        check_trace(driving_mode, frames)
+
+
+def test_recorded_telemetry():
+    for path in glob.glob(os.path.join(host_runner.SOURCE, "*.bin")):
+        telemetry = load_telemetry(path)
+        frames = [get_lanes(telemetry, index) for index in range(len(telemetry["frame"]))]
+        for driving_mode in DRIVING_MODES:
+            check_trace(driving_mode, frames)
+
+
+def test_random_lanes():
+    rng = random.Random(SEED)
+    heights = list(range(40, 100, 5))
+    frames = []
+    for _ in range(RANDOM_FRAMES):
+        center = rng.randrange(20, 140)
+        width = rng.randrange(40, 140)
+        left_lane = [(y, center - width // 2 + rng.randrange(-6, 7)) for y in heights if rng.random() < 0.7]
+        right_lane = [(y, center + width // 2 + rng.randrange(-6, 7)) for y in heights if rng.random() < 0.7]
+        frames.append((left_lane, right_lane, rng.randrange(0, 120)))
+    for driving_mode in DRIVING_MODES:
+        check_trace(driving_mode, frames)
+
+
+if __name__ == "__main__":
+    test_all_adjusted_deviations()
+    test_traces_of_rendered_frames()
+    test_recorded_telemetry()
+    test_random_lanes()
+    print("All fixed-point steering checks passed")
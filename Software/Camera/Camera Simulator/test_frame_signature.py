@@ -0,0 +1,64 @@
+"""
+Checks the frame signature of BitmapPixelGetter (lane_recognition, hash_rows of kernels.py) on a PC (run with
+pytest or directly with python). The FrameSkipper of common.py only reuses results of a frame with the same
+signature, so every change inside the regions of interest has to change it.
+"""
+import random
+
+import numpy as np
+
+import host_runner
+
+host_runner.setup_paths()
+
+from bitmap_image import BitmapImage, generate_random_bitmaps
+from libraries.lane_recognition import BitmapPixelGetter
+from libraries.lane_recognition import kernels
+
+SEED = 7
+BITMAPS = 200
+SIZES = [(160, 120), (80, 60), (33, 7)] # The last one has a row that ends inside a 32-bit word
+ROIS = [(0, 43, 160, 4), (8, 58, 144, 4), (0, 83, 160, 4)] # Bands of a lane recognition (x, y, w, h)
+
+
+def test_signature_changes_with_every_byte():
+    rng = random.Random(SEED)
+    for img in generate_random_bitmaps(BITMAPS, SIZES, SEED):
+        data = img.bytearray()
+        stride = ((img.width() + 31) // 32) * 4
+        signature = kernels.hash_rows_python(data, stride, 0, stride, 0, img.height(), 0)
+        for _ in range(20):
+            i = rng.randrange(len(data))
+            original = data[i]
+            data[i] = (original + rng.randrange(1, 256)) & 0xFF
+            assert kernels.hash_rows_python(data, stride, 0, stride, 0, img.height(), 0) != signature
+            data[i] = original
+
+
+def test_signature_covers_the_regions_of_interest():
+    rng = np.random.default_rng(SEED)
+    pixel_getter = BitmapPixelGetter()
+    pixels = rng.random((120, 160)) < 0.1
+    img = BitmapImage(pixels)
+    pixel_getter.set_image(img)
+    signature = pixel_getter.get_signature(img, ROIS)
+    for x, y, w, h in ROIS:
+        for _ in range(20):
+            changed = pixels.copy()
+            changed_x, changed_y = x + int(rng.integers(w)), y + int(rng.integers(h))
+            changed[changed_y, changed_x] = not changed[changed_y, changed_x]
+            changed_img = BitmapImage(changed)
+            pixel_getter.set_image(changed_img)
+            assert pixel_getter.get_signature(changed_img, ROIS) != signature
+    # Rows outside of the regions do not change the signature
+    changed = pixels.copy()
+    changed[:40] = ~changed[:40]
+    changed_img = BitmapImage(changed)
+    pixel_getter.set_image(changed_img)
+    assert pixel_getter.get_signature(changed_img, ROIS) == signature
+
+
+if __name__ == "__main__":
+    test_signature_changes_with_every_byte()
+    test_signature_covers_the_regions_of_interest()
+    print("All frame signature checks passed")
@@ -0,0 +1,31 @@
+"""
+Checks the scan kernels of lane_recognition/kernels.py on a PC (run with pytest or directly with python).
+
+check_kernels() compares the exported kernels with the Python versions on random bitmaps. On a PC the exported
+kernels are the Python versions, the viper versions can only be checked on the camera, see CHECK_KERNELS in
+OpenMV/main.py. The scans of BitmapPixelGetter are checked by test_bitmap_pixel_getter.py, the signature by
+test_frame_signature.py.
+"""
+import host_runner
+
+host_runner.setup_paths()
+
+from bitmap_image import generate_random_bitmaps
+from libraries.lane_recognition import kernels
+
+SEED = 7
+BITMAPS = 200
+SIZES = [(160, 120), (80, 60), (33, 7)] # The last one has a row that ends inside a 32-bit word
+
+
+def test_exported_kernels_match_python():
+    # On a PC the exported kernels are the Python versions, on the camera check_kernels() compares the viper versions
+    for img in generate_random_bitmaps(BITMAPS, SIZES, SEED):
+        data = memoryview(img.bytearray())
+        stride = ((img.width() + 31) // 32) * 4
+        assert kernels.check_kernels(data, stride, img.width(), img.height()) == 0
+
+
+if __name__ == "__main__":
+    test_exported_kernels_match_python()
+    print("All kernel checks passed")
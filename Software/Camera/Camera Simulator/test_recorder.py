@@ -0,0 +1,58 @@
+"""
+Checks the time budget of the Recorder base class (OpenMV/recording) on a PC (run with pytest or directly with
+python). The budget is measured from the call of service(), so a slow frame must not stop the recording.
+"""
+import time
+
+import host_runner
+
+host_runner.setup_paths()
+
+from libraries.recording.Recorder import Recorder
+
+
+class SlowRecorder(Recorder):
+    """
+    Recorder whose writes take write_ms, the written frames are collected in a list.
+    """
+    def __init__(self, budget_ms, write_ms):
+        super().__init__(1, budget_ms)
+        self.write_ms = write_ms
+        self.written = []
+
+    def copy_frame(self, slot, frame):
+        return frame
+
+    def write_frame(self, slot):
+        time.sleep_ms(self.write_ms)
+        self.written.append(slot)
+        self.written_frames += 1
+
+
+def test_slow_frames_are_still_written():
+    recorder = SlowRecorder(budget_ms=10, write_ms=1)
+    for frame in range(20):
+        recorder.submit(frame)
+        time.sleep_ms(15) # The rest of the frame took longer than the budget
+        recorder.service()
+    assert recorder.written == list(range(20))
+    assert recorder.dropped_frames == 0
+
+
+def test_service_stops_at_the_budget_and_counts_drops():
+    recorder = SlowRecorder(budget_ms=5, write_ms=8)
+    for frame in range(3):
+        recorder.submit(frame)
+    start = time.ticks_ms()
+    recorder.service() # Only the first write fits into the budget, it is always started
+    assert time.ticks_diff(time.ticks_ms(), start) < 16
+    assert recorder.written == [1] # Frame 0 was dropped when frame 2 arrived
+    assert recorder.dropped_frames == 1
+    recorder.service()
+    assert recorder.written == [1, 2]
+
+
+if __name__ == "__main__":
+    test_slow_frames_are_still_written()
+    test_service_stops_at_the_budget_and_counts_drops()
+    print("All recorder checks passed")
@@ -0,0 +1,64 @@
+"""
+Checks the frames of SPITeensy (OpenMV/communication_management) with the loopback machine.SPI stand-in of
+host_modules (run with pytest or directly with python): every sent frame is read back and decoded with
+decode_frame(), which is what the Teensy does with the received bytes (see Samples/SPI Sample/SPI_teensy).
+"""
+import importlib
+
+import host_runner
+
+host_runner.setup_paths()
+
+from libraries.communication_management import get_communication_manager
+
+# The package exports the class SPITeensy under the name of the module
+spi_teensy = importlib.import_module("libraries.communication_management.SPITeensy")
+
+FRAMES = 300
+
+
+def send_frame(communication, speed, steering):
+    """
+    Sends one frame and returns the bytes the slave received.
+    """
+    communication.send_movement_data(speed, steering)
+    return communication.spi.read(spi_teensy.FRAME_SIZE)
+
+
+def test_frames_round_trip():
+    communication = get_communication_manager("SPITeensy", 0)
+    for i in range(FRAMES):
+        speed = (i * 7) % 120 - 10 # Includes values outside of 0 - 100, they are clamped
+        steering = (i * 13) % 110
+        communication.set_flag(spi_teensy.FLAG_FINISH_LINE, i % 5 == 0)
+        frame = send_frame(communication, speed, steering)
+        flags = spi_teensy.FLAG_FINISH_LINE if i % 5 == 0 else 0
+        assert spi_teensy.decode_frame(frame) == ((i + 1) & 0xFF, max(0, min(speed, 100)), min(steering, 100), flags)
+    assert communication.get_statistics()[:2] == (FRAMES, 0)
+    assert len(communication.spi.written) == FRAMES # One transaction per frame
+
+
+def test_flipped_bits_are_rejected():
+    communication = get_communication_manager("SPITeensy", 0)
+    frame = bytearray(send_frame(communication, 60, 40))
+    assert spi_teensy.decode_frame(frame) is not None
+    for bit in range(spi_teensy.FRAME_SIZE * 8):
+        frame[bit // 8] ^= 1 << (bit % 8)
+        assert spi_teensy.decode_frame(frame) is None
+        frame[bit // 8] ^= 1 << (bit % 8)
+
+
+def test_failed_transactions_are_counted():
+    communication = get_communication_manager("SPITeensy", 0)
+    communication.spi.fail_next = 2
+    for _ in range(3):
+        communication.send_movement_data(50, 50)
+    assert communication.get_statistics()[:2] == (1, 2)
+    assert communication.cs.value() == 1 # The slave is deselected after a failed transaction
+
+
+if __name__ == "__main__":
+    test_frames_round_trip()
+    test_flipped_bits_are_rejected()
+    test_failed_transactions_are_counted()
+    print("All SPI checks passed")
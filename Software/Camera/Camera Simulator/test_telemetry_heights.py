@@ -0,0 +1,50 @@
+"""
+Runs OpenMV/main.py with host_runner on rendered frames (track_frames.py) in QQVGA and QQQVGA and checks that the
+telemetry stores the lanes at its heights (run with pytest or directly with python). The lanes are converted
+into the reference image before they are logged, so the heights have to be rows of the reference image too.
+"""
+import glob
+import os
+
+import numpy as np
+
+import host_runner
+
+host_runner.setup_paths()
+
+import track_frames
+from log_reader import load_telemetry
+from telemetry import LANE_MISSING
+
+FRAMES = 30
+QQQVGA_SETTINGS = {mode: ("QQQVGA", 0, 120) for mode in range(3)}
+
+
+def run_telemetry(constants=None):
+    result = host_runner.run_main(track_frames.drive(FRAMES), preprocessed=False, constants=constants)
+    paths = glob.glob(os.path.join(result["sdcard"], "clips", "*", "telemetry.bin"))
+    assert len(paths) == 1
+    return load_telemetry(paths[0])
+
+
+def found_share(lane_x):
+    return np.count_nonzero(lane_x != LANE_MISSING) / lane_x.size
+
+
+def test_lanes_are_logged_in_qqqvga():
+    reference = run_telemetry()
+    telemetry = run_telemetry({"GEOMETRY_SETTINGS": QQQVGA_SETTINGS})
+    assert len(telemetry["frame"]) == FRAMES
+    assert list(telemetry["heights"]) == list(reference["heights"])
+    for side in ("left_x", "right_x"):
+        assert found_share(reference[side]) > 0.5
+        # Half the resolution finds the lanes at the same heights nearly as often as QQVGA
+        assert found_share(telemetry[side]) > 0.8 * found_share(reference[side])
+        found = (telemetry[side] != LANE_MISSING) & (reference[side] != LANE_MISSING)
+        difference = np.abs(telemetry[side][found].astype(int) - reference[side][found].astype(int))
+        assert np.median(difference) <= 2
+
+
+if __name__ == "__main__":
+    test_lanes_are_logged_in_qqqvga()
+    print("All telemetry height checks passed")
@@ -0,0 +1,39 @@
+"""
+Checks the writes of TelemetryLog (telemetry.py) on a PC (run with pytest or directly with python): every full
+block has to be readable before the log is closed, e.g. when the camera loses power.
+"""
+import os
+import tempfile
+
+import host_runner
+
+host_runner.setup_paths()
+
+from log_reader import load_telemetry
+from telemetry import TelemetryLog, BLOCK_SIZE, RECORD_SIZE
+
+HEIGHTS = [30, 60, 90]
+
+
+def log_frames(telemetry, first, count):
+    for frame in range(first, first + count):
+        telemetry.log(frame, frame * 20, [(30, 40)], [(60, 120)], 0, 50, 50, False, 0, 0, 0, 0, 0, 0, 0, False,
+                      0, 0, 0, 0)
+
+
+def test_full_blocks_are_readable_before_close():
+    path = os.path.join(tempfile.mkdtemp(prefix="rapid_telemetry_"), "telemetry.bin")
+    telemetry = TelemetryLog(path, HEIGHTS)
+    records_per_block = BLOCK_SIZE // RECORD_SIZE
+    log_frames(telemetry, 1, records_per_block + 3)
+    # The second block is still in the buffer
+    assert list(load_telemetry(path)["frame"]) == list(range(1, records_per_block + 1))
+    telemetry.close()
+    telemetry.close()
+    frames = load_telemetry(path)["frame"]
+    assert list(frames) == list(range(1, records_per_block + 4))
+
+
+if __name__ == "__main__":
+    test_full_blocks_are_readable_before_close()
+    print("All telemetry log checks passed")
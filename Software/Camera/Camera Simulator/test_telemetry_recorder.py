@@ -0,0 +1,101 @@
+"""
+Sends telemetry records with TelemetryStream (telemetry.py) through a pseudo terminal and records them with
+telemetry_recorder.py on a PC (run with pytest or directly with python, needs a system with os.openpty()).
+Print output, random bytes and a frame with a wrong crc16 are written in between, the recorded file has to
+contain exactly the sent records.
+"""
+import os
+import random
+import tempfile
+import threading
+import tty
+
+import numpy as np
+
+import host_runner
+
+host_runner.setup_paths()
+
+from log_reader import load_telemetry
+from telemetry import TelemetryLog, TelemetryStream, STREAM_TYPE_RECORD, STREAM_FRAME_HEADER_SIZE, RECORD_SIZE, \
+    BLOCK_SIZE, create_stream_frame, finish_stream_frame
+from telemetry_recorder import record_telemetry
+
+RECORDS = 250 # The header is sent again every STREAM_HEADER_INTERVAL records
+HEIGHTS = [45, 60, 70, 80, 85]
+SEED = 3
+
+
+class PtyPort:
+    """
+    Camera side of the pseudo terminal, writes everything like the USB serial port of the camera.
+    """
+    def __init__(self, fd):
+        self.fd = fd
+
+    def write(self, data):
+        data = memoryview(data)
+        while data:
+            data = data[os.write(self.fd, data):]
+
+
+def create_corrupted_frame(record):
+    frame = create_stream_frame(STREAM_TYPE_RECORD, RECORD_SIZE)
+    frame[STREAM_FRAME_HEADER_SIZE:STREAM_FRAME_HEADER_SIZE + RECORD_SIZE] = record
+    finish_stream_frame(frame)
+    frame[STREAM_FRAME_HEADER_SIZE + 3] ^= 0x10 # The crc16 does not match anymore
+    return frame
+
+
+def send_records(fd, sent):
+    """
+    Sends RECORDS records with garbage in between and closes the camera side. The sent records are added to sent.
+    """
+    rng = random.Random(SEED)
+    port = PtyPort(fd)
+    telemetry = TelemetryLog(None, HEIGHTS)
+    stream = TelemetryStream(telemetry.header, port)
+    port.write(b"Starting esc\r\n")
+    try:
+        for frame in range(1, RECORDS + 1):
+            left_lane = [(y, 40 + frame % 20) for y in HEIGHTS[:frame % len(HEIGHTS)]]
+            telemetry.log(frame, frame * 25, left_lane, [(60, 120)], 0, frame % 101, 50, False, 100, 2000, 3000,
+                          500, 6000, 0, 100000, False, 0, frame // 50, 0, 0)
+            stream.send(telemetry.record)
+            sent.append(bytes(telemetry.record))
+            if frame % 17 == 0:
+                port.write("Main Loop Crash: frame {}\r\n".format(frame).encode())
+            if frame % 23 == 0:
+                port.write(bytes(rng.randrange(256) for _ in range(rng.randrange(1, 40))))
+            if frame % 31 == 0:
+                port.write(create_corrupted_frame(telemetry.record))
+    finally:
+        os.close(fd)
+
+
+def test_recorded_records_match_sent_records():
+    master, slave = os.openpty()
+    tty.setraw(slave) # No line ending conversion, the stream is binary
+    sent = []
+    thread = threading.Thread(target=send_records, args=(slave, sent))
+    thread.start()
+    path = os.path.join(tempfile.mkdtemp(prefix="rapid_telemetry_"), "telemetry.bin")
+    with os.fdopen(master, "rb", buffering=0) as stream:
+        records, skipped = record_telemetry(stream, path)
+    thread.join()
+
+    assert records == RECORDS == len(sent)
+    assert skipped > 0
+    with open(path, "rb") as file:
+        data = file.read()
+    assert data[BLOCK_SIZE:BLOCK_SIZE + RECORDS * RECORD_SIZE] == b"".join(sent)
+    telemetry = load_telemetry(path)
+    assert list(telemetry["frame"]) == list(range(1, RECORDS + 1))
+    assert list(telemetry["speed"]) == [frame % 101 for frame in range(1, RECORDS + 1)]
+    assert list(telemetry["heights"]) == HEIGHTS
+    assert np.all(telemetry["right_x"][:, 1] == 120)
+
+
+if __name__ == "__main__":
+    test_recorded_records_match_sent_records()
+    print("All telemetry recorder checks passed")
@@ -0,0 +1,111 @@
+"""
+Streams frames of the sensor stand-in (rendered by track_frames.py) with WiFiStreamer (OpenMV/recording) to
+127.0.0.1 on a PC (run with pytest or directly with python). A fast receiver (stream_receiver.py) has to get
+every sent frame as a jpeg of the sensor size, a slow receiver has to make the streamer lower the jpeg quality
+and raise the decimation.
+"""
+import os
+import socket
+import tempfile
+import threading
+
+import cv2
+
+import host_runner
+
+host_runner.setup_paths()
+
+# noinspection PyUnresolvedReferences
+import sensor
+# noinspection PyUnresolvedReferences
+import time
+import track_frames
+from libraries.recording.WiFiStreamer import WiFiStreamer, MAX_QUALITY
+from stream_receiver import receive_stream, read_until
+
+FRAME_MS = 10 # Duration of the rest of the main loop
+RECEIVED_FRAMES = 20
+
+
+def create_streamer():
+    sensor.reset()
+    sensor.set_framesize(sensor.QQVGA)
+    sensor.set_source(track_frames.drive(10000))
+    streamer = WiFiStreamer(0, host="127.0.0.1", access_point=False) # Port 0: A free port
+    return streamer, streamer.server.getsockname()[1]
+
+
+def stream_while(streamer, thread, send_buffer=None):
+    """
+    Runs the main loop part of the streamer until the receiver thread has finished. send_buffer limits the socket
+    buffer of the client connection (bytes), the buffers of 127.0.0.1 are much bigger than on the camera.
+    """
+    frames = 0
+    while thread.is_alive():
+        streamer.submit(sensor.snapshot())
+        client = streamer.client
+        streamer.service()
+        if send_buffer and client is None and streamer.client is not None: # The client was accepted
+            streamer.client.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, send_buffer)
+        time.sleep_ms(FRAME_MS)
+        frames += 1
+        assert frames < 3000, "The receiver does not finish"
+    return frames
+
+
+def test_fast_receiver_gets_every_frame():
+    streamer, port = create_streamer()
+    output_folder = tempfile.mkdtemp(prefix="rapid_stream_")
+    received = []
+    thread = threading.Thread(target=lambda: received.extend(
+        receive_stream("127.0.0.1", port, output_folder, max_frames=RECEIVED_FRAMES, timeout=5)))
+    thread.start()
+    try:
+        stream_while(streamer, thread)
+    finally:
+        streamer.close()
+    thread.join()
+    assert len(received) == RECEIVED_FRAMES
+    for index, (_, size) in enumerate(received):
+        path = os.path.join(output_folder, "frame_{:05d}.jpg".format(index))
+        assert os.path.getsize(path) == size
+        assert cv2.imread(path, cv2.IMREAD_GRAYSCALE).shape == (sensor.height(), sensor.width())
+    assert streamer.quality == MAX_QUALITY and streamer.decimation == 1
+
+
+def receive_slowly(port, seconds, chunk_size=512, pause_ms=20):
+    """
+    Reads the stream in small chunks with pauses, so the socket buffers of the streamer fill up.
+    """
+    connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    connection.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    connection.connect(("127.0.0.1", port))
+    connection.sendall(b"GET / HTTP/1.1\r\n\r\n")
+    read_until(connection, b"", b"\r\n\r\n")
+    end = time.ticks_add(time.ticks_ms(), int(seconds * 1000))
+    while time.ticks_diff(end, time.ticks_ms()) > 0:
+        if not connection.recv(chunk_size):
+            break
+        time.sleep_ms(pause_ms)
+    connection.close()
+
+
+def test_slow_receiver_lowers_quality_and_decimation():
+    streamer, port = create_streamer()
+    thread = threading.Thread(target=receive_slowly, args=(port, 3))
+    thread.start()
+    try:
+        stream_while(streamer, thread, send_buffer=4096)
+        sent_frames, dropped_frames, _, quality, decimation = streamer.get_statistics()
+    finally:
+        streamer.close()
+    thread.join()
+    assert dropped_frames > 0 and sent_frames > 0
+    assert quality < MAX_QUALITY
+    assert decimation > 1
+
+
+if __name__ == "__main__":
+    test_fast_receiver_gets_every_frame()
+    test_slow_receiver_lowers_quality_and_decimation()
+    print("All streamer checks passed")
@@ -0,0 +1,57 @@
+"""
+Renders simple camera frames of the track on a PC: two bright lane lines on a dark road in QQVGA (160x120
+grayscale). Used by the tests as source of sensor.snapshot() (see host_runner.run_main()) when no recorded
+clip is at hand.
+"""
+import numpy as np
+
+WIDTH = 160
+HEIGHT = 120
+ROAD = 60 # Gray value of the road
+LANE = 230 # Gray value of the lane lines
+LANE_WIDTH = 4 # Width of a lane line in pixels
+
+
+def lane_positions(y, shift=0.0, curve=0.0):
+    """
+    Returns the x positions (left, right) of the lane lines in row y. shift moves both lines sideways, curve bends
+    them towards the top of the frame (positive: right turn).
+    """
+    distance = (HEIGHT - y) / HEIGHT # 0 at the bottom, 1 at the top of the frame
+    bend = curve * distance * distance * WIDTH
+    left = 40 - (y - HEIGHT / 2) * 0.3 + shift + bend
+    right = 120 + (y - HEIGHT / 2) * 0.3 + shift + bend
+    return int(left), int(right)
+
+
+def render_frame(shift=0.0, curve=0.0, gap=None):
+    """
+    Returns a frame (numpy array HEIGHT x WIDTH) of the track. gap = (first row, last row) leaves out the lane lines
+    between these rows, e.g. the gaps of a dashed line.
+    """
+    frame = np.full((HEIGHT, WIDTH), ROAD, np.uint8)
+    for y in range(HEIGHT):
+        if gap and gap[0] <= y <= gap[1]:
+            continue
+        for x in lane_positions(y, shift, curve):
+            start = max(0, x - LANE_WIDTH // 2)
+            end = min(WIDTH, x + LANE_WIDTH // 2)
+            if start < end:
+                frame[y, start:end] = LANE
+    return frame
+
+
+def drive(count, seed=0):
+    """
+    Yields count frames of a drive over the track: the car sways between the lanes, the track alternates between
+    straights and curves in both directions and has gaps in the lane lines.
+    """
+    rng = np.random.default_rng(seed)
+    for i in range(count):
+        shift = 12 * np.sin(i / 7) + rng.normal(0, 1)
+        curve = 0.25 * np.sin(i / 23)
+        gap = None
+        if i % 9 == 4:
+            start = int(rng.integers(0, HEIGHT - 20))
+            gap = (start, start + 15)
+        yield render_frame(shift, curve, gap)
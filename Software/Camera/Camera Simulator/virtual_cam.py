@@ -10,6 +10,8 @@ from tkinter import Tk, filedialog
 from Software.Camera.lane_recognition import *
 from Software.Camera.movement_params import *
 from Software.Camera.common import *
+from Software.Camera.frame_log import FRAME_LOG_EXTENSION
+from log_reader import read_bitmap_frames
 
 HEIGHT = 120
 WIDTH = 160
@@ -401,6 +403,25 @@ def get_frame_data(frame, data: json):
 
 # region Video processing -----------------------------------------------------------------
 
+def read_video_frames(input_video):
+    """
+    Yields the frames of the input video. Besides normal videos, bitmap logs (FRAME_LOG_EXTENSION) recorded
+    with the RECORDING_MODE "Bitmap" can be replayed. Their frames are exactly the pixels the camera used.
+    """
+    if input_video.endswith(FRAME_LOG_EXTENSION):
+        for _, _, frame in read_bitmap_frames(input_video):
+            yield frame
+        return
+
+    cap = cv2.VideoCapture(input_video)
+    while cap.isOpened():
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield frame
+    cap.release()
+
+
 def load_video(main_lane_recognition, secondary_lane_recognition, movement_params, input_video, output_video):
     """
     Load and process a video using OpenCV.
@@ -411,7 +432,6 @@ def load_video(main_lane_recognition, secondary_lane_recognition, movement_param
     in a window until the video ends or the user closes the window.
     """
 
-    cap = cv2.VideoCapture(input_video)
     # noinspection PyUnresolvedReferences
     fourcc = cv2.VideoWriter_fourcc(*'XVID')
     out = cv2.VideoWriter(output_video, fourcc, 30.0, (WIDTH, HEIGHT))
@@ -421,10 +441,7 @@ def load_video(main_lane_recognition, secondary_lane_recognition, movement_param
     json_compare_data = load_analysis_from_file()
     output_data = []
 
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
+    for frame in read_video_frames(input_video):
         json_compare_frame_data = get_frame_data(frame_count, json_compare_data)
         json_data = process_frame(frame, main_lane_recognition, secondary_lane_recognition, movement_params, json_compare_frame_data, frame_count)
         output_data.append(json_data)
@@ -437,7 +454,6 @@ def load_video(main_lane_recognition, secondary_lane_recognition, movement_param
 
     save_analysis_to_file(output_data)
 
-    cap.release()
     out.release()
     cv2.destroyAllWindows()
 
@@ -564,14 +580,14 @@ def select_video_file(last_path="", last_file=""):
     initial_dir = last_path if os.path.exists(last_path) else os.getcwd()
 
     if use_zenity():
-        return zenity_file_picker("Select Video File", initial_dir, "*.mp4")
+        return zenity_file_picker("Select Video File", initial_dir, "*.mp4 *" + FRAME_LOG_EXTENSION)
 
     Tk().withdraw()  # Hide root Tk window
     return filedialog.askopenfilename(
         title="Select Video File",
         initialdir=initial_dir,
         initialfile=last_file,
-        filetypes=[("MP4 Files", "*.mp4")],
+        filetypes=[("MP4 Files", "*.mp4"), ("Bitmap Logs", "*" + FRAME_LOG_EXTENSION)],
     )
 
 
@@ -3,6 +3,7 @@ import time
 import machine
 #noinspection PyUnresolvedReferences
 from machine import PWM, Timer
+from .EmergencyStop import EmergencyStop
 
 # region init values
 
@@ -21,56 +22,146 @@ servo_pwm = PWM(SERVO_PIN, freq=SERVO_FREQUENCY, duty_u16=0)
 # Max Servo speed (scaling factor)
 ESC_MAX_SPEED = 1
 
+# Calibration of the esc: Speed 1 - 100 is mapped to ESC_MIN_DUTY - ESC_MAX_DUTY, speed 0 writes 0
+ESC_MIN_DUTY = 3500
+ESC_MAX_DUTY = 4000
+
+# Calibration of the steering servo
+STEERING_LEFT = 6500 # Higher: Steers more to the left 6600, 3500 4825
+STEERING_RIGHT = 3600 # Lower: Steers more to the right
+STEERING_MID = 4750 # Change value for driving straight: Higher: More to the right, Lower: More to the left
+
 # Values for the servos
 esc_value = 0
 steering_value = 0
 
-# Timer for asynchronous updates
+# Timer for the safety refresh. The duties are written by send_movement_data() when they change, the timer only
+# rewrites them periodically. The servo and esc only read the duty once per period (50 Hz).
+# Set it to 100000 to measure the throughput of the main loop with the old 100 kHz update (same callback work)
+SAFETY_REFRESH_FREQUENCY = 50
 update_timer = Timer()
 
-# Trigger pin for stopping before a cube
+# Duty of the esc while the trigger pin is set (brake)
+BRAKE_DUTY = 3500
+
+# The esc is armed by holding ARMING_DUTY for ARMING_MS. The timer ends the arming, the setup does not wait for it
+ARMING_DUTY = 3000
+ARMING_MS = 2500
+
+# Trigger pin for stopping before a cube. It is handled by an interrupt (see EmergencyStop)
 TRIGGER_PIN = machine.Pin("P0", machine.Pin.IN, machine.Pin.PULL_DOWN)
+# False: The car drives again once the trigger pin is not set anymore (obstacle gone).
+# True: The car stays stopped after the trigger pin was set until release_emergency_stop() is called. main.py does
+# not call it, so a latched stop lasts until the camera is restarted
+LATCH_EMERGENCY_STOP = False
 
 # endregion
 
 class DirectPWM:
 
     def __init__(self, driving_mode):
+        self.esc_duty = None # The duties which were written last
+        self.servo_duty = None
+        self.emergency_stop = None
+        self.ready = False # False while the esc is arming
+        self.arming_start = 0
+        self.esc_duties = None # Duty for every speed 0 - 100
+        self.steering_duties = None # Duty for every steering value 0 - 100
+        self.build_duty_tables()
         self.setup_new_communication()
         self.driving_mode = driving_mode
 
 
     def setup_new_communication(self):
         """
-        Sets up the motor-esc and sets the steering value to 50 (straight).
-        Initializes a timer which updates the speed and steering 100 times per seconds.
+        Starts arming the motor-esc and sets the steering value to 50 (straight).
+        Initializes a timer which refreshes the speed and steering SAFETY_REFRESH_FREQUENCY times per second.
+        The arming is finished by the timer after ARMING_MS, this function returns immediately. Use is_ready()
+        to check whether the esc accepts movement data.
         """
         print("Starting esc")
-        # Start esc
-        start_time = time.ticks_ms()
-        while True:
-            esc_pwm.duty_u16(3000)
-            if (time.ticks_ms() - start_time) > 2500:
-                break
+        # The values after the arming are calculated now, the timer callback must not calculate them (no float math)
         self.set_esc_speed(0)
         self.set_steering_value(50)
+        servo_pwm.duty_u16(steering_value)
+        self.servo_duty = steering_value
 
-        update_timer.init(freq=100000, mode=Timer.PERIODIC, callback=self.update_pwm)
+        # Start esc
+        self.arming_start = time.ticks_ms()
+        esc_pwm.duty_u16(ARMING_DUTY)
+        self.esc_duty = ARMING_DUTY
+
+        self.emergency_stop = EmergencyStop(TRIGGER_PIN, self.brake, LATCH_EMERGENCY_STOP)
+
+        update_timer.init(freq=SAFETY_REFRESH_FREQUENCY, mode=Timer.PERIODIC, callback=self.update_pwm)
 
 
     def update_pwm(self, t):
         """
-        This function is called periodically by the timer to update the ESC and servo values
+        This function is called periodically by the timer to refresh the ESC and servo values
+        While the esc is arming, it holds the arming duty until ARMING_MS are over.
         """
-        #if self.driving_mode == 2 or self.driving_mode == 3:
-        #print(TRIGGER_PIN.value())
-        if TRIGGER_PIN.value() == 1:
-            esc_pwm.duty_u16(3500)
+        if not self.ready:
+            if time.ticks_diff(time.ticks_ms(), self.arming_start) < ARMING_MS:
+                esc_pwm.duty_u16(ARMING_DUTY)
+                return
+            self.ready = True # Arming finished, the values set in the setup are written below
+        if self.emergency_stop.stopped:
+            self.brake()
             return
         esc_pwm.duty_u16(esc_value)
         servo_pwm.duty_u16(steering_value)
+        self.esc_duty = esc_value
+        self.servo_duty = steering_value
+        if self.emergency_stop.stopped: # The interrupt braked before the esc duty above was written
+            self.brake()
 
+    def write_pwm(self):
+        """
+        Writes the ESC and servo values, but only the ones which changed since the last write.
+        Nothing is written while the esc is arming, the timer writes the latest values once it is ready.
+        The interrupt of the trigger pin can brake between the check of the emergency stop and the write of the
+        esc duty, so the stop is checked again after the write and the brake is repeated.
+        """
+        if not self.ready:
+            return
+        if self.emergency_stop.stopped:
+            if self.esc_duty != BRAKE_DUTY:
+                self.brake()
+            return
+        if esc_value != self.esc_duty:
+            esc_pwm.duty_u16(esc_value)
+            self.esc_duty = esc_value
+            if self.emergency_stop.stopped:
+                self.brake()
+        if steering_value != self.servo_duty:
+            servo_pwm.duty_u16(steering_value)
+            self.servo_duty = steering_value
+
+    def brake(self):
+        """
+        Writes the brake duty to the esc. Called by the interrupt of the trigger pin, so it must not allocate memory.
+        The arming is not interrupted, the timer applies the stop once the esc is ready.
+        """
+        if not self.ready:
+            return
+        esc_pwm.duty_u16(BRAKE_DUTY)
+        self.esc_duty = BRAKE_DUTY
 
+    def is_ready(self):
+        """
+        Returns True once the esc is armed and accepts movement data.
+        """
+        return self.ready
+
+    def release_emergency_stop(self):
+        """
+        Releases a latched emergency stop if the trigger pin is not set anymore.
+
+        Returns:
+            bool: True if the car is allowed to drive again
+        """
+        return self.emergency_stop.release()
 
     def send_movement_data(self, speed, steering):
         """
@@ -79,39 +170,69 @@ class DirectPWM:
         # This function will be called from main.py when a new value is processed
         self.set_esc_speed(speed)
         self.set_steering_value(steering)
+        self.write_pwm()
 
     def set_esc_speed(self, speed):
         """
-        Updates the esc speed by translating the value to the corresponding PWM value.
+        Updates the esc speed by looking up the corresponding PWM value (speed: int 0 - 100).
         """
         global esc_value
-        speed = max(0, min(speed, 100))
-        if speed == 0:
-            esc_value = 0
-            return
-        speed = speed * ESC_MAX_SPEED
-        esc_value = int(self.map_value(speed, 3500, 4000))
+        esc_value = self.esc_duties[max(0, min(speed, 100))]
 
     def set_steering_value(self, steering):
         """
-        Updates the steering value by translating the value to the corresponding PWM value.
+        Updates the steering value by looking up the corresponding PWM value (steering: int 0 - 100).
         """
         global steering_value
-        steering = max(0, min(steering, 100))
+        steering_value = self.steering_duties[max(0, min(steering, 100))]
+
+    def set_calibration(self, steering_left=None, steering_mid=None, steering_right=None, esc_max_speed=None):
+        """
+        Changes the calibration of the servo and / or the esc and rebuilds the duty tables.
+        Values which are not given are kept.
+        """
+        global STEERING_LEFT, STEERING_MID, STEERING_RIGHT, ESC_MAX_SPEED
+        if steering_left is not None:
+            STEERING_LEFT = steering_left
+        if steering_mid is not None:
+            STEERING_MID = steering_mid
+        if steering_right is not None:
+            STEERING_RIGHT = steering_right
+        if esc_max_speed is not None:
+            ESC_MAX_SPEED = esc_max_speed
+        self.build_duty_tables()
+
+    def build_duty_tables(self):
+        """
+        Calculates the duty for every speed and steering value (0 - 100) once, so sending the movement data
+        only needs two table lookups and no float math.
+        """
+        self.esc_duties = [self.calculate_esc_duty(speed) for speed in range(101)]
+        self.steering_duties = [self.calculate_steering_duty(steering) for steering in range(101)]
+
+    def calculate_esc_duty(self, speed):
+        """
+        Translates the esc speed (0 - 100) to the corresponding PWM value.
+        """
+        if speed == 0:
+            return 0
+        speed = speed * ESC_MAX_SPEED
+        return int(self.map_value(speed, ESC_MIN_DUTY, ESC_MAX_DUTY))
+
+    def calculate_steering_duty(self, steering):
+        """
+        Translates the steering value (0 - 100) to the corresponding PWM value.
+        The servo is calibrated separately for the left and the right side of STEERING_MID.
+        """
         steering = 100 - steering
 
         """
         For steering:
         The lower the number
         """
-        steering_left = 6500 # Higher: Steers more to the left 6600, 3500 4825
-        steering_right = 3600 # Lower: Steers more to the right
-        steering_mid = 4750 # Change value for driving straight: Higher: More to the right, Lower: More to the left
-
         if steering < 50:
-            steering_value = int(self.map_value(steering, steering_right, steering_mid, in_min=0, in_max=49))
-        else:
-            steering_value = int(self.map_value(steering, steering_mid, steering_left, in_min=50, in_max = 100))
+            return int(self.map_value(steering, STEERING_RIGHT, STEERING_MID, in_min=0, in_max=49))
+        return int(self.map_value(steering, STEERING_MID, STEERING_LEFT, in_min=50, in_max = 100))
 
     def map_value(self, input_value, out_min, out_max, in_min=0, in_max=100):
         """
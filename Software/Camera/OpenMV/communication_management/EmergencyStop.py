@@ -0,0 +1,52 @@
+# noinspection PyUnresolvedReferences
+import machine
+
+
+class EmergencyStop:
+    """
+    Watches the trigger pin of the Teensy (obstacle in front of the car) with a pin interrupt.
+
+    On the rising edge on_stop() is called immediately (e.g. to write the brake duty) and the stop state is
+    latched. The communication manager checks self.stopped before it writes new values.
+    If latch is True, the stop state is kept after the falling edge until release() is called.
+    If latch is False, the falling edge releases the stop state (the car drives again once the obstacle is gone).
+
+    The interrupt handler does not allocate memory, so it also works as a hard interrupt.
+    """
+
+    def __init__(self, pin, on_stop, latch=True):
+        self.pin = pin
+        self.on_stop = on_stop
+        self.latch = latch
+        self.active = False # The trigger pin is set right now
+        self.stopped = False # The car has to stop
+        self.stop_count = 0 # Number of rising edges
+        self.pin.irq(handler=self.handle_irq, trigger=machine.Pin.IRQ_RISING | machine.Pin.IRQ_FALLING)
+        if self.pin.value() == 1: # The pin was already set before the interrupt was enabled
+            self.handle_irq(self.pin)
+
+    def handle_irq(self, pin):
+        """
+        Interrupt handler for both edges of the trigger pin.
+        """
+        if pin.value() == 1:
+            if not self.active:
+                self.stop_count += 1
+            self.active = True
+            self.stopped = True
+            self.on_stop()
+        else:
+            self.active = False
+            if not self.latch:
+                self.stopped = False
+
+    def release(self):
+        """
+        Releases a latched stop. Only possible while the trigger pin is not set.
+
+        Returns:
+            bool: True if the car is allowed to drive again
+        """
+        if not self.active:
+            self.stopped = False
+        return not self.stopped
@@ -0,0 +1,137 @@
+import time
+# noinspection PyUnresolvedReferences
+import machine
+from .SPITeensy import FRAME_SIZE, encode_frame
+
+# region init values
+
+# Pinout: P4: SCL, P5: SDA (the start mode pins of main.py have to be moved when this manager is used)
+I2C_BUS = 1
+I2C_FREQUENCY = 50000
+SLAVE_ADDRESS = 0x12
+
+MAX_BACKOFF_FRAMES = 32 # After an error, the next 1, 2, 4, ... MAX_BACKOFF_FRAMES frames are not sent
+RESET_AFTER_ERRORS = 3 # The bus is created again after this many errors in a row
+LOG_INTERVAL_MS = 5000 # The error counters are written to LOG_FILE at most once per interval
+LOG_FILE = "/sdcard/i2c_log.txt"
+
+# endregion
+
+
+class I2CTeensy:
+    """
+    Sends the movement data to the Teensy via I2C.
+
+    The payload is the same frame as the one of SPITeensy (sync, sequence, speed, steering, flags, crc8).
+    It is encoded into a preallocated bytearray. If a transfer fails, the following frames are skipped
+    with a growing backoff (no sleeping, the main loop keeps running) and the bus is created again after
+    RESET_AFTER_ERRORS errors in a row. Errors are counted in memory and only written to LOG_FILE every
+    LOG_INTERVAL_MS.
+    """
+
+    def __init__(self, driving_mode):
+        self.driving_mode = driving_mode
+        self.i2c = None
+        self.frame = bytearray(FRAME_SIZE)
+        self.sequence = 0
+        self.flags = 0
+
+        # Backoff
+        self.backoff = 0 # Current backoff in frames
+        self.skip_frames = 0 # Frames that are still skipped
+        self.consecutive_errors = 0
+
+        # Counters
+        self.sent_frames = 0
+        self.skipped_frames = 0
+        self.error_count = 0
+        self.reset_count = 0
+        self.last_error = None
+        self.logged_error_count = 0
+        self.last_log_time = None # The first error is logged immediately
+        self.setup_new_communication()
+
+    def setup_new_communication(self):
+        """
+        Creates the I2C bus. Called again after repeated errors, it does not wait.
+        """
+        self.i2c = machine.I2C(I2C_BUS, freq=I2C_FREQUENCY)
+
+    def is_ready(self):
+        """
+        The Teensy controls the esc, so the camera can send data immediately.
+        """
+        return True
+
+    def set_flag(self, flag, enabled=True):
+        """
+        Sets or clears a flag (FLAG_... of SPITeensy) that is sent with every following frame.
+        """
+        if enabled:
+            self.flags |= flag
+        else:
+            self.flags &= ~flag
+
+    def send_movement_data(self, speed, steering):
+        """
+        Sends the movement data unless the frame is skipped because of a previous error.
+        """
+        if self.skip_frames > 0:
+            self.skip_frames -= 1
+            self.skipped_frames += 1
+            return
+        self.sequence = (self.sequence + 1) & 0xFF
+        encode_frame(self.frame, self.sequence, speed, steering, self.flags)
+        try:
+            self.i2c.writeto(SLAVE_ADDRESS, self.frame)
+        except OSError as exception:
+            self.handle_error(exception)
+            return
+        self.sent_frames += 1
+        self.consecutive_errors = 0
+        self.backoff = 0
+        self.log_errors() # Errors which were not logged because of the rate limit
+
+    def handle_error(self, exception):
+        """
+        Counts the error and sets the backoff. The bus is created again after RESET_AFTER_ERRORS errors in a row.
+        """
+        self.error_count += 1
+        self.consecutive_errors += 1
+        self.last_error = exception
+        self.backoff = min(MAX_BACKOFF_FRAMES, self.backoff * 2) if self.backoff else 1
+        self.skip_frames = self.backoff
+        if self.consecutive_errors >= RESET_AFTER_ERRORS:
+            self.consecutive_errors = 0
+            self.reset_count += 1
+            try:
+                self.setup_new_communication()
+            except OSError as reset_exception:
+                self.last_error = reset_exception
+        self.log_errors()
+
+    def log_errors(self):
+        """
+        Writes the error counters to LOG_FILE if there are new errors and the last write is at least
+        LOG_INTERVAL_MS ago. Without new errors it only compares two counters.
+        """
+        if self.error_count == self.logged_error_count:
+            return
+        now = time.ticks_ms()
+        if self.last_log_time is not None and time.ticks_diff(now, self.last_log_time) < LOG_INTERVAL_MS:
+            return
+        self.last_log_time = now
+        try:
+            with open(LOG_FILE, "a") as log:
+                log.write("I2C errors: {} (+{}), resets: {}, skipped frames: {}, last error: {}\n".format(
+                    self.error_count, self.error_count - self.logged_error_count, self.reset_count,
+                    self.skipped_frames, self.last_error))
+            self.logged_error_count = self.error_count
+        except OSError:
+            pass
+
+    def get_statistics(self):
+        """
+        Returns the counters: (sent frames, errors, skipped frames, resets)
+        """
+        return self.sent_frames, self.error_count, self.skipped_frames, self.reset_count
@@ -0,0 +1,149 @@
+import time
+# noinspection PyUnresolvedReferences
+import machine
+
+# region init values
+
+SPI_BUS = 1
+SPI_BAUDRATE = 115200
+CS_PIN = "P3" # Chip select, active low
+
+# Frame: sync, sequence, speed, steering, flags, crc8 (over all bytes before it)
+FRAME_SYNC = 0xA5
+FRAME_SIZE = 6
+CRC8_POLYNOMIAL = 0x07
+
+# Flags of a frame
+FLAG_FINISH_LINE = 0x01 # The finish line was detected
+FLAG_STOP = 0x02 # The camera requests a stop (e.g. after a crash of the main loop)
+
+
+def create_crc8_table(polynomial):
+    """
+    Calculates the table for a bytewise CRC8 (MSB first, initial value 0).
+    """
+    table = bytearray(256)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 0x80:
+                crc = ((crc << 1) ^ polynomial) & 0xFF
+            else:
+                crc = (crc << 1) & 0xFF
+        table[i] = crc
+    return bytes(table)
+
+
+CRC8_TABLE = create_crc8_table(CRC8_POLYNOMIAL)
+
+# endregion
+
+
+def crc8(data, length):
+    """
+    Returns the CRC8 of the first length bytes of data.
+    """
+    crc = 0
+    for i in range(length):
+        crc = CRC8_TABLE[crc ^ data[i]]
+    return crc
+
+
+def encode_frame(frame, sequence, speed, steering, flags):
+    """
+    Writes a frame into the preallocated bytearray frame (FRAME_SIZE bytes).
+    Speed and steering are clamped to 0 - 100.
+    """
+    frame[0] = FRAME_SYNC
+    frame[1] = sequence & 0xFF
+    frame[2] = max(0, min(speed, 100))
+    frame[3] = max(0, min(steering, 100))
+    frame[4] = flags & 0xFF
+    frame[5] = crc8(frame, FRAME_SIZE - 1)
+
+
+def decode_frame(frame):
+    """
+    Decodes a received frame. This is what the Teensy has to do with the received bytes.
+
+    Returns:
+        tuple: (sequence, speed, steering, flags) or None if the sync byte or the checksum is wrong
+    """
+    if len(frame) < FRAME_SIZE or frame[0] != FRAME_SYNC:
+        return None
+    if crc8(frame, FRAME_SIZE - 1) != frame[FRAME_SIZE - 1]:
+        return None
+    return frame[1], frame[2], frame[3], frame[4]
+
+
+class SPITeensy:
+    """
+    Sends the movement data to the Teensy via SPI.
+
+    Every call of send_movement_data() sends one frame of FRAME_SIZE bytes in a single transaction.
+    The frame is encoded into a preallocated bytearray, so sending does not allocate memory.
+    Errors and the duration of the transactions are counted, nothing is logged in the main loop.
+    """
+
+    def __init__(self, driving_mode):
+        self.driving_mode = driving_mode
+        self.spi = None
+        self.cs = None
+        self.frame = bytearray(FRAME_SIZE)
+        self.sequence = 0
+        self.flags = 0
+
+        # Counters
+        self.sent_frames = 0
+        self.error_count = 0
+        self.last_latency_us = 0
+        self.max_latency_us = 0
+        self.setup_new_communication()
+
+    def setup_new_communication(self):
+        """
+        Sets up the SPI bus and the chip select pin.
+        """
+        self.spi = machine.SPI(SPI_BUS, baudrate=SPI_BAUDRATE, polarity=0, phase=0)
+        self.cs = machine.Pin(CS_PIN, machine.Pin.OUT)
+        self.cs.value(1) # CS starts inactive (HIGH)
+
+    def is_ready(self):
+        """
+        The Teensy controls the esc, so the camera can send data immediately.
+        """
+        return True
+
+    def set_flag(self, flag, enabled=True):
+        """
+        Sets or clears a flag (FLAG_...) that is sent with every following frame.
+        """
+        if enabled:
+            self.flags |= flag
+        else:
+            self.flags &= ~flag
+
+    def send_movement_data(self, speed, steering):
+        """
+        Encodes the movement data into the frame and sends it in one transaction.
+        """
+        self.sequence = (self.sequence + 1) & 0xFF
+        encode_frame(self.frame, self.sequence, speed, steering, self.flags)
+        start = time.ticks_us()
+        try:
+            self.cs.value(0) # Select the SPI slave (CS LOW)
+            self.spi.write(self.frame)
+            self.sent_frames += 1
+        except OSError:
+            self.error_count += 1
+        finally:
+            self.cs.value(1)
+        self.last_latency_us = time.ticks_diff(time.ticks_us(), start)
+        if self.last_latency_us > self.max_latency_us:
+            self.max_latency_us = self.last_latency_us
+
+    def get_statistics(self):
+        """
+        Returns the counters: (sent frames, errors, last latency in us, max latency in us)
+        """
+        return self.sent_frames, self.error_count, self.last_latency_us, self.max_latency_us
@@ -1,8 +1,14 @@
 from .DirectPWM import DirectPWM
+from .SPITeensy import SPITeensy
+from .I2CTeensy import I2CTeensy
 
 
 def get_communication_manager(instance_name, driving_mode = 0):
     if instance_name == "DirectPWM":
         return DirectPWM(driving_mode)
+    elif instance_name == "SPITeensy":
+        return SPITeensy(driving_mode)
+    elif instance_name == "I2CTeensy":
+        return I2CTeensy(driving_mode)
     else:
         raise ValueError("Unknown communication manager")
\ No newline at end of file
@@ -1,11 +1,12 @@
 import time
+import gc
 # noinspection PyUnresolvedReferences
 import sensor
 # noinspection PyUnresolvedReferences
 import machine
-import os
 # noinspection PyUnresolvedReferences
-import mjpeg
+import image
+import os
 # noinspection PyUnresolvedReferences
 from libraries.lane_recognition import *
 # noinspection PyUnresolvedReferences
@@ -13,8 +14,12 @@ from libraries.movement_params import *
 # noinspection PyUnresolvedReferences
 from libraries.communication_management import *
 # noinspection PyUnresolvedReferences
-from machine import LED
+from libraries.recording import *
 from common import *
+import common
+from telemetry import TelemetryLog, TelemetryStream
+from error_log import ErrorLog
+from geometry import Geometry
 
 # region Set up the lane_recognition and movement_params which should be used
 
@@ -48,17 +53,42 @@ DRIVING_MODE = set_driving_mode()
 START_MODE = set_start_mode()
 print("Start mode enabled!")
 
+# Resolution per driving mode: (frame size, top, bottom). "QQQVGA" halves the resolution, top and bottom (rows of
+# QQVGA) crop the frame to the road with sensor.set_windowing(). All constants of the lane recognition are derived from it
+GEOMETRY_SETTINGS = {
+    0: ("QQVGA", 0, 120),
+    1: ("QQVGA", 0, 120),
+    2: ("QQVGA", 0, 120),
+}
+GEOMETRY = Geometry(*GEOMETRY_SETTINGS.get(DRIVING_MODE, GEOMETRY_SETTINGS[0]))
 # noinspection PyUnresolvedReferences
-pixel_getter = get_pixel_getter('camera')
+configure_geometry(GEOMETRY, configure_lane_recognition_geometry)
+
+# noinspection PyUnresolvedReferences
+pixel_getter = get_pixel_getter('bitmap') # Reads the bitmap directly, set_image() has to be called every frame
 # noinspection PyUnresolvedReferences
 lane_recognition, secondary_lane_recognition = setup_lane_recognition(pixel_getter, get_lane_recognition_instance, get_finish_line_detection_instance)
+# The driver calculates with integers instead of floats (no heap allocations per frame, steering differs by at most 1)
+FIXED_POINT_STEERING = True
 # noinspection PyUnresolvedReferences
-movement_params = setup_movement_params(get_movement_params_instance, DRIVING_MODE)
+movement_params = setup_movement_params(get_movement_params_instance, DRIVING_MODE, FIXED_POINT_STEERING)
+# Only the regions read by the lane recognition (and finish line detection) are preprocessed.
+# Pixels outside of these regions are undefined and will look like noise in the recordings
+PREPROCESS_ROI_ONLY = True
+# Compares the viper kernels of the lane recognition with their Python versions on a camera frame during the setup
+# and stops if they differ (check after firmware updates or changes of kernels.py, costs about a second of boot time)
+CHECK_KERNELS = False
+# Frames whose rows read by the algorithms are identical to the last frame (e.g. while waiting at the start) reuse
+# the last speed and steering instead of being processed again, see FrameSkipper in common.py
+SKIP_UNCHANGED_FRAMES = True
 
 # endregion
 
 # region Initialize Communication Handler
 
+# "DirectPWM": The camera drives the esc and the servo. "SPITeensy": Frames with speed and steering are sent to the Teensy.
+# "I2CTeensy": The same frames via I2C (uses P4 and P5, the start mode pins have to be moved).
+# The esc is armed in the background (timer) while the camera and the recorder are set up
 # noinspection PyUnresolvedReferences
 COMMUNICATION_MANAGER = get_communication_manager("DirectPWM", DRIVING_MODE)
 
@@ -66,14 +96,32 @@ COMMUNICATION_MANAGER = get_communication_manager("DirectPWM", DRIVING_MODE)
 
 # region File saving
 
+# "Mjpeg": Compressed clips, "Bitmap": Raw 1-bit frames (cheaper and bit-exact replay),
+# "BlackBox": The last frames and telemetry are kept in the RAM and only written after a trigger (no sd card writes while driving)
+RECORDING_MODE = "Mjpeg"
 CLIP_DURATION = 10 # Clip duration in seconds
+BITMAP_LOG_FRAMES = 1800 # Number of frames the bitmap log is preallocated for
+BLACK_BOX_FRAMES = 90 # Number of frames kept in the RAM by the black box
+# P6: Manual trigger. The stop signal of the Teensy (P0) is owned by the emergency stop of DirectPWM, the black box
+# is triggered by its stop counter instead of reading the pin
+BLACK_BOX_TRIGGER_PINS = ["P6"]
+FINISH_LINE_TRIGGERED = False
+RECORD_DECIMATION = 1 # Only every n-th frame will be recorded (1: Every frame, 2: Every 2nd frame, ...)
+RECORD_BUDGET_MS = 10 # Time the recorder may add to a frame (dropped frames are counted in the telemetry)
+# Stream the frames via WiFi (http://192.168.4.1:8080). The stream never blocks the main loop, it drops frames and
+# lowers the jpeg quality if the link is too slow
+STREAM_VIDEO = False
+STREAM_PORT = 8080
+STREAM_BUDGET_MS = 5 # Time the streamer may add to a frame
+# Send every telemetry record live over the USB serial port (record it with Camera Simulator/telemetry_recorder.py)
+USB_TELEMETRY = False
 BASE_CLIP_FOLDER = "/sdcard/clips" # Folder for saving clips
-CURRENT_CLIP_FOLDER, FILENAME = None, None
-VIDEO, START_TIME = None, None
-led = LED("LED_BLUE")
-LED_STATE = True  # True for blue LED, False for green (off LED)
-CLIP_INDEX = 0
+CURRENT_CLIP_FOLDER = None
 FOLDER_INDEX = 0
+# Heights at which the lanes are logged: The CHECK_HEIGHTS of the main lane recognition (rows of the reference image)
+# noinspection PyUnresolvedReferences
+TELEMETRY_HEIGHTS = get_check_heights(lane_recognition)
+FRAME_INDEX = 0
 
 def create_new_clip_folder():
     files = os.listdir(BASE_CLIP_FOLDER)
@@ -92,54 +140,27 @@ def create_new_clip_folder():
     print("Created new clip folder: {}".format(CURRENT_CLIP_FOLDER))
 
 
-def save_frame_to_file(frame):
-    """
-    Saves a single frame to a file and manages video clipping. Starts a new clip if
-    not already initiated, and saves frames to the active video. Closes the clip
-    and starts a new one when the clip duration exceeds the defined limit.
-
-    Args:
-        frame: The frame to be saved into the current video clip if a clip is
-               already being saved. The data type is determined by the specific
-               implementation or external library in use.
+# endregion
 
-    Raises:
-        Exception: An exception is raised if saving the clip or adding the frame
-                   fails due to any unforeseen issue.
-    """
-    global FILENAME, VIDEO, START_TIME
-    if FILENAME is None:
-        global CLIP_INDEX
-        FILENAME = "{}/clip{:03d}.mjpeg".format(CURRENT_CLIP_FOLDER, CLIP_INDEX)
-        VIDEO = mjpeg.Mjpeg(FILENAME)
-        START_TIME = time.ticks_ms()
-        global LED_STATE
-        # Alternate LED colors between blue and green
-        if LED_STATE:  # If True, turn the LED blue
-            led.on()  # Turn on blue LED
-            LED("LED_GREEN").off()  # Ensure green is off
-        else:  # If False, turn the LED green
-            LED("LED_BLUE").off()  # Ensure blue is off
-            LED("LED_GREEN").on()  # Turn on green LED
-
-        LED_STATE = not LED_STATE  # Toggle state for next clip
-        CLIP_INDEX = CLIP_INDEX + 1
-        print("Saving clip to:", FILENAME)
-
-    try:
-        VIDEO.add_frame(frame)  # Stream frame to file
-        if time.ticks_diff(time.ticks_ms(), START_TIME) > CLIP_DURATION * 1000:
-            VIDEO.close()
-            print("Clip saved successfully.")
-            global FILENAME
-            FILENAME = None
-    except Exception as exception:
-        print("Failed to save clip:", exception)
+# region Setup
 
+# Scheduled garbage collection: gc.collect() is called at a fixed point of every frame (after the movement data was
+# sent). The automatic collection only runs if a single frame allocates more than the free heap / GC_THRESHOLD_FRACTION
+SCHEDULED_GC = True
+GC_THRESHOLD_FRACTION = 2 # 2: Half of the free heap
 
-# endregion
+def setup_gc():
+    """
+    Collects once after the setup and sets gc.threshold() so the automatic collection does not run in the middle
+    of a frame.
+    """
+    gc.collect()
+    if SCHEDULED_GC:
+        gc.threshold(gc.mem_free() // GC_THRESHOLD_FRACTION)
 
-# region Setup
+# 1: The capture starts when snapshot() is called. 3: Triple buffering, the sensor fills the next buffer in the
+# background while the current frame is processed and snapshot() returns the newest complete frame
+FRAME_BUFFERS = 3
 
 def setup_camera():
     """
@@ -151,7 +172,8 @@ def setup_camera():
     The function performs the following steps:
     - Resets the camera to initial state
     - Sets the pixel format to grayscale
-    - Sets the frame size to QVGA (320x240 pixels)
+    - Sets the frame size and the window of GEOMETRY (QQVGA, 160x120 pixels by default)
+    - Uses FRAME_BUFFERS frame buffers, so the sensor captures the next frame while the current one is processed
     - Skips frames for a specified time to allow the camera to stabilize
     - Disables automatic gain to maintain consistent image settings.
 
@@ -161,10 +183,14 @@ def setup_camera():
     # Camera initialization
     sensor.reset()
     sensor.set_pixformat(sensor.GRAYSCALE)  # Grayscale mode
-    sensor.set_framesize(sensor.QQVGA)  # 320x240 pixels = QVGA, 160x120 pixels = QQVGA
+    sensor.set_framesize(getattr(sensor, GEOMETRY.frame_size))  # 160x120 pixels = QQVGA, 80x60 pixels = QQQVGA
+    window = GEOMETRY.get_window()
+    if window:
+        sensor.set_windowing(window)  # Only the rows of the road are captured
     # sensor.set_contrast(3)
     # sensor.set_auto_gain(True)  # Disable automatic exposure
     # sensor.set_auto_exposure(False, exposure_us=15000)  # Set exposure to 15000 µs (adjust as needed)
+    sensor.set_framebuffers(FRAME_BUFFERS)
     sensor.skip_frames(time=500)  # Time to stabilize the camera
 
 # noinspection PyUnresolvedReferences
@@ -173,13 +199,70 @@ clock = time.clock()
 # noinspection PyUnresolvedReferences
 BASE_NAME = generate_base_name(get_lane_recognition_id, get_movement_params_id)
 create_new_clip_folder()
+if RECORDING_MODE == "BlackBox": # The telemetry is only stored by the black box
+    TELEMETRY = TelemetryLog(None, TELEMETRY_HEIGHTS)
+else:
+    TELEMETRY = TelemetryLog("{}/telemetry.bin".format(CURRENT_CLIP_FOLDER), TELEMETRY_HEIGHTS)
+TELEMETRY_STREAM = TelemetryStream(TELEMETRY.header) if USB_TELEMETRY else None
 
 setup_camera()
+def check_kernels_on_camera():
+    """
+    Runs check_kernels() of lane_recognition/kernels.py on a preprocessed camera frame and raises a RuntimeError
+    if the viper kernels return other results than the Python versions.
+    """
+    # noinspection PyUnresolvedReferences
+    from libraries.lane_recognition.kernels import check_kernels, NATIVE
+    img = sensor.snapshot()
+    img.sobel()
+    img.binary([(0, 90)]).invert()
+    img = img.to_bitmap()
+    pixel_getter.set_image(img)
+    errors = check_kernels(pixel_getter.data, pixel_getter.stride, img.width(), img.height())
+    print("Kernel check ({}): {} differences".format("viper" if NATIVE else "Python", errors))
+    if errors:
+        raise RuntimeError("The viper kernels differ from the Python versions")
+
+if CHECK_KERNELS:
+    check_kernels_on_camera()
+# noinspection PyUnresolvedReferences
+RECORDER = get_recorder(RECORDING_MODE, CURRENT_CLIP_FOLDER, sensor.width(), sensor.height(), CLIP_DURATION,
+                        RECORD_DECIMATION, RECORD_BUDGET_MS, BITMAP_LOG_FRAMES, BLACK_BOX_FRAMES,
+                        TELEMETRY.header, BLACK_BOX_TRIGGER_PINS,
+                        getattr(COMMUNICATION_MANAGER, "emergency_stop", None)) # Only DirectPWM handles the stop
+# noinspection PyUnresolvedReferences
+STREAMER = WiFiStreamer(STREAM_PORT, budget_ms=STREAM_BUDGET_MS) if STREAM_VIDEO else None
+
+def create_preprocessing_mask():
+    """
+    Creates a binary image in which the regions of interest of the used algorithms are set.
+    The firmware filters skip all pixels which are not set in the mask.
+
+    Returns:
+        image.Image: The mask or None if the whole frame should be preprocessed
+    """
+    if not PREPROCESS_ROI_ONLY:
+        return None
+    mask = image.Image(sensor.width(), sensor.height(), sensor.BINARY)
+    # noinspection PyUnresolvedReferences
+    for roi in get_preprocessing_rois(lane_recognition, secondary_lane_recognition):
+        mask.draw_rectangle(roi, color=1, fill=True)
+    return mask
+
+PREPROCESSING_MASK = create_preprocessing_mask()
+# Exceptions of the main loop are counted in memory and written to /sdcard/log.txt at most every FLUSH_INTERVAL_MS
+ERROR_LOG = ErrorLog()
+# noinspection PyUnresolvedReferences
+SIGNATURE_ROIS = get_preprocessing_rois(lane_recognition, secondary_lane_recognition)
+# noinspection PyUnresolvedReferences
+FRAME_SKIPPER = FrameSkipper([lane_recognition, secondary_lane_recognition, movement_params]) \
+    if SKIP_UNCHANGED_FRAMES else None
+setup_gc() # Last step of the setup, all buffers of the recorder and the telemetry are allocated now
 
 # endregion
 
 # region Main loop
-start_time = time.ticks_ms()
+start_time = time.ticks_ms() # Set again when the communication manager is ready
 def main_loop():
     """
     Main loop for processing image frames and performing lane detection, controlling movement parameters,
@@ -190,13 +273,39 @@ def main_loop():
     Raises:
         OSError: Raised during I2C communication errors with the external hardware.
     """
+    global FRAME_INDEX, FINISH_LINE_TRIGGERED
     clock.tick()
-    img = sensor.snapshot()  # Capture an image
-    img.sobel()  # Calls the sobel function which is implemented in the firmware
-    img.binary([(0, 90)]).invert()
+    FRAME_INDEX += 1
+    frame_start = time.ticks_ms()
+    stage_start = time.ticks_us()
+    img = sensor.snapshot()  # Capture an image. Only waits if the sensor has not finished the next frame yet
+    capture_end = time.ticks_us()
+    capture_us = time.ticks_diff(capture_end, stage_start)
+
+    stage_start = time.ticks_us()
+    if PREPROCESSING_MASK:
+        img.sobel(mask=PREPROCESSING_MASK)  # Calls the sobel function which is implemented in the firmware
+        img.binary([(0, 90)], invert=True, mask=PREPROCESSING_MASK)
+    else:
+        img.sobel()  # Calls the sobel function which is implemented in the firmware
+        img.binary([(0, 90)]).invert()
     img = img.to_bitmap()
-    check_for_finish_line(img)
-    speed, steering = set_speed_and_steering(img, lane_recognition, secondary_lane_recognition, movement_params)
+    pixel_getter.set_image(img)
+    preprocess_us = time.ticks_diff(time.ticks_us(), stage_start)
+
+    stage_start = time.ticks_us()
+    results = None
+    if FRAME_SKIPPER:
+        signature = pixel_getter.get_signature(img, SIGNATURE_ROIS)
+        results = FRAME_SKIPPER.reuse(signature)
+    if results:
+        speed, steering, left_lane, right_lane, lane_distance = results
+    else:
+        check_for_finish_line(img)
+        speed, steering, left_lane, right_lane, lane_distance, _, _, _ = set_speed_and_steering(
+            img, lane_recognition, secondary_lane_recognition, movement_params, return_lanes=True)
+        if FRAME_SKIPPER:
+            FRAME_SKIPPER.store(signature, (speed, steering, left_lane, right_lane, lane_distance))
     if START_MODE:
         if (time.ticks_ms() - start_time) < 2100:
             speed = 100
@@ -207,32 +316,82 @@ def main_loop():
     elif (time.ticks_ms() - start_time) > 20000:
         speed = speed // 4
     """
-    # Save video to sd card
-    save_frame_to_file(img)
+    decision_us = time.ticks_diff(time.ticks_us(), stage_start)
+
+    stage_start = time.ticks_us()
+    # Hand the frame over to the recorder, it will be written after the movement data was sent
+    RECORDER.submit(img)
+    if STREAMER:
+        STREAMER.submit(img)
 
     # Send data via I2C to the Teensy ------------------------------------------
     COMMUNICATION_MANAGER.send_movement_data(speed, steering)
+
+    # Save video to sd card, at most RECORD_BUDGET_MS per frame
+    RECORDER.service()
+    if STREAMER:
+        STREAMER.service()
+    output_us = time.ticks_diff(time.ticks_us(), stage_start)
+    # Scheduled garbage collection, the duration depends on the allocations of this frame only
+    gc_us = 0
+    if SCHEDULED_GC:
+        stage_start = time.ticks_us()
+        gc.collect()
+        gc_us = time.ticks_diff(time.ticks_us(), stage_start)
+
+    # capture_us >> 0: The loop waits for the sensor (capture-bound), capture_us ~ 0: The loop is CPU-bound
+    compute_us = time.ticks_diff(time.ticks_us(), capture_end)
+
+    # lane_distance is returned as [(lane_distance, x)] for the debug visuals of virtual_cam
+    TELEMETRY.log(FRAME_INDEX, frame_start, left_lane, right_lane, lane_distance[0][0], speed, steering,
+                  common.FinishLineDetected, capture_us, preprocess_us, decision_us, output_us, compute_us,
+                  gc_us, gc.mem_free(), results is not None,
+                  FRAME_SKIPPER.get_skipped_permille() if FRAME_SKIPPER else 0, ERROR_LOG.error_count,
+                  len(ERROR_LOG.counts), RECORDER.dropped_frames)
+    RECORDER.add_telemetry(TELEMETRY.record)
+    if TELEMETRY_STREAM:
+        TELEMETRY_STREAM.send(TELEMETRY.record)
+    if common.FinishLineDetected and not FINISH_LINE_TRIGGERED:
+        FINISH_LINE_TRIGGERED = True
+        RECORDER.trigger("Finish line")
     #print("Sent speed and steering commands:", speed, steering)
 
     #print(clock.fps())
 
 # Watchdog Timer with 1 second timeout
 wdt = machine.WDT(timeout=1000) # 1000 ms
+
+# The main loop starts once the esc is armed
+while not COMMUNICATION_MANAGER.is_ready():
+    wdt.feed()
+    time.sleep_ms(10)
+start_time = time.ticks_ms()
 #start_time = time.ticks_ms()
 #count = 0
 # main loop
-while True:
-    try:
-        wdt.feed()
-        main_loop()
-        #count += 1
-        #if (time.ticks_ms() - start_time) > 10000:
-        #    text = "Count: {}".format(count)
-        #    raise ValueError(text)
-    except Exception as e:
-        with open("/sdcard/log.txt", "a") as f:
-            f.write("Main Loop Crash: " + str(e) + "\n")
-        print("Main Loop Crash:", e)
-        #break
+try:
+    while True:
+        try:
+            wdt.feed()
+            main_loop()
+            ERROR_LOG.service() # Writes errors which were not written yet because of the rate limit
+            #count += 1
+            #if (time.ticks_ms() - start_time) > 10000:
+            #    text = "Count: {}".format(count)
+            #    raise ValueError(text)
+        except Exception as e:
+            RECORDER.trigger("Main loop crash")
+            RECORDER.service()
+            if ERROR_LOG.record(e, FRAME_INDEX): # Only the first exception of every kind is printed
+                print("Main Loop Crash:", e)
+            ERROR_LOG.service()
+            #break
+finally:
+    # E.g. when the script is stopped by the IDE: Writes everything that is still buffered and closes the files
+    ERROR_LOG.flush()
+    TELEMETRY.close()
+    RECORDER.close() # Also writes the ring of the BlackBoxRecorder if a flush was started
+    if STREAMER:
+        STREAMER.close()
 
 # endregion
\ No newline at end of file
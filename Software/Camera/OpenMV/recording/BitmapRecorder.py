@@ -0,0 +1,43 @@
+import time
+from .Recorder import Recorder
+# noinspection PyUnresolvedReferences
+from frame_log import BitmapFrameLog, pack_frame, FRAME_LOG_EXTENSION
+
+
+class BitmapRecorder(Recorder):
+    """
+    Records the raw 1-bit frames (after img.to_bitmap()) without blocking the main loop (see Recorder).
+
+    Compared to the MjpegRecorder there is no jpeg compression on the camera, and the replay in the
+    simulator sees exactly the pixels the lane recognition saw. The frames are written into one file
+    that is preallocated for max_frames frames during the setup.
+    """
+
+    def __init__(self, clip_folder, width, height, max_frames=1800, decimation=1, budget_ms=10):
+        super().__init__(decimation, budget_ms)
+        self.filename = "{}/frames{}".format(clip_folder, FRAME_LOG_EXTENSION)
+        print("Preallocating bitmap log:", self.filename)
+        self.frame_log = BitmapFrameLog(self.filename, width, height, max_frames)
+        self.full = False
+
+    def copy_frame(self, slot, frame):
+        if slot is None:
+            # Only allocated once, afterwards the slot is overwritten
+            slot = self.frame_log.create_record()
+        pack_frame(slot, self.frame_counter, time.ticks_ms(), frame.bytearray())
+        return slot
+
+    def write_frame(self, slot):
+        if self.full:
+            return
+        try:
+            if self.frame_log.write(slot):
+                self.written_frames += 1
+            else:
+                self.full = True
+                print("Bitmap log is full:", self.filename)
+        except Exception as exception:
+            print("Failed to save frame:", exception)
+
+    def finish(self):
+        self.frame_log.close()
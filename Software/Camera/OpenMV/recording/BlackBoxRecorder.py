@@ -0,0 +1,193 @@
+import time
+import gc
+# noinspection PyUnresolvedReferences
+import machine
+from .Recorder import Recorder
+# noinspection PyUnresolvedReferences
+from frame_log import BitmapFrameLog, pack_frame, get_record_size, FRAME_LOG_EXTENSION
+# noinspection PyUnresolvedReferences
+from telemetry import BLOCK_SIZE, RECORD_SIZE
+
+# region init values
+
+HEAP_RESERVE = 32 * 1024 # Heap which is kept free for the rest of the setup and the main loop
+MIN_FRAMES = 10 # The setup fails if the ring cannot hold at least this many frames
+
+# endregion
+
+
+class BlackBoxRecorder(Recorder):
+    """
+    Keeps the last frames (raw bitmaps) and their telemetry records in a preallocated ring in the RAM.
+    Nothing is written to the sd card until trigger() is called, one of the trigger pins goes high or the
+    emergency stop of the communication manager is triggered.
+
+    The ring holds at most the requested number of frames. If the free heap is too small for it, the ring is
+    made smaller (a message is printed). If not even MIN_FRAMES fit, a MemoryError is raised during the setup.
+
+    After a trigger the ring is frozen and written by service() as long as the frame is within the budget:
+    - blackbox<index>.rbm: The frames (same format as the BitmapRecorder)
+    - blackbox<index>.bin: The telemetry (same format as telemetry.TelemetryLog)
+    Afterwards the recording continues with an empty ring.
+    """
+
+    def __init__(self, clip_folder, width, height, frames=90, budget_ms=10, telemetry_header=None,
+                 trigger_pins=(), emergency_stop=None):
+        super().__init__(1, budget_ms)
+        self.clip_folder = clip_folder
+        self.width = width
+        self.height = height
+        self.telemetry_header = telemetry_header
+
+        # Ring with the last frames and their telemetry records, allocated once during the setup
+        record_size = get_record_size(width, height)
+        frames = self.fit_frames(frames, record_size + (RECORD_SIZE if telemetry_header is not None else 0))
+        self.frames = [bytearray(record_size) for _ in range(frames)]
+        self.index = 0 # Position of the next frame
+        self.filled = 0 # Number of frames in the ring
+        self.telemetry = bytearray(frames * RECORD_SIZE) if telemetry_header is not None else None
+
+        # Trigger pins, a rising edge triggers the flush. Pins used by other modules (e.g. P0, the trigger pin of the
+        # emergency stop) must not be passed here, they would be configured again
+        self.trigger_pins = [machine.Pin(pin, machine.Pin.IN, machine.Pin.PULL_DOWN) for pin in trigger_pins]
+        self.trigger_pin_values = [0] * len(self.trigger_pins)
+        # Emergency stop (see communication_management/EmergencyStop.py), a new stop triggers the flush.
+        # Its stop counter is compared, so a stop that ended before the next frame is not missed
+        self.emergency_stop = emergency_stop
+        self.stop_count = emergency_stop.stop_count if emergency_stop is not None else 0
+
+        # Flush state
+        self.flushing = False
+        self.flush_position = 0
+        self.flush_count = 0
+        self.frame_log = None
+        self.trigger_reason = None
+
+    def fit_frames(self, frames, frame_size):
+        """
+        Returns the number of frames the ring can hold without using more than the free heap minus HEAP_RESERVE.
+        """
+        gc.collect()
+        available = (gc.mem_free() - HEAP_RESERVE) // frame_size
+        if available < MIN_FRAMES:
+            raise MemoryError("Not enough heap for the black box: {} frames need {} bytes, {} bytes are free".format(
+                MIN_FRAMES, MIN_FRAMES * frame_size + HEAP_RESERVE, gc.mem_free()))
+        if available < frames:
+            print("Black box: Only {} of {} frames fit into the heap".format(available, frames))
+            return available
+        return frames
+
+    def submit(self, frame):
+        """
+        Copies the frame into the ring, the oldest frame is overwritten. Checks the trigger pins and the
+        emergency stop.
+        """
+        for i in range(len(self.trigger_pins)):
+            value = self.trigger_pins[i].value()
+            if value and not self.trigger_pin_values[i]:
+                self.trigger("Pin {}".format(i))
+            self.trigger_pin_values[i] = value
+        if self.emergency_stop is not None and self.emergency_stop.stop_count != self.stop_count:
+            self.stop_count = self.emergency_stop.stop_count
+            self.trigger("Emergency stop")
+
+        self.frame_counter += 1
+        if self.flushing: # The ring is frozen until it was written
+            self.dropped_frames += 1
+            return
+        self.frames[self.index] = self.copy_frame(self.frames[self.index], frame)
+
+    def add_telemetry(self, record):
+        """
+        Stores the telemetry record of the last submitted frame and advances the ring.
+        """
+        if self.flushing:
+            return
+        if self.telemetry is not None:
+            offset = self.index * RECORD_SIZE
+            self.telemetry[offset:offset + RECORD_SIZE] = record
+        self.index = (self.index + 1) % len(self.frames)
+        self.filled = min(self.filled + 1, len(self.frames))
+
+    def copy_frame(self, slot, frame):
+        pack_frame(slot, self.frame_counter, time.ticks_ms(), frame.bytearray())
+        return slot
+
+    def trigger(self, reason):
+        """
+        Starts writing the ring to the sd card. Ignored while the ring is written.
+        """
+        if self.flushing or self.filled == 0:
+            return
+        print("Black box triggered:", reason)
+        self.trigger_reason = reason
+        self.flushing = True
+        self.flush_position = 0
+
+    def service(self):
+        """
+        Writes the frozen ring after a trigger until budget_ms are used up (at least one step per call).
+        Does nothing while no trigger occurred.
+        """
+        service_start = time.ticks_ms()
+        while self.flushing and self.has_time(service_start):
+            self.flush_step()
+
+    def flush_step(self):
+        """
+        Does one sd card operation of the flush: Opening the files, writing one frame or closing the files.
+        """
+        oldest = (self.index - self.filled) % len(self.frames)
+        try:
+            if self.frame_log is None:
+                filename = "{}/blackbox{:03d}".format(self.clip_folder, self.flush_count)
+                self.frame_log = BitmapFrameLog(filename + FRAME_LOG_EXTENSION, self.width, self.height,
+                                                self.filled, preallocate=False)
+                print("Writing black box:", filename)
+            elif self.flush_position < self.filled:
+                self.frame_log.write(self.frames[(oldest + self.flush_position) % len(self.frames)])
+                self.flush_position += 1
+                self.written_frames += 1
+            else:
+                self.frame_log.close()
+                self.write_telemetry(oldest)
+                self.end_flush()
+        except Exception as exception:
+            print("Failed to save black box:", exception)
+            if self.frame_log is not None:
+                self.frame_log.close()
+            self.end_flush()
+
+    def write_telemetry(self, oldest):
+        """
+        Writes the telemetry records of the ring in chronological order.
+        """
+        if self.telemetry is None:
+            return
+        filename = "{}/blackbox{:03d}.bin".format(self.clip_folder, self.flush_count)
+        with open(filename, "wb") as file:
+            file.write(self.telemetry_header)
+            start = oldest * RECORD_SIZE
+            end = start + self.filled * RECORD_SIZE
+            if end <= len(self.telemetry):
+                file.write(self.telemetry[start:end])
+            else:
+                file.write(self.telemetry[start:])
+                file.write(self.telemetry[:end - len(self.telemetry)])
+            # Fill the last block, the reader ignores empty records
+            padding = (self.filled * RECORD_SIZE) % BLOCK_SIZE
+            if padding:
+                file.write(bytearray(BLOCK_SIZE - padding))
+
+    def end_flush(self):
+        self.frame_log = None
+        self.flushing = False
+        self.flush_count += 1
+        self.filled = 0
+
+    def finish(self):
+        """
+        Writes the ring if a flush was started.
+        """
+        while self.flushing:
+            self.flush_step()
@@ -0,0 +1,133 @@
+import time
+# noinspection PyUnresolvedReferences
+import mjpeg
+# noinspection PyUnresolvedReferences
+from machine import LED
+from .Recorder import Recorder
+
+# region init values
+
+PREPARE_AHEAD_MS = 1000 # How long before the end of a clip the next clip file is opened
+
+# endregion
+
+class MjpegRecorder(Recorder):
+    """
+    Records frames into mjpeg clips without blocking the main loop (see Recorder).
+
+    The file of the next clip is opened ahead of time and the old clip is closed later by idle(), so a clip
+    change costs no more than an ordinary frame.
+    """
+
+    def __init__(self, clip_folder, clip_duration=10, decimation=1, budget_ms=10):
+        super().__init__(decimation, budget_ms)
+        self.clip_folder = clip_folder
+        self.clip_duration = clip_duration # Clip duration in seconds
+
+        # Clip handling
+        self.video = None
+        self.next_video = None # Already opened file for the next clip
+        self.closing_video = None # Finished clip which still has to be closed
+        self.start_time = None
+        self.clip_index = 0
+        self.led_state = True  # True for blue LED, False for green (off LED)
+        self.led_blue = LED("LED_BLUE")
+        self.led_green = LED("LED_GREEN")
+
+        # The first clip is opened during the setup, not in the main loop
+        self.next_video = self.open_next_clip()
+        self.start_next_clip()
+
+    def copy_frame(self, slot, frame):
+        if slot is None:
+            # Only allocated once, afterwards the slot is overwritten
+            return frame.copy()
+        slot.replace(frame)
+        return slot
+
+    def write_frame(self, slot):
+        self.save_frame_to_file(slot)
+
+    def idle(self):
+        """
+        Closes the old clip or prepares the next one.
+        """
+        if self.closing_video is not None:
+            self.close_clip(self.closing_video)
+            self.closing_video = None
+        elif self.next_video is None and self.clip_ends_soon():
+            self.next_video = self.open_next_clip()
+
+    def clip_ends_soon(self):
+        """
+        Returns True if the current clip ends within PREPARE_AHEAD_MS.
+        """
+        elapsed = time.ticks_diff(time.ticks_ms(), self.start_time)
+        return elapsed > self.clip_duration * 1000 - PREPARE_AHEAD_MS
+
+    def open_next_clip(self):
+        """
+        Opens the file for the next clip. Returns None if the file could not be opened.
+        """
+        filename = "{}/clip{:03d}.mjpeg".format(self.clip_folder, self.clip_index)
+        try:
+            video = mjpeg.Mjpeg(filename)
+        except Exception as exception:
+            print("Failed to open clip:", exception)
+            return None
+        self.clip_index += 1
+        print("Prepared clip:", filename)
+        return video
+
+    def close_clip(self, video):
+        try:
+            video.close()
+            print("Clip saved successfully.")
+        except Exception as exception:
+            print("Failed to save clip:", exception)
+
+    def start_next_clip(self):
+        """
+        Switches to the prepared clip. The old clip is only marked for closing.
+        """
+        if self.video is not None:
+            if self.closing_video is not None: # The previous clip is still open, should not happen
+                self.close_clip(self.closing_video)
+            self.closing_video = self.video
+        self.video = self.next_video
+        self.next_video = None
+        self.start_time = time.ticks_ms()
+
+        # Alternate LED colors between blue and green
+        if self.led_state:  # If True, turn the LED blue
+            self.led_blue.on()  # Turn on blue LED
+            self.led_green.off()  # Ensure green is off
+        else:  # If False, turn the LED green
+            self.led_blue.off()  # Ensure blue is off
+            self.led_green.on()  # Turn on green LED
+        self.led_state = not self.led_state  # Toggle state for next clip
+
+    def save_frame_to_file(self, frame):
+        """
+        Saves a single frame to the current clip. Switches to the prepared clip when the clip duration
+        exceeds the defined limit. If the next clip is not prepared yet, the current clip is continued.
+        """
+        if self.video is None: # Opening a clip failed, try again with the next clip
+            if self.next_video is None:
+                return
+            self.start_next_clip()
+        elif self.next_video is not None:
+            if time.ticks_diff(time.ticks_ms(), self.start_time) > self.clip_duration * 1000:
+                self.start_next_clip()
+
+        try:
+            self.video.add_frame(frame)  # Stream frame to file
+            self.written_frames += 1
+        except Exception as exception:
+            print("Failed to save clip:", exception)
+
+    def finish(self):
+        for video in (self.closing_video, self.video, self.next_video):
+            if video is not None:
+                self.close_clip(video)
+        self.closing_video, self.video, self.next_video = None, None, None
@@ -0,0 +1,119 @@
+import time
+
+# region init values
+
+FRAME_SLOTS = 2 # Default number of frames that can wait for the write (double buffer)
+
+# endregion
+
+class Recorder:
+    """
+    Base class of the recorders. It keeps the sd card writes out of the critical path of the main loop.
+
+    The main loop only hands a frame over with submit(). The frame is copied into one of two preallocated
+    slots and written to the sd card later by service(), which the main loop calls after the movement data
+    has been sent (the spare time before the next snapshot). service() works for at most budget_ms per call,
+    measured from its own start, so the recording adds a fixed time to a frame however long the rest of the
+    frame took. If both slots are full, the oldest frame is dropped (counted in dropped_frames), so the
+    recorder never builds up a backlog.
+
+    With slot_count=1 only the latest frame is kept (e.g. for streaming, where old frames are worthless).
+
+    Subclasses implement copy_frame() and write_frame(). idle() can do other sd card operations (e.g. opening
+    files) while the buffer is not full, finish() is called by close().
+    """
+
+    def __init__(self, decimation=1, budget_ms=10, slot_count=FRAME_SLOTS):
+        self.decimation = max(1, decimation) # Only every n-th frame will be recorded
+        self.budget_ms = budget_ms # Time service() may use per call. The last operation it starts can exceed it
+
+        # Double buffer
+        self.slot_count = max(1, slot_count)
+        self.slots = [None] * self.slot_count
+        self.head = 0 # Index of the oldest frame
+        self.count = 0 # Number of frames waiting for the write
+
+        # Statistics
+        self.frame_counter = 0
+        self.dropped_frames = 0 # Frames that were overwritten because there was no time to write them
+        self.written_frames = 0
+
+    def submit(self, frame):
+        """
+        Hands a frame over to the recorder. Only every n-th frame (decimation) is kept.
+        The frame is copied, so the frame buffer can be reused by the next snapshot.
+        """
+        self.frame_counter += 1
+        if self.frame_counter % self.decimation:
+            return
+
+        if self.count == self.slot_count: # Drop the oldest frame
+            self.head = (self.head + 1) % self.slot_count
+            self.count -= 1
+            self.dropped_frames += 1
+
+        index = (self.head + self.count) % self.slot_count
+        self.slots[index] = self.copy_frame(self.slots[index], frame)
+        self.count += 1
+
+    def service(self):
+        """
+        Does the sd card operations of the recorder until budget_ms are used up: First the work of idle() (if
+        the buffer is not full), then the waiting frames. The first operation is always started.
+        Should be called once per frame after the movement data was sent.
+        """
+        service_start = time.ticks_ms()
+        if self.count < self.slot_count:
+            self.idle()
+
+        while self.count and self.has_time(service_start):
+            self.write_next_frame()
+
+    def has_time(self, service_start):
+        return time.ticks_diff(time.ticks_ms(), service_start) < self.budget_ms
+
+    def write_next_frame(self):
+        slot = self.slots[self.head]
+        self.head = (self.head + 1) % self.slot_count
+        self.count -= 1
+        self.write_frame(slot)
+
+    def close(self):
+        """
+        Writes the remaining frames, closes all open files and prints the statistics.
+        """
+        while self.count:
+            self.write_next_frame()
+        self.finish()
+        print("{}: {} frames written, {} dropped".format(type(self).__name__, self.written_frames,
+                                                         self.dropped_frames))
+
+    def add_telemetry(self, record):
+        """
+        Receives the telemetry record of the last submitted frame. Only used by recorders that store telemetry.
+        """
+        pass
+
+    def trigger(self, reason):
+        """
+        Signals an event (e.g. a crash or the finish line). Only used by recorders that react to events.
+        """
+        pass
+
+    def copy_frame(self, slot, frame):
+        """
+        Copies the frame into the slot and returns the slot. The slot is None the first time it is used.
+        """
+        raise NotImplementedError("You need to implement this method.")
+
+    def write_frame(self, slot):
+        raise NotImplementedError("You need to implement this method.")
+
+    def idle(self):
+        """
+        Does at most one sd card operation that is not a frame write.
+        """
+        pass
+
+    def finish(self):
+        pass
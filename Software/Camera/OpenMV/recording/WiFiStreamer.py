@@ -0,0 +1,225 @@
+import errno
+import socket
+import time
+from .Recorder import Recorder
+
+# region init values
+
+# Access point of the camera. Use http://192.168.4.1:8080 to connect
+SSID = "OPENMV_AP" # Network SSID
+KEY = "1234567890" # Network key (must be 10 chars)
+CHANNEL = 2
+
+# Adaptive quality: The quality is lowered by QUALITY_STEP whenever frames were dropped while the last frame was sent.
+# At MIN_QUALITY the decimation is increased instead. After RECOVER_FRAMES frames without a drop, the decimation is
+# lowered first and the quality is raised afterwards.
+MAX_QUALITY = 50
+MIN_QUALITY = 10
+QUALITY_STEP = 5
+MAX_DECIMATION = 8
+RECOVER_FRAMES = 10
+
+SEND_CHUNK_SIZE = 1460 # At most one TCP segment per send() call, so a single call never takes long
+
+STREAM_HEADER = (
+    "HTTP/1.1 200 OK\r\n"
+    "Server: OpenMV\r\n"
+    "Content-Type: multipart/x-mixed-replace;boundary=openmv\r\n"
+    "Cache-Control: no-cache\r\n"
+    "Pragma: no-cache\r\n\r\n"
+)
+PART_HEADER = "\r\n--openmv\r\nContent-Type: image/jpeg\r\nContent-Length:{}\r\n\r\n"
+
+# endregion
+
+
+def setup_access_point(ssid=SSID, key=KEY, channel=CHANNEL):
+    """
+    Activates the WLAN interface of the camera in access point mode.
+    """
+    # noinspection PyUnresolvedReferences
+    import network
+    network.country('DE')
+    wlan = network.WLAN(network.AP_IF)
+    wlan.config(ssid=ssid, key=key, channel=channel)
+    wlan.active(True)
+    print("AP mode started. SSID: {} IP: {}".format(ssid, wlan.ifconfig()[0]))
+
+
+class WiFiStreamer(Recorder):
+    """
+    Streams the frames of the main loop as mjpeg over http without ever blocking the main loop.
+
+    Only the latest frame is kept (one slot, see Recorder), a frame that arrives while the previous one is still
+    being sent replaces it. The sockets are non-blocking: service() accepts a client, sends as much of the current
+    jpeg as the socket takes right now and only compresses the next frame once the current one is sent completely.
+    Dropped frames show that the link is slower than the main loop, the streamer then lowers the jpeg quality and
+    increases the decimation until the stream keeps up (see MAX_QUALITY - RECOVER_FRAMES).
+
+    Test it on a PC with the stand-in modules and "Camera Simulator/stream_receiver.py" (access_point=False).
+    """
+
+    def __init__(self, port=8080, host="", decimation=1, budget_ms=5, access_point=True):
+        super().__init__(decimation, budget_ms, slot_count=1)
+        self.base_decimation = self.decimation
+        self.quality = MAX_QUALITY
+        self.clean_frames = 0 # Frames sent in a row without a drop
+        self.dropped_at_last_frame = 0
+
+        # Data that is being sent: Up to two parts (header, jpeg), the current part and the offset in it
+        self.parts = [None, None]
+        self.part_index = 2 # 2: Nothing to send
+        self.offset = 0
+        self.jpeg = None # Keeps the compressed frame alive while it is sent
+
+        # Statistics
+        self.sent_bytes = 0
+        self.client_count = 0
+
+        if access_point:
+            setup_access_point()
+        self.client = None
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(socket.getaddrinfo(host or "0.0.0.0", port)[0][-1])
+        self.server.listen(1)
+        self.server.setblocking(False)
+
+    def submit(self, frame):
+        """
+        Hands a frame over to the streamer. Without a client nothing is copied.
+        """
+        if self.client is None:
+            return
+        super().submit(frame)
+
+    def service(self):
+        """
+        Accepts a client or continues sending until budget_ms are used up.
+        A new frame is only compressed when the previous one was sent completely.
+        """
+        if self.client is None:
+            self.accept_client()
+            return
+        service_start = time.ticks_ms()
+        if not self.send_pending(service_start):
+            return
+        if self.count and self.has_time(service_start):
+            self.adapt_to_backlog()
+            self.write_next_frame()
+            self.send_pending(service_start)
+
+    def accept_client(self):
+        try:
+            client, address = self.server.accept()
+        except OSError: # No client is waiting
+            return
+        client.setblocking(False)
+        self.client = client
+        self.client_count += 1
+        self.dropped_at_last_frame = self.dropped_frames
+        self.queue(STREAM_HEADER.encode(), None)
+        print("Stream client connected:", address)
+
+    def adapt_to_backlog(self):
+        """
+        Adjusts the quality and the decimation to the frames that were dropped since the last frame was started.
+        """
+        dropped = self.dropped_frames - self.dropped_at_last_frame
+        self.dropped_at_last_frame = self.dropped_frames
+        if dropped:
+            self.clean_frames = 0
+            if self.quality > MIN_QUALITY:
+                self.quality = max(MIN_QUALITY, self.quality - QUALITY_STEP)
+            elif self.decimation < MAX_DECIMATION:
+                self.decimation += 1
+            return
+        self.clean_frames += 1
+        if self.clean_frames < RECOVER_FRAMES:
+            return
+        self.clean_frames = 0
+        if self.decimation > self.base_decimation:
+            self.decimation -= 1
+        elif self.quality < MAX_QUALITY:
+            self.quality = min(MAX_QUALITY, self.quality + QUALITY_STEP)
+
+    def copy_frame(self, slot, frame):
+        if slot is None:
+            # Only allocated once, afterwards the slot is overwritten
+            return frame.copy()
+        slot.replace(frame)
+        return slot
+
+    def write_frame(self, slot):
+        """
+        Compresses the frame and queues it for sending.
+        """
+        self.jpeg = slot.to_jpeg(quality=self.quality, copy=True)
+        self.queue(PART_HEADER.format(self.jpeg.size()).encode(), memoryview(self.jpeg.bytearray()))
+
+    def queue(self, header, data):
+        self.parts[0] = memoryview(header)
+        self.parts[1] = data
+        self.part_index = 0
+        self.offset = 0
+
+    def send_pending(self, service_start):
+        """
+        Sends the queued parts until the socket buffer is full or the budget is used up.
+
+        Returns:
+            bool: True if everything was sent
+        """
+        while self.part_index < 2:
+            part = self.parts[self.part_index]
+            if part is None or self.offset >= len(part):
+                self.part_index += 1
+                self.offset = 0
+                continue
+            if not self.has_time(service_start):
+                return False
+            try:
+                sent = self.client.send(part[self.offset:self.offset + SEND_CHUNK_SIZE])
+            except OSError as exception:
+                if exception.args[0] == errno.EAGAIN: # Socket buffer is full
+                    return False
+                self.disconnect(exception)
+                return False
+            if not sent: # Connection closed by the client
+                self.disconnect(None)
+                return False
+            self.offset += sent
+            self.sent_bytes += sent
+        if self.jpeg is not None:
+            self.written_frames += 1
+            self.jpeg = None
+        return True
+
+    def disconnect(self, reason):
+        print("Stream client disconnected:", reason)
+        try:
+            self.client.close()
+        except OSError:
+            pass
+        self.client = None
+        self.parts[0], self.parts[1] = None, None
+        self.part_index = 2
+        self.jpeg = None
+        self.count = 0 # The waiting frame is not sent anymore
+
+    def close(self):
+        """
+        Closes the sockets. Waiting frames are not sent.
+        """
+        self.finish()
+
+    def finish(self):
+        if self.client is not None:
+            self.disconnect("Streamer closed")
+        self.server.close()
+
+    def get_statistics(self):
+        """
+        Returns: (sent frames, dropped frames, sent bytes, jpeg quality, decimation)
+        """
+        return self.written_frames, self.dropped_frames, self.sent_bytes, self.quality, self.decimation
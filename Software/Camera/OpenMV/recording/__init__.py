@@ -0,0 +1,17 @@
+from .MjpegRecorder import MjpegRecorder
+from .BitmapRecorder import BitmapRecorder
+from .BlackBoxRecorder import BlackBoxRecorder
+from .WiFiStreamer import WiFiStreamer
+
+
+def get_recorder(instance_name, clip_folder, width, height, clip_duration=10, decimation=1, budget_ms=10,
+                 max_frames=1800, black_box_frames=90, telemetry_header=None, trigger_pins=(), emergency_stop=None):
+    if instance_name == "Mjpeg":
+        return MjpegRecorder(clip_folder, clip_duration, decimation, budget_ms)
+    elif instance_name == "Bitmap":
+        return BitmapRecorder(clip_folder, width, height, max_frames, decimation, budget_ms)
+    elif instance_name == "BlackBox":
+        return BlackBoxRecorder(clip_folder, width, height, black_box_frames, budget_ms, telemetry_header, trigger_pins,
+                                emergency_stop)
+    else:
+        raise ValueError("Unknown recorder")
@@ -1,10 +1,12 @@
 FinishLineDetection = None
 FinishLineDetected = False
+FINISH_LINE_DETECTION_ENABLED = False
+GEOMETRY = None # Geometry of the image if it differs from QQVGA, see configure_geometry()
 
 def get_settings():
     """
     Returns the values used for version and algorithm names
-    Usable lane_recognition values: SobelEdgeDetection, (SobelLaneDistanceDetector)
+    Usable lane_recognition values: SobelEdgeDetection, BlobBandLaneFinder, (SobelLaneDistanceDetector)
     Usable movement_params values: StraightAwareCenterLaneDriver
     """
     return {
@@ -79,6 +81,12 @@ def set_speed_and_steering(img, lane_recognition, secondary_lane_recognition, mo
             process_right_lane = update_lane_data(right_lane, sec_right_lane)
     """
     lane_distance = secondary_lane_recognition.recognize_lanes(img)
+    if GEOMETRY:
+        # The movement params are tuned for QQVGA, so they always get the lanes in QQVGA coordinates
+        left_lane = GEOMETRY.to_reference_lane(left_lane)
+        right_lane = GEOMETRY.to_reference_lane(right_lane)
+        if lane_distance:
+            lane_distance = GEOMETRY.to_reference_y(lane_distance)
     speed, steering = movement_params.get_movement_params(left_lane, right_lane, lane_distance)
     if FinishLineDetected:
         speed = 0
@@ -87,6 +95,17 @@ def set_speed_and_steering(img, lane_recognition, secondary_lane_recognition, mo
     return int(speed), int(steering)
 
 
+def configure_geometry(geometry, configure_lane_recognition_geometry):
+    """
+    Sets the geometry of the image (see geometry.py) if it differs from QQVGA. The constants of the lane
+    recognition are derived from it, the lanes are converted back to QQVGA for the movement params.
+    Has to be called before setup_lane_recognition().
+    """
+    global GEOMETRY
+    configure_lane_recognition_geometry(geometry)
+    GEOMETRY = None if geometry.is_reference() else geometry
+
+
 def setup_lane_recognition(pixel_getter, get_lane_recognition_instance, get_finish_line_detection_instance):
     """
     Initializes lane recognition instances and setups pixel data retrieval.
@@ -102,15 +121,105 @@ def setup_lane_recognition(pixel_getter, get_lane_recognition_instance, get_fini
     return main, secondary
 
 
-def setup_movement_params(get_movement_params_instance, mode = 0):
+def setup_movement_params(get_movement_params_instance, mode = 0, fixed_point=False):
     """
-    Initializes the movement parameter instance.
+    Initializes the movement parameter instance. fixed_point selects the integer calculation (no floats per frame).
     """
     settings = get_settings()
-    return get_movement_params_instance(settings["movement_params"], mode)
+    return get_movement_params_instance(settings["movement_params"], mode, fixed_point)
+
+
+class FrameSkipper:
+    """
+    Reuses the results of the last frame if the rows read by the algorithms did not change, e.g. while the car
+    waits at the start or stands still.
+
+    The signature of the rows is computed by the pixel getter (get_signature()). A frame is only skipped if the last
+    two processed frames had the same signature and the same results and all algorithms were steady (is_steady())
+    after both, processing the frame again would give the same results then. Instead of being processed, the
+    algorithms advance their counters in skip_frame(). If one of them reports a changed state, the next frame is
+    processed again.
+    """
+
+    def __init__(self, algorithms):
+        self.algorithms = [algorithm for algorithm in algorithms if algorithm]
+        self.signature = None
+        self.results = None
+        self.steady = False # All algorithms were steady after the last processed frame
+        self.stable = False # The results can be reused for a frame with the same signature
+        self.frame_count = 0
+        self.skipped_count = 0
+
+    def is_steady(self):
+        for algorithm in self.algorithms:
+            if not algorithm.is_steady():
+                return False
+        return True
+
+    def reuse(self, signature):
+        """
+        Returns the results of the last processed frame if they can be reused for a frame with this signature,
+        otherwise None. The frame has to be processed then and its results passed to store().
+        """
+        self.frame_count += 1
+        if not self.stable or signature is None or signature != self.signature:
+            return None
+        for algorithm in self.algorithms:
+            if algorithm.skip_frame():
+                self.stable = False
+        self.skipped_count += 1
+        return self.results
+
+    def store(self, signature, results):
+        """
+        Stores the signature and the results (any comparable value) of a processed frame.
+        """
+        steady = self.is_steady()
+        self.stable = (steady and self.steady and signature is not None and signature == self.signature
+                       and results == self.results)
+        self.steady = steady
+        self.signature = signature
+        self.results = results
+
+    def get_skipped_permille(self):
+        """
+        Returns the number of skipped frames per 1000 frames.
+        """
+        return self.skipped_count * 1000 // self.frame_count if self.frame_count else 0
+
+def merge_rois(rois):
+    """
+    Merges regions of interest (x, y, w, h) with the same x-range that overlap or touch vertically.
+    Returns the merged list sorted by x-range and y.
+    """
+    merged = []
+    for x, y, w, h in sorted(rois, key=lambda roi: (roi[0], roi[2], roi[1])):
+        if merged:
+            last_x, last_y, last_w, last_h = merged[-1]
+            if last_x == x and last_w == w and y <= last_y + last_h:
+                merged[-1] = (x, last_y, w, max(last_y + last_h, y + h) - last_y)
+                continue
+        merged.append((x, y, w, h))
+    return merged
+
+
+def get_preprocessing_rois(lane_recognition, secondary_lane_recognition):
+    """
+    Returns the union of the regions of interest (x, y, w, h) of all used algorithms. Only these regions
+    have to be preprocessed (sobel and binary) on the camera.
+    """
+    rois = []
+    for algorithm in (lane_recognition, secondary_lane_recognition):
+        if algorithm:
+            rois.extend(algorithm.get_rois())
+    if FINISH_LINE_DETECTION_ENABLED and FinishLineDetection:
+        rois.extend(FinishLineDetection.get_rois())
+    return merge_rois(rois)
+
 
 def check_for_finish_line(img):
-    return
+    if not FINISH_LINE_DETECTION_ENABLED:
+        return
     global FinishLineDetected
     if not FinishLineDetected:
         if FinishLineDetection.check_for_finish_line(img):
@@ -0,0 +1,194 @@
+import io
+import sys
+import time
+
+LOG_FILE = "/sdcard/log.txt"
+FLUSH_INTERVAL_MS = 10000 # New errors are written to LOG_FILE at most once per interval
+MAX_ERROR_KINDS = 8 # Distinct kinds (exception type and location) that are counted, further ones are counted as "other"
+MESSAGE_BUFFER_SIZE = 1024 # Messages of the first error of every kind since the last flush
+MAX_MESSAGE_LENGTH = 120
+TRACEBACK_BUFFER_SIZE = 256 # End of the printed traceback that is searched for the location on MicroPython
+OTHER = "other"
+FILE_LINE_PREFIX = b'  File "'
+LOCATION_MASK = 0x3FFFFFFF # Keeps the location hash a small int on MicroPython
+
+
+def get_location(exception):
+    """
+    Returns "file:line" of the innermost frame of the traceback of an exception, "?" if it is not available.
+    Allocates a string for the traceback on MicroPython, so it is only called for new kinds of exceptions.
+    """
+    try:
+        traceback = getattr(exception, "__traceback__", None)
+        if traceback is not None: # CPython
+            while traceback.tb_next is not None:
+                traceback = traceback.tb_next
+            return "{}:{}".format(traceback.tb_frame.f_code.co_filename.split("/")[-1], traceback.tb_lineno)
+        # MicroPython has no __traceback__, the location is read from the printed traceback:
+        #   File "main.py", line 12, in main_loop
+        text = io.StringIO()
+        # noinspection PyUnresolvedReferences
+        sys.print_exception(exception, text)
+        for line in reversed(text.getvalue().split("\n")):
+            line = line.strip()
+            if line.startswith('File "'):
+                name_end = line.index('"', 6)
+                line_number = line[line.index("line ", name_end) + 5:].split(",")[0]
+                return "{}:{}".format(line[6:name_end].split("/")[-1], line_number)
+    except Exception:
+        pass
+    return "?"
+
+
+def hash_innermost_frame(traceback, length):
+    """
+    Returns a hash of the last line '  File "<file>", line <n>, in <function>' in traceback[:length] (a traceback
+    printed by sys.print_exception()), which is the location of the exception. 0 if there is no such line.
+    Only compares bytes, so nothing is allocated.
+    """
+    location = 0
+    line_start = 0
+    while line_start < length:
+        line_end = line_start
+        while line_end < length and traceback[line_end] != 10: # "\n"
+            line_end += 1
+        prefix_length = len(FILE_LINE_PREFIX)
+        if line_end - line_start > prefix_length:
+            i = 0
+            while i < prefix_length and traceback[line_start + i] == FILE_LINE_PREFIX[i]:
+                i += 1
+            if i == prefix_length:
+                location = 0
+                for i in range(line_start, line_end):
+                    location = ((location << 5) + location + traceback[i]) & LOCATION_MASK
+        line_start = line_end + 1
+    return location
+
+
+class ErrorLog:
+    """
+    Collects the exceptions of the main loop in memory instead of writing every one to the sd card.
+
+    The exceptions are counted per kind: the type and the location (innermost frame of the traceback), at most
+    MAX_ERROR_KINDS kinds. The same exception type raised at two places are two faults, so they are counted
+    separately. On MicroPython the location is found by printing the traceback into a reused stream and hashing
+    its last "File" line in a preallocated buffer (see hash_innermost_frame()), so counting only allocates the
+    small (type, location) key. The readable "file:line" is only created for a new kind.
+    The message of the first exception of every kind since the last flush is copied into a preallocated buffer.
+    service() writes the new counts and the messages to LOG_FILE at most every FLUSH_INTERVAL_MS, flush() writes
+    them immediately (e.g. at shutdown). A fault that repeats in every frame therefore causes one small write
+    per interval.
+    """
+
+    def __init__(self, filename=LOG_FILE):
+        self.filename = filename
+        self.counts = {} # kind (type, location hash) -> number of exceptions
+        self.logged_counts = {} # kind -> number of exceptions that were written
+        self.names = {OTHER: OTHER} # kind -> "<type> at <file>:<line>"
+        self.traceback_stream = io.BytesIO() # Reused for every traceback on MicroPython
+        self.traceback = bytearray(TRACEBACK_BUFFER_SIZE)
+        self.error_count = 0
+        self.logged_error_count = 0
+        self.messages = bytearray(MESSAGE_BUFFER_SIZE)
+        self.message_length = 0
+        self.dropped_messages = 0 # Messages that did not fit into the buffer
+        self.last_flush_time = None # The first error is written immediately
+        self.write_errors = 0
+
+    def get_location_hash(self, exception):
+        """
+        Returns a hash of the location (innermost frame of the traceback) of an exception, 0 if it is not available.
+        """
+        try:
+            traceback = getattr(exception, "__traceback__", None)
+            if traceback is not None: # CPython
+                while traceback.tb_next is not None:
+                    traceback = traceback.tb_next
+                return hash((traceback.tb_frame.f_code.co_filename, traceback.tb_lineno)) & LOCATION_MASK
+            stream = self.traceback_stream
+            stream.seek(0)
+            # noinspection PyUnresolvedReferences
+            sys.print_exception(exception, stream)
+            length = stream.tell() # Bytes of a longer traceback before can follow, they are not searched
+            start = length - len(self.traceback) if length > len(self.traceback) else 0
+            stream.seek(start)
+            stream.readinto(self.traceback)
+            return hash_innermost_frame(self.traceback, length - start)
+        except Exception:
+            return 0
+
+    def record(self, exception, frame=0):
+        """
+        Counts an exception. Returns True if it is the first exception of its kind, e.g. to print it.
+        """
+        kind = (type(exception), self.get_location_hash(exception))
+        new_kind = kind not in self.counts
+        if new_kind:
+            if len(self.counts) >= MAX_ERROR_KINDS:
+                kind = OTHER
+                new_kind = kind not in self.counts
+            else:
+                self.names[kind] = "{} at {}".format(type(exception).__name__, get_location(exception))
+        count = self.counts.get(kind, 0) + 1
+        self.counts[kind] = count
+        self.error_count += 1
+        if count - self.logged_counts.get(kind, 0) == 1: # First of its kind since the last flush
+            name = self.names[kind]
+            if kind == OTHER:
+                name = "{} at {}".format(type(exception).__name__, get_location(exception))
+            self.add_message("Frame {}: {}: {}\n".format(frame, name, exception))
+        return new_kind
+
+    def add_message(self, message):
+        data = message.encode()
+        if len(data) > MAX_MESSAGE_LENGTH:
+            data = data[:MAX_MESSAGE_LENGTH - 4] + b"...\n"
+        if self.message_length + len(data) > len(self.messages):
+            self.dropped_messages += 1
+            return
+        self.messages[self.message_length:self.message_length + len(data)] = data
+        self.message_length += len(data)
+
+    def service(self):
+        """
+        Writes the new errors if the last write is at least FLUSH_INTERVAL_MS ago. Without new errors it only
+        compares two counters, so it can be called in every frame.
+        """
+        if self.error_count == self.logged_error_count:
+            return
+        if self.last_flush_time is not None and \
+                time.ticks_diff(time.ticks_ms(), self.last_flush_time) < FLUSH_INTERVAL_MS:
+            return
+        self.flush()
+
+    def flush(self):
+        """
+        Writes the counts of the kinds with new errors and the buffered messages to the log file.
+        """
+        if self.error_count == self.logged_error_count:
+            return
+        self.last_flush_time = time.ticks_ms()
+        try:
+            with open(self.filename, "ab") as log:
+                log.write("Main loop errors at {} ms: {} (+{}), messages dropped: {}\n".format(
+                    self.last_flush_time, self.error_count, self.error_count - self.logged_error_count,
+                    self.dropped_messages).encode())
+                for kind, count in self.counts.items():
+                    if count != self.logged_counts.get(kind, 0):
+                        log.write("  {}: {} (+{})\n".format(self.names[kind], count,
+                                                             count - self.logged_counts.get(kind, 0)).encode())
+                log.write(memoryview(self.messages)[:self.message_length])
+        except OSError:
+            self.write_errors += 1
+            return
+        for kind, count in self.counts.items():
+            self.logged_counts[kind] = count
+        self.logged_error_count = self.error_count
+        self.message_length = 0
+        self.dropped_messages = 0
+
+    def get_statistics(self):
+        """
+        Returns the counters: (errors, kinds of errors, errors that were not written yet)
+        """
+        return self.error_count, len(self.counts), self.error_count - self.logged_error_count
@@ -0,0 +1,77 @@
+import struct
+
+FRAME_LOG_MAGIC = b"RBMP"
+FRAME_LOG_VERSION = 1
+FRAME_LOG_EXTENSION = ".rbm"
+BLOCK_SIZE = 512 # Size of one sd card block. The header and every record are a multiple of it
+FILE_HEADER_FORMAT = "<4sBHHHI" # Magic, version, width, height, bytes per row, record size
+FRAME_HEADER_FORMAT = "<II" # Frame index (starts at 1, 0 marks an unused record), time.ticks_ms()
+FRAME_HEADER_SIZE = struct.calcsize(FRAME_HEADER_FORMAT)
+
+
+def get_bitmap_stride(width):
+    """
+    Returns the number of bytes per row of a bitmap. The firmware stores every row in 32-bit words,
+    one bit per pixel starting with the lowest bit.
+    """
+    return ((width + 31) // 32) * 4
+
+
+def get_record_size(width, height):
+    """
+    Returns the size of one record (frame header and bitmap) rounded up to whole sd card blocks.
+    """
+    size = FRAME_HEADER_SIZE + get_bitmap_stride(width) * height
+    return ((size + BLOCK_SIZE - 1) // BLOCK_SIZE) * BLOCK_SIZE
+
+
+def pack_frame(record, frame_index, ticks, bitmap):
+    """
+    Writes the frame header and the raw bitmap (e.g. img.bytearray() after img.to_bitmap()) into a record.
+    """
+    struct.pack_into(FRAME_HEADER_FORMAT, record, 0, frame_index, ticks)
+    record[FRAME_HEADER_SIZE:FRAME_HEADER_SIZE + len(bitmap)] = bitmap
+
+
+class BitmapFrameLog:
+    """
+    Appends raw 1-bit frames to a file, one record per frame.
+
+    The file is preallocated for max_frames frames when it is created (unless preallocate is False), so no
+    new clusters have to be allocated on the sd card while driving. Frames after max_frames are discarded.
+    Use read_bitmap_frames() from Camera Simulator/log_reader.py to read the file on a PC.
+    """
+
+    def __init__(self, filename, width, height, max_frames, preallocate=True):
+        self.record_size = get_record_size(width, height)
+        self.max_frames = max_frames
+        self.frames = 0
+
+        header = bytearray(BLOCK_SIZE)
+        struct.pack_into(FILE_HEADER_FORMAT, header, 0, FRAME_LOG_MAGIC, FRAME_LOG_VERSION, width, height,
+                         get_bitmap_stride(width), self.record_size)
+        self.file = open(filename, "wb")
+        self.file.write(header)
+
+        if preallocate:
+            # Preallocate the file with empty records
+            empty_record = bytearray(self.record_size)
+            for _ in range(max_frames):
+                self.file.write(empty_record)
+            self.file.seek(BLOCK_SIZE)
+
+    def create_record(self):
+        return bytearray(self.record_size)
+
+    def write(self, record):
+        """
+        Writes a record created with create_record() and pack_frame(). Returns False if the file is full.
+        """
+        if self.frames >= self.max_frames:
+            return False
+        self.file.write(record)
+        self.frames += 1
+        return True
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,121 @@
+REFERENCE_WIDTH = 160 # All tuning values of the algorithms are given in pixels of QQVGA
+REFERENCE_HEIGHT = 120
+FRAME_SIZES = {
+    "QQVGA": (160, 120),
+    "QQQVGA": (80, 60),
+}
+
+
+def scale_value(value, scale):
+    """
+    Scales a non-negative pixel value and rounds it to the nearest integer.
+    """
+    return int(value * scale + 0.5)
+
+
+class Geometry:
+    """
+    Describes the image the camera delivers compared to the reference image (QQVGA, 160x120).
+
+    The frame size can be reduced (e.g. QQQVGA) and the frame can be cropped to the rows of the road
+    (sensor.set_windowing()). All pixel constants of the algorithms are tuned for the reference image,
+    configure_geometry() of every module derives its constants from an instance of this class, so the
+    resolution can be changed without retuning the algorithms.
+
+    Parameters:
+        frame_size (str): Name of the sensor frame size, see FRAME_SIZES
+        top (int): First row of the reference image that is captured
+        bottom (int): First row of the reference image below the captured rows
+    """
+
+    def __init__(self, frame_size="QQVGA", top=0, bottom=REFERENCE_HEIGHT):
+        if frame_size not in FRAME_SIZES:
+            raise ValueError("Unknown frame size: {}".format(frame_size))
+        if not 0 <= top < bottom <= REFERENCE_HEIGHT:
+            raise ValueError("The value(s) for top and / or bottom are not correct")
+        self.frame_size = frame_size
+        self.top = top
+        self.bottom = bottom
+        self.scale = FRAME_SIZES[frame_size][0] / REFERENCE_WIDTH
+        self.width = FRAME_SIZES[frame_size][0]
+        self.height = scale_value(bottom - top, self.scale)
+        self.reference_rows = {} # Row of the image -> row of the reference image (for rows created by rows())
+
+    def is_reference(self):
+        """
+        Returns True if the image is the reference image, nothing has to be converted then.
+        """
+        return self.frame_size == "QQVGA" and self.top == 0 and self.bottom == REFERENCE_HEIGHT
+
+    def get_window(self):
+        """
+        Returns the window (x, y, w, h) for sensor.set_windowing() in pixels of the frame size
+        or None if the full frame is used.
+        """
+        if self.top == 0 and self.bottom == REFERENCE_HEIGHT:
+            return None
+        return 0, scale_value(self.top, self.scale), self.width, self.height
+
+    def x(self, x):
+        """
+        Converts an x position of the reference image into the image.
+        """
+        return min(self.width - 1, max(0, scale_value(x, self.scale)))
+
+    def y(self, y):
+        """
+        Converts a y position of the reference image into the image. Rows outside of the window are
+        moved to the nearest row of the image.
+        """
+        return min(self.height - 1, max(0, scale_value(max(0, y - self.top), self.scale)))
+
+    def size(self, value):
+        """
+        Converts a distance (e.g. a margin or a threshold) of the reference image into the image.
+        Distances are at least 1 pixel.
+        """
+        return max(1, scale_value(value, self.scale))
+
+    def area(self, value):
+        """
+        Converts a number of pixels (e.g. a minimum blob size) of the reference image into the image.
+        """
+        return max(1, scale_value(value, self.scale * self.scale))
+
+    def rows(self, heights):
+        """
+        Converts a list of rows of the reference image (e.g. CHECK_HEIGHTS) into the image.
+        Rows outside of the window are removed, rows which fall together are only kept once.
+        """
+        rows = []
+        for height in heights:
+            if self.top <= height < self.bottom:
+                y = self.y(height)
+                if y not in rows:
+                    rows.append(y)
+                    self.reference_rows[y] = height
+        return rows
+
+    def to_reference_x(self, x):
+        """
+        Converts an x position of the image back into the reference image.
+        """
+        return scale_value(x, 1 / self.scale)
+
+    def to_reference_y(self, y):
+        """
+        Converts a y position of the image back into the reference image. Rows created by rows() are
+        converted back into exactly the row they were created from.
+        """
+        height = self.reference_rows.get(y)
+        if height is None:
+            height = self.top + scale_value(y, 1 / self.scale)
+        return height
+
+    def to_reference_lane(self, lane):
+        """
+        Converts a lane [(y, x), ...] of the image into the reference image.
+        """
+        if not lane:
+            return lane
+        return [(self.to_reference_y(y), self.to_reference_x(x)) for y, x in lane]
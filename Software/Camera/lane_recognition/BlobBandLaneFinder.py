@@ -0,0 +1,114 @@
+# Constants
+HEIGHT = 120
+WIDTH = 160
+CHECK_HEIGHTS = [45, 60, 70, 80, 85]  # For QQVGA, same as SobelEdgeDetection
+BAND_HEIGHT = 4  # Number of rows of the region of interest around every height
+MIN_BLOB_PIXELS = 3  # Smaller blobs are noise
+MAX_BLOB_WIDTH = 40  # Wider blobs are not a lane (e.g. a stop line or a crossing)
+# The pixel constants above are for QQVGA. configure_geometry() derives them from these values for other resolutions
+QQVGA_CONSTANTS = (CHECK_HEIGHTS, BAND_HEIGHT, MIN_BLOB_PIXELS, MAX_BLOB_WIDTH)
+
+
+def configure_geometry(geometry):
+    """
+    Derives the pixel constants of this module from the geometry of the image (see geometry.py).
+    Has to be called before the lane recognition is used.
+    """
+    global HEIGHT, WIDTH, CHECK_HEIGHTS, BAND_HEIGHT, MIN_BLOB_PIXELS, MAX_BLOB_WIDTH
+    check_heights, band_height, min_blob_pixels, max_blob_width = QQVGA_CONSTANTS
+    HEIGHT = geometry.height
+    WIDTH = geometry.width
+    CHECK_HEIGHTS = geometry.rows(check_heights)
+    BAND_HEIGHT = geometry.size(band_height)
+    MIN_BLOB_PIXELS = geometry.area(min_blob_pixels)
+    MAX_BLOB_WIDTH = geometry.size(max_blob_width)
+
+
+class BlobBandLaneFinder:
+    """
+    This class finds the lane elements with img.find_blobs() of the firmware instead of scanning
+    pixels in Python. For every height in CHECK_HEIGHTS, the blobs in a band of BAND_HEIGHT rows are
+    searched. The inner edge of the blob closest to the middle of the image is used for each lane.
+
+    On a PC the pixel getter provides a stand-in for find_blobs(), so the results can be compared
+    with recorded frames in the simulator.
+    """
+
+    def __init__(self):
+        self.pixel_getter = None
+
+    def setup(self, pixel_getter):
+        """
+        Initialize with a pixel getter. This function needs to be run once before lane recognition.
+        """
+        self.pixel_getter = pixel_getter
+
+    def recognize_lanes(self, img):
+        """
+        Recognizes the left and right lane positions at predefined heights in the image.
+
+        Parameters:
+            img: The input image containing the lane markings (bitmap on the camera).
+
+        Returns:
+            tuple: Two lists containing the detected (y, x) coordinates for the left and right lanes.
+
+        Raises:
+            ValueError: If the pixel getter has not been set up prior to executing lane recognition.
+        """
+        if not self.pixel_getter:
+            raise ValueError("Pixel getter has not been set up. Call setup() first.")
+
+        left_lane, right_lane = [], []
+        for y in CHECK_HEIGHTS:
+            left_x, right_x = self.find_lane_at_height(img, y)
+            if left_x is not None:
+                left_lane.append((y, left_x))
+            if right_x is not None:
+                right_lane.append((y, right_x))
+        return left_lane, right_lane
+
+    def find_lane_at_height(self, img, y):
+        """
+        Returns the x-coordinates of the left and right lane in the band around y.
+        Each value is None if no lane is found.
+        """
+        roi = (1, max(0, y - BAND_HEIGHT // 2), WIDTH - 3, BAND_HEIGHT)
+        middle = WIDTH // 2
+        left_x, right_x = None, None
+        for blob in self.pixel_getter.find_blobs(img, roi, MIN_BLOB_PIXELS):
+            if blob.w() > MAX_BLOB_WIDTH:
+                continue
+            if blob.cx() < middle:
+                inner_x = blob.x() + blob.w() - 1  # Right edge of the left lane
+                if left_x is None or inner_x > left_x:
+                    left_x = inner_x
+            else:
+                inner_x = blob.x()  # Left edge of the right lane
+                if right_x is None or inner_x < right_x:
+                    right_x = inner_x
+        return left_x, right_x
+
+    def get_rois(self):
+        """
+        Returns the regions of interest (x, y, w, h) this algorithm reads: The bands around CHECK_HEIGHTS.
+        """
+        return [(0, max(0, y - BAND_HEIGHT // 2), WIDTH, BAND_HEIGHT) for y in CHECK_HEIGHTS]
+
+    def is_steady(self):
+        """
+        This algorithm has no state, the same image always gives the same result.
+        """
+        return True
+
+    def skip_frame(self):
+        """
+        Called instead of recognize_lanes() if the last result is reused for an identical frame. Nothing to advance.
+        """
+        return False
+
+    def get_threshold(self):
+        return 0
+
+    def create_binary_image(self, img, canvas):
+        return
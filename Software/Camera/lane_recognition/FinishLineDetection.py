@@ -1,7 +1,55 @@
+# Constants
+HEIGHT = 120
+WIDTH = 160
+SEARCH_AREA = (45, WIDTH - 40, 75, 85) # Default (x_min, x_max, y_min, y_max) in which the markers are searched
+BLOB_RANGE_X = 30 # How far a blob can grow from its start
+BLOB_RANGE_Y = 10
+MARKER_LENGTH = (15, 25) # Min and max diagonal of a marker
+MARKER_HEIGHT = (4, 15) # Min and max (exclusive) height of a marker
+MARKER_WIDTH = (12, 30) # Min and max (exclusive) width of a marker
+NEXT_MARKER_DISTANCE = 30 # Distance along a marker at which the next marker is searched
+# The pixel constants above are for QQVGA. configure_geometry() derives them from these values for other resolutions
+QQVGA_CONSTANTS = (SEARCH_AREA, BLOB_RANGE_X, BLOB_RANGE_Y, MARKER_LENGTH, MARKER_HEIGHT, MARKER_WIDTH,
+                   NEXT_MARKER_DISTANCE)
+
+
+def configure_geometry(geometry):
+    """
+    Derives the pixel constants of this module from the geometry of the image (see geometry.py).
+    Has to be called before an instance is created.
+    """
+    global HEIGHT, WIDTH, SEARCH_AREA, BLOB_RANGE_X, BLOB_RANGE_Y, MARKER_LENGTH, MARKER_HEIGHT, MARKER_WIDTH
+    global NEXT_MARKER_DISTANCE
+    search_area, blob_range_x, blob_range_y, marker_length, marker_height, marker_width, next_marker_distance = QQVGA_CONSTANTS
+    HEIGHT = geometry.height
+    WIDTH = geometry.width
+    x_min, x_max, y_min, y_max = search_area
+    SEARCH_AREA = (geometry.x(x_min), geometry.x(x_max), geometry.y(y_min), geometry.y(y_max))
+    BLOB_RANGE_X = geometry.size(blob_range_x)
+    BLOB_RANGE_Y = geometry.size(blob_range_y)
+    MARKER_LENGTH = (geometry.size(marker_length[0]), geometry.size(marker_length[1]))
+    MARKER_HEIGHT = (geometry.size(marker_height[0]), geometry.size(marker_height[1]))
+    MARKER_WIDTH = (geometry.size(marker_width[0]), geometry.size(marker_width[1]))
+    NEXT_MARKER_DISTANCE = geometry.size(next_marker_distance)
+
+
 class FinishLineDetection:
-    def __init__(self, pixel_getter, width = 160, height = 120, sobel_threshold = 200,
+    def __init__(self, pixel_getter, width = None, height = None, sobel_threshold = 200,
                  pixel_skip_x = 3, pixel_skip_y = 1, detection_ratio_min = 0.1, detection_ratio_max = 0.25,
-                 x_min = 45, x_max = -40, y_min = 75, y_max = 85):
+                 x_min = None, x_max = None, y_min = None, y_max = None):
+        # Values which are not given are taken from the constants of the module
+        if width is None:
+            width = WIDTH
+        if height is None:
+            height = HEIGHT
+        if x_min is None:
+            x_min = SEARCH_AREA[0]
+        if x_max is None:
+            x_max = SEARCH_AREA[1]
+        if y_min is None:
+            y_min = SEARCH_AREA[2]
+        if y_max is None:
+            y_max = SEARCH_AREA[3]
         self.pixel_getter = pixel_getter
         self.width = width # Width of the image
         self.height = height # Height of the image
@@ -30,6 +78,15 @@ class FinishLineDetection:
         self.detection_count_max = round(self.detection_count_min * detection_ratio_max)
         self.detection_count_min = round(self.detection_count_min * detection_ratio_min)
 
+    def get_rois(self):
+        """
+        Returns the region of interest (x, y, w, h) this algorithm reads. The blobs can grow BLOB_RANGE_Y
+        pixels above and below the search area, the search for the second blob can cover the full width.
+        """
+        y_min = max(0, self.y_min - BLOB_RANGE_Y)
+        y_max = min(self.height, self.y_max + BLOB_RANGE_Y)
+        return [(0, y_min, self.width, y_max - y_min)]
+
     def check_for_finish_line(self, img):
         return self.find_blobs(img)
         count = 0
@@ -77,10 +134,10 @@ class FinishLineDetection:
                         if dx == 0 and dy == 0:
                             continue
                         nx, ny = x + dx, y + dy
-                        min_x = max(1, (start_x - 30))
-                        min_y = max(1, (start_y - 10))
-                        max_x = min(self.width - 2, (start_x + 30))
-                        max_y = min(self.height - 2, (start_y + 10))
+                        min_x = max(1, (start_x - BLOB_RANGE_X))
+                        min_y = max(1, (start_y - BLOB_RANGE_Y))
+                        max_x = min(self.width - 2, (start_x + BLOB_RANGE_X))
+                        max_y = min(self.height - 2, (start_y + BLOB_RANGE_Y))
                         if min_x <= nx < max_x and min_y <= ny < max_y and (nx, ny) not in visited:
                             if self.pixel_getter.get_pixel(img, nx, ny):
                                 queue.append((nx, ny))
@@ -135,17 +192,26 @@ class FinishLineDetection:
         return False
 
     def blob_is_valid(self, blob):
-        marker_min_length = 15 * 15
-        marker_max_length = 25 * 25
-
-        x_coords, y_coords = zip(*blob)
-        x_min_blob, x_max_blob = min(x_coords), max(x_coords)
-        y_min_blob, y_max_blob = min(y_coords), max(y_coords)
+        marker_min_length = MARKER_LENGTH[0] * MARKER_LENGTH[0]
+        marker_max_length = MARKER_LENGTH[1] * MARKER_LENGTH[1]
+
+        # Bounding box of the blob without creating lists of the coordinates
+        x_min_blob, y_min_blob = blob[0]
+        x_max_blob, y_max_blob = x_min_blob, y_min_blob
+        for x, y in blob:
+            if x < x_min_blob:
+                x_min_blob = x
+            elif x > x_max_blob:
+                x_max_blob = x
+            if y < y_min_blob:
+                y_min_blob = y
+            elif y > y_max_blob:
+                y_max_blob = y
         diagonal_length = (x_max_blob - x_min_blob) ** 2 + (y_max_blob - y_min_blob) ** 2
 
         if marker_min_length <= diagonal_length <= marker_max_length:
-            if 4 <= (y_max_blob - y_min_blob) < 15:
-                if 12 <= (x_max_blob - x_min_blob) < 30:
+            if MARKER_HEIGHT[0] <= (y_max_blob - y_min_blob) < MARKER_HEIGHT[1]:
+                if MARKER_WIDTH[0] <= (x_max_blob - x_min_blob) < MARKER_WIDTH[1]:
                     return True
         return False
 
@@ -170,7 +236,7 @@ class FinishLineDetection:
         b = y_mean - m * x_mean
 
         # Berechnung der Startpunkte für den nächsten Blob entlang der Regressionsgeraden
-        interval = 30
+        interval = NEXT_MARKER_DISTANCE
         start_x_min = int(x_mean - interval)
         start_y_min = int(m * start_x_min + b)
         start_x_max = int(x_mean + interval)
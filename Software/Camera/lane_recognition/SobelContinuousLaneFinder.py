@@ -6,9 +6,33 @@ X_DIF_HEIGHT = 5 # Number of lines in between elements used to calculate x_dif
 
 TOP_END = 10 # Where the image should end at the top
 BOTTOM_END = HEIGHT - 30 # Where the search should start
+BLOB_TOP_END = 30 # Blobs are not followed above this height
 
 NO_LANE_THRESHOLD = 5 # Number of unsuccessful lanes until the search for lines will be stopped
 X_SEARCH_RANGE = 10 # A lane element will be searched in this range around the expected
+IGNORE_ZONE = (50, HEIGHT - 30, WIDTH - 40, HEIGHT) # (x_min, y_min, x_max, y_max) Area in which the car is visible
+# The pixel constants above are for QQVGA. configure_geometry() derives them from these values for other resolutions
+QQVGA_CONSTANTS = (X_DIF_HEIGHT, TOP_END, BOTTOM_END, BLOB_TOP_END, X_SEARCH_RANGE, IGNORE_ZONE)
+
+
+def configure_geometry(geometry):
+    """
+    Derives the pixel constants of this module from the geometry of the image (see geometry.py).
+    Has to be called before the lane recognition is used.
+    """
+    global HEIGHT, WIDTH, X_DIF_HEIGHT, TOP_END, BOTTOM_END, BLOB_TOP_END, X_SEARCH_RANGE, IGNORE_ZONE
+    x_dif_height, top_end, bottom_end, blob_top_end, x_search_range, ignore_zone = QQVGA_CONSTANTS
+    HEIGHT = geometry.height
+    WIDTH = geometry.width
+    X_DIF_HEIGHT = geometry.size(x_dif_height)
+    TOP_END = geometry.y(top_end)
+    BOTTOM_END = geometry.y(bottom_end)
+    BLOB_TOP_END = geometry.y(blob_top_end)
+    X_SEARCH_RANGE = geometry.size(x_search_range)
+    x_min, y_min, x_max, y_max = ignore_zone
+    # The bottom of the ignore zone is the bottom of the image, so it is not limited to the last row
+    IGNORE_ZONE = (geometry.x(x_min), geometry.y(y_min), geometry.x(x_max), geometry.y(y_max) + 1)
+
 
 def get_is_in_ignore_zone(x, y):
     """
@@ -18,11 +42,8 @@ def get_is_in_ignore_zone(x, y):
             x: int - The x coordinate to be checked.
             y: int - The y coordinate to be checked.
     """
-    y_min = HEIGHT
-    y_max = HEIGHT - 30
-    x_min = 50
-    x_max = WIDTH - 40
-    if y_max < y < y_min:
+    x_min, y_min, x_max, y_max = IGNORE_ZONE
+    if y_min < y < y_max:
         if x_min < x < x_max:
             return True
     return False
@@ -119,7 +140,7 @@ class SobelContinuousLaneFinder:
                         if dx == 0 and dy == 0:
                             continue
                         nx, ny = x + dx, y + dy
-                        if 1 <= nx < WIDTH - 2 and 30 <= ny < HEIGHT - 2 and (nx, ny) not in visited and not get_is_in_ignore_zone(nx, ny):
+                        if 1 <= nx < WIDTH - 2 and BLOB_TOP_END <= ny < HEIGHT - 2 and (nx, ny) not in visited and not get_is_in_ignore_zone(nx, ny):
                             if self.pixel_getter.get_pixel(img, x, y):
                                 queue.append((nx, ny))
 
@@ -160,6 +181,24 @@ class SobelContinuousLaneFinder:
             if color >= len(colors):
                 color = 0
 
+    def get_rois(self):
+        """
+        Returns the region of interest (x, y, w, h) this algorithm reads: The area in which blobs are searched.
+        """
+        return [(0, BLOB_TOP_END, WIDTH, HEIGHT - BLOB_TOP_END)]
+
+    def is_steady(self):
+        """
+        This algorithm has no state, the same image always gives the same result.
+        """
+        return True
+
+    def skip_frame(self):
+        """
+        Called instead of recognize_lanes() if the last result is reused for an identical frame. Nothing to advance.
+        """
+        return False
+
     def get_threshold(self):
         return 0
 
@@ -8,12 +8,36 @@ PREDICTION_MARGIN = 10  # 20  # Allowed deviation for the predicted x-range
 # CHECK_HEIGHTS = [50, 100, 130]  # 0-239 0: Top of image 239: Bottom Important: Increase the values from left to right
 CHECK_HEIGHTS = [45, 60, 70, 80, 85]  # For QQVGA
 L1_L2_MIN = 55  # 90 #minimal difference for the x - Values in CHECK_HEIGHTS[1] & CHECK_HEIGHTS_[2] to be seperated as 2 different lanes
+ADJUST_MAX_HEIGHT_DIFFERENCE = 20  # Lanes are only adjusted between heights which are closer than this
+# The pixel constants above are for QQVGA. configure_geometry() derives them from these values for other resolutions
+QQVGA_CONSTANTS = (DIRECTION_CHANGE_THRESHOLD, PREDICTION_MARGIN, CHECK_HEIGHTS, L1_L2_MIN, ADJUST_MAX_HEIGHT_DIFFERENCE)
 # GLOBAL VARIABLES
-COUNT_PAST_DIRECTION_CHANGE = None
-LAST_LEFT_LANE = None
-LAST_RIGHT_LANE = None
-LEFT_CHANGE = None
-RIGHT_CHANGE = None
+# Values of the last frame per height {y: value}. The dictionaries are created once and only updated in place,
+# so the lane recognition does not allocate memory for them in every frame
+COUNT_PAST_DIRECTION_CHANGE = {}
+LAST_LEFT_LANE = {}
+LAST_RIGHT_LANE = {}
+LEFT_CHANGE = {}
+RIGHT_CHANGE = {}
+NO_LANE = {} # True if neither lane was found at the height in the last frame (see skip_frame())
+
+
+def configure_geometry(geometry):
+    """
+    Derives the pixel constants of this module from the geometry of the image (see geometry.py).
+    Has to be called before the lane recognition is used.
+    """
+    global HEIGHT, WIDTH, DIRECTION_CHANGE_THRESHOLD, PREDICTION_MARGIN, CHECK_HEIGHTS, L1_L2_MIN, ADJUST_MAX_HEIGHT_DIFFERENCE
+    direction_change_threshold, prediction_margin, check_heights, l1_l2_min, adjust_max_height_difference = QQVGA_CONSTANTS
+    HEIGHT = geometry.height
+    WIDTH = geometry.width
+    DIRECTION_CHANGE_THRESHOLD = geometry.size(direction_change_threshold)
+    PREDICTION_MARGIN = geometry.size(prediction_margin)
+    CHECK_HEIGHTS = geometry.rows(check_heights)
+    L1_L2_MIN = geometry.size(l1_l2_min)
+    ADJUST_MAX_HEIGHT_DIFFERENCE = geometry.size(adjust_max_height_difference)
+    for values in (COUNT_PAST_DIRECTION_CHANGE, LAST_LEFT_LANE, LAST_RIGHT_LANE, LEFT_CHANGE, RIGHT_CHANGE, NO_LANE):
+        values.clear()  # The heights of the last frame are not valid anymore
 
 
 def set_element_at_height(y, a_tuple, element):
@@ -21,12 +45,15 @@ def set_element_at_height(y, a_tuple, element):
     Sets the y value of a given tuple to element.
     If the tuple does not exist or the y-element is not in the tuple,
     the tuple will be created.
+    The list is changed in place, so no new list is allocated.
     """
     if a_tuple is None:
         a_tuple = []
 
     # Remove the existing (y, element) if it exists
-    a_tuple = [(h, v) for h, v in a_tuple if h != y]
+    for i in range(len(a_tuple) - 1, -1, -1):
+        if a_tuple[i][0] == y:
+            del a_tuple[i]
 
     if element is not None:
         a_tuple.append((y, element))
@@ -45,6 +72,24 @@ def get_element_at_height(y, a_tuple):
                     return element
 
 
+def set_value_at_height(y, values, value):
+    """
+    Sets the value of the dictionary values at the height y. None removes the height.
+    """
+    if value is None:
+        values.pop(y, None)
+    else:
+        values[y] = value
+
+
+def store_lane(lane, values):
+    """
+    Stores the x values of a lane [(y, x), ...] in the dictionary values {y: x}.
+    """
+    for y in CHECK_HEIGHTS:
+        set_value_at_height(y, values, get_element_at_height(y, lane))
+
+
 def adjust_lanes(left_lane, right_lane, height_bottom, height_mid):
     """
     Adjusts lane positions by moving elements from one lane to another based on height and proximity conditions.
@@ -130,9 +175,8 @@ class SobelEdgeDetection:
 
     def __init__(self):
         self.pixel_getter = None
-        global COUNT_PAST_DIRECTION_CHANGE
         for y in CHECK_HEIGHTS:
-            COUNT_PAST_DIRECTION_CHANGE = set_element_at_height(y, COUNT_PAST_DIRECTION_CHANGE, 0)
+            COUNT_PAST_DIRECTION_CHANGE[y] = 0
 
     def setup(self, pixel_getter):
         """
@@ -179,7 +223,7 @@ class SobelEdgeDetection:
                 right_lane.append((y, right_x))
 
         for i in range(len(CHECK_HEIGHTS) - 1, 0, -1):
-            if (CHECK_HEIGHTS[i] - CHECK_HEIGHTS[i - 1]) <= 20:
+            if (CHECK_HEIGHTS[i] - CHECK_HEIGHTS[i - 1]) <= ADJUST_MAX_HEIGHT_DIFFERENCE:
                 left_lane, right_lane = adjust_lanes(left_lane, right_lane, CHECK_HEIGHTS[i], CHECK_HEIGHTS[i-1])
             else:
                 """
@@ -187,9 +231,9 @@ class SobelEdgeDetection:
                 Stopping the function
                 """
                 break
-        global LAST_LEFT_LANE, LAST_RIGHT_LANE
-        LAST_LEFT_LANE = left_lane
-        LAST_RIGHT_LANE = right_lane
+        # The returned lanes are kept by the caller (e.g. virtual_cam), only their values are stored
+        store_lane(left_lane, LAST_LEFT_LANE)
+        store_lane(right_lane, LAST_RIGHT_LANE)
         return left_lane, right_lane
 
     def find_lane_at_height(self, img, y):
@@ -204,30 +248,29 @@ class SobelEdgeDetection:
             tuple: The x-coordinates of the left and right lanes at the given height.
                    Returns (None, None) if no lanes are detected.
         """
-        global LEFT_CHANGE, RIGHT_CHANGE, LAST_LEFT_LANE, LAST_RIGHT_LANE
         # Find left element
-        last_left_x = get_element_at_height(y, LAST_LEFT_LANE)
+        last_left_x = LAST_LEFT_LANE.get(y)
         if last_left_x is not None:
-            left_x_change = get_element_at_height(y, LEFT_CHANGE)
+            left_x_change = LEFT_CHANGE.get(y)
             left_x = self.find_lane_element(img, y, last_x=last_left_x, x_change=left_x_change, direction=-1)
             if left_x is not None:
                 left_x_change = left_x - last_left_x
-                LEFT_CHANGE = set_element_at_height(y, LEFT_CHANGE, left_x_change)
+                LEFT_CHANGE[y] = left_x_change
         else:
             left_x = self.find_lane_element(img, y, direction=-1, start_x=WIDTH // 2, end_x=1)
-            LEFT_CHANGE = set_element_at_height(y, LEFT_CHANGE, 0)
+            LEFT_CHANGE[y] = 0
 
         # Find right element
-        last_right_x = get_element_at_height(y, LAST_RIGHT_LANE)
+        last_right_x = LAST_RIGHT_LANE.get(y)
         if last_right_x is not None:
-            right_x_change = get_element_at_height(y, RIGHT_CHANGE)
+            right_x_change = RIGHT_CHANGE.get(y)
             right_x = self.find_lane_element(img, y, last_x=last_right_x, x_change=right_x_change, direction=1)
             if right_x is not None:
                 right_x_change = right_x - last_right_x
-                RIGHT_CHANGE = set_element_at_height(y, RIGHT_CHANGE, right_x_change)
+                RIGHT_CHANGE[y] = right_x_change
         else:
             right_x = self.find_lane_element(img, y, direction=1, start_x=WIDTH // 2, end_x=WIDTH - 3)
-            RIGHT_CHANGE = set_element_at_height(y, RIGHT_CHANGE, 0)
+            RIGHT_CHANGE[y] = 0
 
         # Check if left_x was found and there was a right lane previously
         if left_x is not None and last_right_x is not None:
@@ -257,18 +300,19 @@ class SobelEdgeDetection:
                 if last_right_x is None: right_x = None
 
         # Check if both lanes are empty and save / discard lanes
-        global COUNT_PAST_DIRECTION_CHANGE
         if left_x is None and right_x is None:
-            cpdr = get_element_at_height(y, COUNT_PAST_DIRECTION_CHANGE)
-            COUNT_PAST_DIRECTION_CHANGE = set_element_at_height(y, COUNT_PAST_DIRECTION_CHANGE, cpdr + 1)
+            NO_LANE[y] = True
+            cpdr = COUNT_PAST_DIRECTION_CHANGE.get(y, 0)
+            COUNT_PAST_DIRECTION_CHANGE[y] = cpdr + 1
             if cpdr > PAST_DIRECTION_CHANGE_SAVING:
-                LAST_LEFT_LANE = set_element_at_height(y, LAST_LEFT_LANE, None)
-                LAST_RIGHT_LANE = set_element_at_height(y, LAST_RIGHT_LANE, None)
-                COUNT_PAST_DIRECTION_CHANGE = set_element_at_height(y, COUNT_PAST_DIRECTION_CHANGE, 0)
+                LAST_LEFT_LANE.pop(y, None)
+                LAST_RIGHT_LANE.pop(y, None)
+                COUNT_PAST_DIRECTION_CHANGE[y] = 0
         else:
-            LAST_LEFT_LANE = set_element_at_height(y, LAST_LEFT_LANE, left_x)
-            LAST_RIGHT_LANE = set_element_at_height(y, LAST_RIGHT_LANE, right_x)
-            COUNT_PAST_DIRECTION_CHANGE = set_element_at_height(y, COUNT_PAST_DIRECTION_CHANGE, 0)
+            NO_LANE[y] = False
+            set_value_at_height(y, LAST_LEFT_LANE, left_x)
+            set_value_at_height(y, LAST_RIGHT_LANE, right_x)
+            COUNT_PAST_DIRECTION_CHANGE[y] = 0
         return left_x, right_x
 
     def find_lane_element(self, img, y, last_x=None, x_change=0, direction=1, start_x=None, end_x=None):
@@ -296,13 +340,39 @@ class SobelEdgeDetection:
             end_x = min(WIDTH - 3, max(1, last_x + x_change + direction * PREDICTION_MARGIN))
 
         # Get lane element
-        if start_x < end_x:
-            rng = range(start_x, end_x, 1)
-        else:
-            rng = range(start_x, end_x, -1)
-        for x in rng:
-            if self.pixel_getter.get_pixel(img, x, y):
-                return x
+        return self.pixel_getter.find_pixel(img, y, start_x, end_x)
+
+    def get_rois(self):
+        """
+        Returns the regions of interest (x, y, w, h) this algorithm reads: The rows in CHECK_HEIGHTS.
+        """
+        return [(0, y, WIDTH, 1) for y in CHECK_HEIGHTS]
+
+    def is_steady(self):
+        """
+        Returns False if a lane moved in the last frame (LEFT_CHANGE / RIGHT_CHANGE). The search of the next frame
+        depends on the movement, so the same image could give other lanes. The last lanes are stored after every
+        frame, they are the same if the result is the same.
+        """
+        for y in CHECK_HEIGHTS:
+            if LEFT_CHANGE.get(y) or RIGHT_CHANGE.get(y):
+                return False
+        return True
+
+    def skip_frame(self):
+        """
+        Called instead of recognize_lanes() if the last lanes are reused for an identical frame. Advances the
+        counters of the heights without a lane like recognize_lanes() would. The last lanes themselves stay the
+        same, recognize_lanes() stores them from its result at the end of every frame.
+
+        Returns:
+            bool: True if the state changed, so the lanes of the next frame have to be recognized again
+        """
+        for y in CHECK_HEIGHTS:
+            if NO_LANE.get(y):
+                cpdr = COUNT_PAST_DIRECTION_CHANGE.get(y, 0)
+                COUNT_PAST_DIRECTION_CHANGE[y] = 0 if cpdr > PAST_DIRECTION_CHANGE_SAVING else cpdr + 1
+        return False
 
     def get_threshold(self):
         return 0
@@ -3,6 +3,26 @@ WIDTH = 160
 SOBEL_THRESHOLD = 200  # Min: 0 Max: 1530
 TOP_END = 10 # Where the image should end at the top
 BOTTOM_END = HEIGHT - 10  # Where the search should start
+LEFT_COLUMN = 48 # The columns in which the lane distance is searched
+RIGHT_COLUMN = 120
+# The pixel constants above are for QQVGA. configure_geometry() derives them from these values for other resolutions
+QQVGA_CONSTANTS = (TOP_END, BOTTOM_END, LEFT_COLUMN, RIGHT_COLUMN)
+
+
+def configure_geometry(geometry):
+    """
+    Derives the pixel constants of this module from the geometry of the image (see geometry.py).
+    Has to be called before the lane recognition is used.
+    """
+    global HEIGHT, WIDTH, TOP_END, BOTTOM_END, LEFT_COLUMN, RIGHT_COLUMN
+    top_end, bottom_end, left_column, right_column = QQVGA_CONSTANTS
+    HEIGHT = geometry.height
+    WIDTH = geometry.width
+    TOP_END = geometry.y(top_end)
+    BOTTOM_END = geometry.y(bottom_end)
+    LEFT_COLUMN = geometry.x(left_column)
+    RIGHT_COLUMN = geometry.x(right_column)
+
 
 class SobelLaneDistanceDetector:
     """
@@ -43,36 +63,29 @@ class SobelLaneDistanceDetector:
         if not self.pixel_getter:
             raise ValueError("Pixel getter has not been set up. Call setup() first.")
 
-        # ToDo: Implement lane recognition algorithm here
-        # Use this snippet to get a pixel: pixel = self.pixel_getter.get_pixel(img, x, y)
-        x1 = 48
-        x2 = 120
-        for y in range(BOTTOM_END, TOP_END, -1):
-            y1, y2 = None, None
-            if self.pixel_getter.get_pixel(img, x1, y):
-                y1 = y
+        # The lane distance is the first row (from the bottom) in which one of the columns has a set pixel.
+        # If both columns have a set pixel in that row, it is the same row, so the columns need no comparison
+        y = self.pixel_getter.find_row_in_columns(img, LEFT_COLUMN, RIGHT_COLUMN, BOTTOM_END, TOP_END)
+        return 0 if y is None else y
 
-            if self.pixel_getter.get_pixel(img, x2, y):
-                y2 = y
-
-            if y1 is not None and y2 is not None:
-                if y1 < y2 - 40:
-                    return y1
-
-                elif y2 < y1 - 40:
-                    return y2
-
-                else:
-                    y = (y1 + y2) // 2
-                return y
-
-            if y1 is not None:
-                return y1
+    def get_rois(self):
+        """
+        Returns the regions of interest (x, y, w, h) this algorithm reads: The two columns between TOP_END
+        and BOTTOM_END.
+        """
+        return [(x, TOP_END + 1, 1, BOTTOM_END - TOP_END) for x in (LEFT_COLUMN, RIGHT_COLUMN)]
 
-            if y2 is not None:
-                return y2
+    def is_steady(self):
+        """
+        This algorithm has no state, the same image always gives the same result.
+        """
+        return True
 
-        return 0
+    def skip_frame(self):
+        """
+        Called instead of recognize_lanes() if the last result is reused for an identical frame. Nothing to advance.
+        """
+        return False
 
     def get_threshold(self):
         return 0
@@ -1,7 +1,20 @@
-from .SobelEdgeDetection import SobelEdgeDetection
-from .SobelContinuousLaneFinder import SobelContinuousLaneFinder
-from .SobelLaneDistanceDetector import SobelLaneDistanceDetector
-from .FinishLineDetection import FinishLineDetection
+from .kernels import find_pixel_forward, find_pixel_backward, count_pixels, find_row_in_columns, hash_rows
+
+BLOB_THRESHOLDS = [(1, 1)] # Thresholds for img.find_blobs() on a bitmap: Only set pixels
+
+# Registry of the lane recognition algorithms: name -> numeric id (part of the base name of the recordings).
+# Every algorithm is a class in a module of this package with the same name. The module is only imported when
+# an instance is created, so algorithms that are not selected in get_settings() cost no boot time and no heap.
+LANE_RECOGNITION_IDS = {
+    "SobelEdgeDetection": 4,
+    "SobelContinuousLaneFinder": 5,
+    "SobelLaneDistanceDetector": 6,
+    "BlobBandLaneFinder": 7,
+    # You can register new algorithms here
+}
+FINISH_LINE_DETECTION = "FinishLineDetection" # Module and class of the finish line detection (no id)
+LOADED_LANE_RECOGNITION_MODULES = {} # name -> imported module
+LANE_RECOGNITION_GEOMETRY = None # Set by configure_lane_recognition_geometry(), applied to the modules on import
 
 
 class PixelGetter:
@@ -16,13 +29,125 @@ class PixelGetter:
 
     Methods
     -------
+    set_image(img)
+        Called once per frame before the image is used. Pixel getters that
+        cache data of the image can prepare it here.
     get_pixel(img, x, y)
         Abstract method intended to return the color of the pixel at the
         specified (x, y) coordinate in the provided image.
+    find_pixel(img, y, start_x, end_x)
+        Returns the first x from start_x towards end_x (exclusive) at which
+        the pixel is set, or None.
+    count_pixels(img, y, start_x, end_x)
+        Returns the number of set pixels in the row y from start_x to end_x
+        (exclusive).
+    find_row_in_columns(img, x1, x2, start_y, end_y)
+        Returns the first y from start_y up to end_y (exclusive) at which the
+        pixel in column x1 or x2 is set, or None.
+    get_signature(img, rois)
+        Returns an integer that changes if a pixel inside the regions of
+        interest (x, y, w, h) changes, or None if the pixel getter cannot
+        compute it cheaply (the frame is never treated as unchanged then).
+    find_blobs(img, roi, pixels_threshold)
+        Returns the blobs (8-connected set pixels) inside roi = (x, y, w, h)
+        with at least pixels_threshold pixels. The blobs provide the methods
+        x(), y(), w(), h(), cx(), cy() and pixels() like the blobs of the
+        firmware. This implementation is the stand-in for img.find_blobs()
+        on a PC.
     """
+    def set_image(self, img):
+        pass
+
     def get_pixel(self, img, x, y):
         raise NotImplementedError("You need to implement this method.")
 
+    def find_pixel(self, img, y, start_x, end_x):
+        step = 1 if start_x < end_x else -1
+        for x in range(start_x, end_x, step):
+            if self.get_pixel(img, x, y):
+                return x
+        return None
+
+    def count_pixels(self, img, y, start_x, end_x):
+        count = 0
+        for x in range(start_x, end_x):
+            if self.get_pixel(img, x, y):
+                count += 1
+        return count
+
+    def find_row_in_columns(self, img, x1, x2, start_y, end_y):
+        for y in range(start_y, end_y, -1):
+            if self.get_pixel(img, x1, y) or self.get_pixel(img, x2, y):
+                return y
+        return None
+
+    def get_signature(self, img, rois):
+        return None
+
+    def find_blobs(self, img, roi, pixels_threshold=1):
+        roi_x, roi_y, roi_w, roi_h = roi
+        visited = set()
+        blobs = []
+        for start_y in range(roi_y, roi_y + roi_h):
+            for start_x in range(roi_x, roi_x + roi_w):
+                if (start_x, start_y) in visited or not self.get_pixel(img, start_x, start_y):
+                    continue
+                blob = Blob(start_x, start_y)
+                visited.add((start_x, start_y))
+                queue = [(start_x, start_y)]
+                while queue:
+                    x, y = queue.pop()
+                    blob.add(x, y)
+                    for ny in range(max(roi_y, y - 1), min(roi_y + roi_h, y + 2)):
+                        for nx in range(max(roi_x, x - 1), min(roi_x + roi_w, x + 2)):
+                            if (nx, ny) not in visited and self.get_pixel(img, nx, ny):
+                                visited.add((nx, ny))
+                                queue.append((nx, ny))
+                if blob.pixels() >= pixels_threshold:
+                    blobs.append(blob)
+        return blobs
+
+
+class Blob:
+    """
+    Stand-in for the blobs returned by img.find_blobs() of the firmware.
+    Only the methods used by the lane recognition are implemented.
+    """
+    def __init__(self, x, y):
+        self.x_min, self.x_max = x, x
+        self.y_min, self.y_max = y, y
+        self.pixel_count = 0
+        self.x_sum = 0
+        self.y_sum = 0
+
+    def add(self, x, y):
+        self.x_min, self.x_max = min(self.x_min, x), max(self.x_max, x)
+        self.y_min, self.y_max = min(self.y_min, y), max(self.y_max, y)
+        self.pixel_count += 1
+        self.x_sum += x
+        self.y_sum += y
+
+    def x(self):
+        return self.x_min
+
+    def y(self):
+        return self.y_min
+
+    def w(self):
+        return self.x_max - self.x_min + 1
+
+    def h(self):
+        return self.y_max - self.y_min + 1
+
+    def cx(self):
+        return self.x_sum // self.pixel_count
+
+    def cy(self):
+        return self.y_sum // self.pixel_count
+
+    def pixels(self):
+        return self.pixel_count
+
 
 class CameraPixelGetter(PixelGetter):
     """
@@ -32,6 +157,57 @@ class CameraPixelGetter(PixelGetter):
     def get_pixel(self, img, x, y):
         return img.get_pixel(x, y)
 
+    def find_blobs(self, img, roi, pixels_threshold=1):
+        return img.find_blobs(BLOB_THRESHOLDS, roi=roi, x_stride=1, y_stride=1, pixels_threshold=pixels_threshold,
+                              merge=False)
+
+
+class BitmapPixelGetter(PixelGetter):
+    """
+    The BitmapPixelGetter reads the pixels of a bitmap (camera image after img.to_bitmap()) directly
+    from the image data instead of calling img.get_pixel() of the firmware for every pixel.
+
+    set_image(img) has to be called once per frame. It takes a memoryview of img.bytearray(), the
+    following queries only use index arithmetic on it. Every row is stored in 32-bit words with one
+    bit per pixel, starting with the lowest bit. The scans are done by the kernels in kernels.py
+    (viper code on the camera).
+    """
+    def __init__(self):
+        self.data = None
+        self.stride = 0
+
+    def set_image(self, img):
+        self.data = memoryview(img.bytearray())
+        self.stride = ((img.width() + 31) // 32) * 4
+
+    def get_pixel(self, img, x, y):
+        return (self.data[y * self.stride + (x >> 3)] >> (x & 7)) & 1
+
+    def find_pixel(self, img, y, start_x, end_x):
+        if start_x < end_x:
+            x = find_pixel_forward(self.data, y * self.stride, start_x, end_x)
+        else:
+            x = find_pixel_backward(self.data, y * self.stride, start_x, end_x)
+        return None if x < 0 else x
+
+    def count_pixels(self, img, y, start_x, end_x):
+        return count_pixels(self.data, y * self.stride, start_x, end_x)
+
+    def find_row_in_columns(self, img, x1, x2, start_y, end_y):
+        y = find_row_in_columns(self.data, self.stride, x1, x2, start_y, end_y)
+        return None if y < 0 else y
+
+    def get_signature(self, img, rois):
+        # Whole bytes are hashed, so pixels next to a region can change the signature as well (never the opposite)
+        signature = 0
+        for x, y, w, h in rois:
+            signature = hash_rows(self.data, self.stride, x >> 3, (x + w + 7) >> 3, y, y + h, signature)
+        return signature
+
+    def find_blobs(self, img, roi, pixels_threshold=1):
+        return img.find_blobs(BLOB_THRESHOLDS, roi=roi, x_stride=1, y_stride=1, pixels_threshold=pixels_threshold,
+                              merge=False)
+
 
 class VirtualCamPixelGetter(PixelGetter):
     """
@@ -49,13 +225,13 @@ def get_pixel_getter(type_name):
     the given type name.
 
     This function facilitates the retrieval of pixel information by
-    selecting the appropriate pixel getter object, such as 'camera' or
-    'virtual_cam'. A ValueError is raised if the specified type name
+    selecting the appropriate pixel getter object, such as 'camera',
+    'bitmap' or 'virtual_cam'. A ValueError is raised if the specified type name
     does not match any known pixel getter types.
 
     Parameters:
     type_name (str): A string indicating the type of pixel getter to
-    retrieve. Accepted values are 'camera' and 'virtual_cam'.
+    retrieve. Accepted values are 'camera', 'bitmap' and 'virtual_cam'.
 
     Returns:
     object: An instance of the pixel getter class corresponding to
@@ -67,19 +243,35 @@ def get_pixel_getter(type_name):
     """
     if type_name == 'camera':
         return CameraPixelGetter()
+    elif type_name == 'bitmap':
+        return BitmapPixelGetter()
     elif type_name == 'virtual_cam':
         return VirtualCamPixelGetter()
     else:
         raise ValueError("Unknown pixel getter type specified.")
 
 
+def load_lane_recognition(name):
+    """
+    Returns the class of a lane recognition algorithm of this package and imports its module on first use.
+    The geometry set by configure_lane_recognition_geometry() is applied to the module right after the import.
+    """
+    module = LOADED_LANE_RECOGNITION_MODULES.get(name)
+    if module is None:
+        module = __import__(__name__ + "." + name, None, None, (name,))
+        if LANE_RECOGNITION_GEOMETRY is not None:
+            module.configure_geometry(LANE_RECOGNITION_GEOMETRY)
+        LOADED_LANE_RECOGNITION_MODULES[name] = module
+    return getattr(module, name)
+
+
 def get_lane_recognition_instance(instance):
     """
     Get an instance of a lane recognition class based on the given string identifier.
 
     This function returns an instance of a lane recognition class specified by
-    the given instance identifier. The function can be easily extended to support additional
-    lane recognition classes by adding additional conditions for new identifiers.
+    the given instance identifier. Every name registered in LANE_RECOGNITION_IDS can be
+    instantiated, the module of the class is imported on first use (see load_lane_recognition()).
     It can return None if the input is 'None'
 
     Parameters:
@@ -101,15 +293,9 @@ def get_lane_recognition_instance(instance):
     """
     if instance == 'None':
         return None
-    elif instance == 'SobelEdgeDetection':
-        return SobelEdgeDetection()
-    elif instance == "SobelContinuousLaneFinder":
-        return SobelContinuousLaneFinder()
-    elif instance == 'SobelLaneDistanceDetector':
-        return SobelLaneDistanceDetector()
-    # You can implement new instances here
-    else:
+    if instance not in LANE_RECOGNITION_IDS:
         raise ValueError("Unknown process function specified.")
+    return load_lane_recognition(instance)()
 
 
 def get_lane_recognition_id(instance_name):
@@ -117,8 +303,8 @@ def get_lane_recognition_id(instance_name):
             Retrieves the lane recognition ID corresponding to a given instance name.
 
             This function maps specific lane recognition algorithms (represented by their instance names)
-            to unique numeric IDs. If the provided instance name does not match any predefined
-            algorithm, the function returns a default value of -1.
+            to unique numeric IDs (see LANE_RECOGNITION_IDS). If the provided instance name does not match any
+            registered algorithm, the function returns a default value of -1.
 
             Parameters:
                 instance_name (str): The name of the movement algorithm instance to retrieve the ID for.
@@ -126,13 +312,33 @@ def get_lane_recognition_id(instance_name):
             Returns:
                 int: The numeric ID corresponding to the instance name, or -1 if the name is not found.
         """
-    lane_recognition_id = {
-        "SobelEdgeDetection": 4,
-        "SobelContinuousLaneFinder": 5,
-        "SobelLaneDistanceDetector": 6,
-    }.get(instance_name, -1)  # Default to -1 if not found
-    return lane_recognition_id
+    return LANE_RECOGNITION_IDS.get(instance_name, -1)  # Default to -1 if not found
+
+
+def get_check_heights(lane_recognition):
+    """
+    Returns the rows at which the lane recognition detects lane elements, e.g. the rows logged by the telemetry.
+    The rows are converted back into the reference image (QQVGA) like the lanes in set_speed_and_steering(), so
+    they match the y values of the logged lanes. Algorithms without fixed rows return [].
+    """
+    module = LOADED_LANE_RECOGNITION_MODULES.get(type(lane_recognition).__name__)
+    heights = getattr(module, "CHECK_HEIGHTS", [])
+    if LANE_RECOGNITION_GEOMETRY is None:
+        return list(heights)
+    return [LANE_RECOGNITION_GEOMETRY.to_reference_y(y) for y in heights]
 
 
 def get_finish_line_detection_instance(pixel_getter):
-    return FinishLineDetection(pixel_getter)
\ No newline at end of file
+    return load_lane_recognition(FINISH_LINE_DETECTION)(pixel_getter)
+
+
+def configure_lane_recognition_geometry(geometry):
+    """
+    Derives the pixel constants of the lane recognition algorithms (and the finish line detection) from
+    the geometry of the image (see geometry.py). Has to be called before the instances are created.
+    Modules that are imported later get the geometry on import (see load_lane_recognition()).
+    """
+    global LANE_RECOGNITION_GEOMETRY
+    LANE_RECOGNITION_GEOMETRY = geometry
+    for module in LOADED_LANE_RECOGNITION_MODULES.values():
+        module.configure_geometry(geometry)
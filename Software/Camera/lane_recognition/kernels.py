@@ -0,0 +1,196 @@
+"""
+Inner loops of the lane recognition on bitmaps (see BitmapPixelGetter), compiled by the viper code emitter on the
+camera and plain Python on a PC.
+
+All kernels take the raw bitmap (data: memoryview of img.bytearray()) and work on byte offsets: row is y * stride,
+a pixel x of the row is bit (x & 7) of byte row + (x >> 3). They return -1 instead of None, viper can only return
+integers. The Python versions (..._python) are always defined, the exported names are the viper versions if the
+micropython module is available. check_kernels() compares both on the camera (CHECK_KERNELS in main.py), the
+Python versions are checked on a PC by Camera Simulator/test_kernels.py.
+"""
+SIGNATURE_MASK = 0x3FFFFFFF # Signatures are kept below 2^30, so viper and Python return the same small integers
+try:
+    # noinspection PyUnresolvedReferences
+    import micropython
+    NATIVE = True
+except ImportError:
+    NATIVE = False
+
+
+# region Python versions
+
+def find_pixel_forward_python(data, row, start_x, end_x):
+    """
+    Returns the first set pixel from start_x to end_x (exclusive) in the row or -1.
+    """
+    x = start_x
+    while x < end_x:
+        byte = data[row + (x >> 3)]
+        if byte == 0: # No pixel set in this byte, continue with the next byte
+            x = (x | 7) + 1
+        elif (byte >> (x & 7)) & 1:
+            return x
+        else:
+            x += 1
+    return -1
+
+
+def find_pixel_backward_python(data, row, start_x, end_x):
+    """
+    Returns the first set pixel from start_x down to end_x (exclusive) in the row or -1.
+    """
+    x = start_x
+    while x > end_x:
+        byte = data[row + (x >> 3)]
+        if byte == 0: # No pixel set in this byte, continue with the previous byte
+            x = (x & ~7) - 1
+        elif (byte >> (x & 7)) & 1:
+            return x
+        else:
+            x -= 1
+    return -1
+
+
+def count_pixels_python(data, row, start_x, end_x):
+    """
+    Returns the number of set pixels from start_x to end_x (exclusive) in the row.
+    """
+    count = 0
+    x = start_x
+    while x < end_x:
+        count += (data[row + (x >> 3)] >> (x & 7)) & 1
+        x += 1
+    return count
+
+
+def find_row_in_columns_python(data, stride, x1, x2, start_y, end_y):
+    """
+    Returns the first row from start_y up to end_y (exclusive) in which the pixel of column x1 or x2 is set or -1.
+    """
+    y = start_y
+    while y > end_y:
+        row = y * stride
+        if (data[row + (x1 >> 3)] >> (x1 & 7)) & 1 or (data[row + (x2 >> 3)] >> (x2 & 7)) & 1:
+            return y
+        y -= 1
+    return -1
+
+
+def hash_rows_python(data, stride, start_byte, end_byte, start_y, end_y, signature):
+    """
+    Continues the signature (signature * 33 + byte, see SIGNATURE_MASK) with the bytes start_byte to end_byte
+    (exclusive) of the rows start_y to end_y (exclusive). A change of a single byte always changes the signature.
+    """
+    y = start_y
+    while y < end_y:
+        i = y * stride + start_byte
+        end = y * stride + end_byte
+        while i < end:
+            signature = ((signature << 5) + signature + data[i]) & SIGNATURE_MASK
+            i += 1
+        y += 1
+    return signature
+
+# endregion
+
+
+if NATIVE:
+    # noinspection PyUnresolvedReferences
+    @micropython.viper
+    def find_pixel_forward(data: ptr8, row: int, start_x: int, end_x: int) -> int:
+        x = start_x
+        while x < end_x:
+            byte = int(data[row + (x >> 3)])
+            if byte == 0:
+                x = (x | 7) + 1
+            elif (byte >> (x & 7)) & 1:
+                return x
+            else:
+                x += 1
+        return -1
+
+    # noinspection PyUnresolvedReferences
+    @micropython.viper
+    def find_pixel_backward(data: ptr8, row: int, start_x: int, end_x: int) -> int:
+        x = start_x
+        while x > end_x:
+            byte = int(data[row + (x >> 3)])
+            if byte == 0:
+                x = (x & ~7) - 1
+            elif (byte >> (x & 7)) & 1:
+                return x
+            else:
+                x -= 1
+        return -1
+
+    # noinspection PyUnresolvedReferences
+    @micropython.viper
+    def count_pixels(data: ptr8, row: int, start_x: int, end_x: int) -> int:
+        count = 0
+        x = start_x
+        while x < end_x:
+            count += (int(data[row + (x >> 3)]) >> (x & 7)) & 1
+            x += 1
+        return count
+
+    # noinspection PyUnresolvedReferences
+    @micropython.viper
+    def find_row_in_columns(data: ptr8, stride: int, x1: int, x2: int, start_y: int, end_y: int) -> int:
+        y = start_y
+        while y > end_y:
+            row = y * stride
+            if (int(data[row + (x1 >> 3)]) >> (x1 & 7)) & 1:
+                return y
+            if (int(data[row + (x2 >> 3)]) >> (x2 & 7)) & 1:
+                return y
+            y -= 1
+        return -1
+
+    # noinspection PyUnresolvedReferences
+    @micropython.viper
+    def hash_rows(data: ptr8, stride: int, start_byte: int, end_byte: int, start_y: int, end_y: int,
+                  signature: int) -> int:
+        y = start_y
+        while y < end_y:
+            i = y * stride + start_byte
+            end = y * stride + end_byte
+            while i < end:
+                signature = ((signature << 5) + signature + int(data[i])) & 0x3FFFFFFF
+                i += 1
+            y += 1
+        return signature
+else:
+    find_pixel_forward = find_pixel_forward_python
+    find_pixel_backward = find_pixel_backward_python
+    count_pixels = count_pixels_python
+    find_row_in_columns = find_row_in_columns_python
+    hash_rows = hash_rows_python
+
+
+def check_kernels(data, stride, width, height):
+    """
+    Compares the exported kernels with the Python versions on every row of a bitmap. Called during the setup
+    of main.py if CHECK_KERNELS is set:
+    check_kernels(memoryview(img.bytearray()), ((img.width() + 31) // 32) * 4, img.width(), img.height())
+
+    Returns:
+        int: Number of results that differ (0 if the kernels are identical)
+    """
+    errors = 0
+    for y in range(height):
+        row = y * stride
+        for start_x, end_x in ((0, width), (width // 3, 2 * width // 3), (5, 6)):
+            if find_pixel_forward(data, row, start_x, end_x) != find_pixel_forward_python(data, row, start_x, end_x):
+                errors += 1
+            if find_pixel_backward(data, row, end_x - 1, start_x - 1) != \
+                    find_pixel_backward_python(data, row, end_x - 1, start_x - 1):
+                errors += 1
+            if count_pixels(data, row, start_x, end_x) != count_pixels_python(data, row, start_x, end_x):
+                errors += 1
+    for x1, x2 in ((0, width - 1), (width // 3, 2 * width // 3)):
+        if find_row_in_columns(data, stride, x1, x2, height - 1, -1) != \
+                find_row_in_columns_python(data, stride, x1, x2, height - 1, -1):
+            errors += 1
+    if hash_rows(data, stride, 0, stride, 0, height, 0) != hash_rows_python(data, stride, 0, stride, 0, height, 0):
+        errors += 1
+    return errors
@@ -1,11 +1,27 @@
 import math
 
+# The lanes are always given in QQVGA coordinates (see set_speed_and_steering() in common.py),
+# so the constants of this file do not depend on the resolution of the camera
 HEIGHT = 120
 WIDTH = 160
 
 # CHECK_HEIGHTS = [35, 50, 60, 75, 81]  # For QQVGA
 CHECK_HEIGHTS = [60, 70, 80, 85]  # For QQVGA
 CROSSING_DETECTED = False
+CROSSING_HEIGHTS = (80, 90)  # If both lanes have no element at these heights, a crossing is guessed
+
+# Fixed-point path: Deviations are integers scaled by DEVIATION_SCALE (-1.0 - 1.0 -> -4000 - 4000), weights by
+# WEIGHT_SCALE, so no float objects are allocated per frame on MicroPython. DEVIATION_SCALE is a multiple of WIDTH and
+# of 1000, so the deviation of whole pixels and the thresholds (3 decimals) are exact
+DEVIATION_SCALE = 4000
+WEIGHT_SCALE = 100
+
+
+def to_fixed(value, scale=DEVIATION_SCALE):
+    """
+    Converts a float (threshold or weight) into the fixed-point scale, rounded to the nearest integer.
+    """
+    return int(value * scale + (0.5 if value >= 0 else -0.5))
 
 
 def calculate_deviation(left_border_element, right_border_element):
@@ -40,6 +56,21 @@ def calculate_deviation(left_border_element, right_border_element):
     return deviation
 
 
+def calculate_deviation_fixed(left_border_element, right_border_element):
+    """
+    Fixed-point version of calculate_deviation(): Returns the deviation in -DEVIATION_SCALE - DEVIATION_SCALE,
+    rounded to the nearest integer.
+    """
+    # (WIDTH / 2 - (left + right) / 2) / (WIDTH / 2) = (WIDTH - left - right) / WIDTH
+    numerator = (WIDTH - left_border_element - right_border_element) * DEVIATION_SCALE
+    deviation = (2 * numerator + WIDTH) // (2 * WIDTH)
+    if deviation > DEVIATION_SCALE:
+        deviation = DEVIATION_SCALE
+    elif deviation < -DEVIATION_SCALE:
+        deviation = -DEVIATION_SCALE
+    return deviation
+
+
 def adjust_deviation(deviation, thresholds):
     """Adjusts the deviation based on given steps"""
 
@@ -54,6 +85,42 @@ def adjust_deviation(deviation, thresholds):
     return adjusted_deviation * (-1 if deviation < 0 else 1)
 
 
+def adjust_deviation_fixed(deviation, thresholds):
+    """
+    Fixed-point version of adjust_deviation(), the thresholds have to be converted with to_fixed().
+    """
+    abs_deviation = -deviation if deviation < 0 else deviation
+    adjusted_deviation = DEVIATION_SCALE
+
+    for threshold, value in thresholds:
+        if abs_deviation < threshold:
+            adjusted_deviation = value
+            break
+
+    return -adjusted_deviation if deviation < 0 else adjusted_deviation
+
+
+def count_elements_below(lane, y_min):
+    """
+    Returns the number of elements of a lane below the height y_min (y > y_min).
+    """
+    count = 0
+    for y, _ in lane:
+        if y > y_min:
+            count += 1
+    return count
+
+
+def has_element_at_heights(lane, heights):
+    """
+    Returns True if the lane has an element at one of the heights.
+    """
+    for y, _ in lane:
+        if y in heights:
+            return True
+    return False
+
+
 def find_closest_in_range(lane, target, range_min, range_max):
     """
 
@@ -71,7 +138,11 @@ def find_closest_in_range(lane, target, range_min, range_max):
     return closest_point
 
 
-def find_deviation_at_height(left_lane, right_lane, check_height):
+def find_deviation_at_height(left_lane, right_lane, check_height, calculate=calculate_deviation):
+    """
+    Returns the deviation at check_height, calculated with calculate (calculate_deviation or
+    calculate_deviation_fixed), or None if no lane element is close to the height.
+    """
     # Tolerance for values
     # tolerance = 30
     tolerance = 5
@@ -87,7 +158,7 @@ def find_deviation_at_height(left_lane, right_lane, check_height):
         y_left, x_left = closest_left
         y_right, x_right = closest_right
         if y_left == y_right:
-            return calculate_deviation(x_left, x_right)
+            return calculate(x_left, x_right)
 
         # Case 2: Both values exist and the y-values are not equal
         # -> Use the value that is closer to the check_height
@@ -95,19 +166,19 @@ def find_deviation_at_height(left_lane, right_lane, check_height):
         right_distance = abs(y_right - check_height)
 
         if left_distance <= right_distance:
-            return calculate_deviation(x_left, WIDTH)
+            return calculate(x_left, WIDTH)
         else:
-            return calculate_deviation(0, x_right)
+            return calculate(0, x_right)
 
     # Case 3: One value exists and is close to the check_height
     if closest_left:
         _, x_left = closest_left
         # return calculate_deviation(x_left, WIDTH + 100)
-        return calculate_deviation(x_left, WIDTH + 50)
+        return calculate(x_left, WIDTH + 50)
     elif closest_right:
         _, x_right = closest_right
         # return calculate_deviation(-100, x_right)
-        return calculate_deviation(-50, x_right)
+        return calculate(-50, x_right)
 
     # Case 4: Nothing found
     return None
@@ -170,15 +241,19 @@ def interpolate_deviations(deviations):
 class StraightAwareCenterLaneDriver:
     """
     TODO: Documentation
+
+    With fixed_point=True the deviations are calculated with integers (see DEVIATION_SCALE) instead of floats.
+    Speed and steering are the same as with the float path (see calculate_steering_fixed()).
     """
 
-    def __init__(self, driving_mode):
+    def __init__(self, driving_mode, fixed_point=False):
         self.last_speed = 0
         self.brake_mode = False
         self.brake_mode_count = 0
         self.count = 0
         self.driving_mode = driving_mode
         self.crossing_count = 0
+        self.crossing_state = None # CROSSING_DETECTED used for the last steering, None if it returned before
 
         # Constants
         self.max_frames_brake_mode = 10
@@ -203,26 +278,34 @@ class StraightAwareCenterLaneDriver:
             self.speed_thresholds = [70, 50, 40]  # How big the lane distance has to be to achieve a certain speed
             self.crossing_duration = 9
 
+        self.fixed_point = fixed_point
+        self.deviation_function = calculate_deviation_fixed if fixed_point else calculate_deviation
+        self.steering_weights_fixed = [(height, to_fixed(weight, WEIGHT_SCALE)) for height, weight in self.steering_weights]
+        self.steering_thresholds_fixed = [(to_fixed(threshold), to_fixed(value))
+                                          for threshold, value in self.steering_thresholds]
+
     def get_movement_params(self, left_lane, right_lane, lane_distance):
         """
 
         """
         calculated_speed = 5
         calculated_steering = 50
+        self.crossing_state = None
         full_left = 99
         full_right = 1
-        filtered_left_lane = [tupel for tupel in left_lane if tupel[0] > 50]
-        filtered_right_lane = [tupel for tupel in right_lane if tupel[0] > 50]
-        guess_cross_left = [tupel for tupel in left_lane if tupel[0] in (80, 90)]
-        guess_cross_right = [tupel for tupel in right_lane if tupel[0] in (80, 90)]
+        # Only the number of elements is needed, so they are counted instead of creating filtered lists
+        filtered_left_count = count_elements_below(left_lane, 50)
+        filtered_right_count = count_elements_below(right_lane, 50)
+        guess_cross_left = has_element_at_heights(left_lane, CROSSING_HEIGHTS)
+        guess_cross_right = has_element_at_heights(right_lane, CROSSING_HEIGHTS)
 
         if not left_lane and not right_lane:
             return calculated_speed, calculated_steering
 
-        if filtered_left_lane and not filtered_right_lane and len(filtered_left_lane)>=2:
+        if filtered_left_count and not filtered_right_count and filtered_left_count >= 2:
             return calculated_speed, full_left
 
-        if filtered_right_lane and not filtered_left_lane and len(filtered_right_lane)>=2:
+        if filtered_right_count and not filtered_left_count and filtered_right_count >= 2:
             return calculated_speed, full_right
 
         lane_distance = ((HEIGHT - lane_distance) * 100) // HEIGHT
@@ -230,18 +313,23 @@ class StraightAwareCenterLaneDriver:
         global CROSSING_DETECTED
         deviations = []
         for height in CHECK_HEIGHTS:
-            deviation = find_deviation_at_height(left_lane, right_lane, height)
+            deviation = find_deviation_at_height(left_lane, right_lane, height, self.deviation_function)
             if deviation is not None:
                 deviations.append((height, deviation))
             else:
                 if height == 70 and not CROSSING_DETECTED and lane_distance > 40: # Crossing detected
                     CROSSING_DETECTED = True
                     self.crossing_count = 0
+        self.crossing_state = CROSSING_DETECTED
 
         if CROSSING_DETECTED:
-            deviation = find_deviation_at_height(left_lane, right_lane, 50)
+            deviation = find_deviation_at_height(left_lane, right_lane, 50, self.deviation_function)
             if deviation is None:
                 calculated_steering = 50
+            elif self.fixed_point:
+                deviation = adjust_deviation_fixed(deviation, self.steering_thresholds_fixed)
+                # 50 - deviation * 0.5 * 50, the floor division truncates like int() for the positive values
+                calculated_steering = max(0, (50 * DEVIATION_SCALE - deviation * 25) // DEVIATION_SCALE)
             else:
                 deviation = adjust_deviation(deviation, self.steering_thresholds)
                 deviation = deviation * 0.5
@@ -276,7 +364,36 @@ class StraightAwareCenterLaneDriver:
 
         return calculated_speed, calculated_steering
 
+    def is_steady(self):
+        """
+        Returns True if the same lanes would give the same speed and steering again, i.e. the crossing state did
+        not change after the last steering was calculated.
+        """
+        return self.crossing_state is None or self.crossing_state == CROSSING_DETECTED
+
+    def skip_frame(self):
+        """
+        Called instead of get_movement_params() if the last speed and steering are reused for identical lanes.
+        Advances the crossing counter like get_movement_params() would.
+
+        Returns:
+            bool: True if the crossing ended, so the next frame has to be calculated again
+        """
+        global CROSSING_DETECTED
+        if self.crossing_state is None: # The same lanes return before the crossing is handled
+            return False
+        self.crossing_count += 1
+        if self.crossing_count > self.crossing_duration and CROSSING_DETECTED:
+            CROSSING_DETECTED = False
+            return True
+        return False
+
     def calculate_steering(self, deviations):
+        if self.fixed_point:
+            return self.calculate_steering_fixed(deviations)
+        return self.calculate_steering_float(deviations)
+
+    def calculate_steering_float(self, deviations):
         weight_sum = 0
         total_deviation = 0
         for height, deviation in deviations:
@@ -288,7 +405,7 @@ class StraightAwareCenterLaneDriver:
         if weight_sum < 0.5:
             if len(deviations) >= 2:
                 deviations = interpolate_deviations(deviations)
-                self.calculate_steering(deviations)
+                self.calculate_steering_float(deviations)
             #print(weight_sum)
         if weight_sum == 0:
             return 50
@@ -296,6 +413,34 @@ class StraightAwareCenterLaneDriver:
         steering = int(50 - total_deviation * 50)
         return min(100, max(0, steering))
 
+    def calculate_steering_fixed(self, deviations):
+        """
+        Fixed-point version of calculate_steering(). The interpolation for a small weight sum is left out,
+        its result is not used by calculate_steering_float() either.
+
+        The deviations and their adjustment are exact, so the result is the float result truncated like int().
+        Only if the exact result is a whole number, the float path can end up just below it (e.g. 19.999999999999996)
+        and truncate to the number below. These frames are calculated with the float path, so the steering (and
+        the speed that depends on it) is always the same.
+        """
+        weight_sum = 0
+        total_deviation = 0
+        for height, deviation in deviations:
+            deviation = adjust_deviation_fixed(deviation, self.steering_thresholds_fixed)
+            _, weight = find_closest_in_range(self.steering_weights_fixed, height, height - 10, height + 10)
+            weight_sum += weight
+            total_deviation += deviation * weight
+        if weight_sum == 0:
+            return 50
+        # 50 - total_deviation / weight_sum * 50, the weight scale cancels out
+        steering, remainder = divmod(50 * DEVIATION_SCALE * weight_sum - total_deviation * 50,
+                                     DEVIATION_SCALE * weight_sum)
+        if remainder == 0 and total_deviation != 0 and 0 < steering <= 100:
+            # The deviations of calculate_deviation_fixed() are the float deviations scaled exactly
+            return self.calculate_steering_float([(height, deviation / DEVIATION_SCALE)
+                                                  for height, deviation in deviations])
+        return min(100, max(0, steering))
+
     def calculate_speed(self, steering, lane_distance):
         speed = self.speeds[-1]  # Slow speed
         if abs(steering - 50) > 20:  # Steering value is big -> Drive slow
@@ -1,11 +1,31 @@
-from .StraightAwareCenterLaneDriver import StraightAwareCenterLaneDriver
+# Registry of the movement algorithms: name -> numeric id (part of the base name of the recordings).
+# Every algorithm is a class in a module of this package with the same name. The module is only imported when
+# an instance is created, see load_movement_params().
+MOVEMENT_PARAMS_IDS = {
+    "StraightAwareCenterLaneDriver": 4,
+    # You can register new algorithms here
+}
+LOADED_MOVEMENT_PARAMS_MODULES = {} # name -> imported module
 
-def get_movement_params_instance(instance, driving_mode):
+
+def load_movement_params(name):
+    """
+    Returns the class of a movement algorithm of this package and imports its module on first use.
+    """
+    module = LOADED_MOVEMENT_PARAMS_MODULES.get(name)
+    if module is None:
+        module = __import__(__name__ + "." + name, None, None, (name,))
+        LOADED_MOVEMENT_PARAMS_MODULES[name] = module
+    return getattr(module, name)
+
+
+def get_movement_params_instance(instance, driving_mode, fixed_point=False):
     """
     Retrieve an instance of a movement parameters class based on the given
     instance name. This function serves as a factory method to dynamically
     create objects of different classes that represent movement parameters.
-    New instances can be added by extending the conditional checks.
+    Every name registered in MOVEMENT_PARAMS_IDS can be created, the module of
+    the class is imported on first use.
 
     Parameters:
     instance : str
@@ -21,11 +41,9 @@ def get_movement_params_instance(instance, driving_mode):
     ValueError
         If the 'instance' parameter does not match any known class name.
     """
-    if instance == 'StraightAwareCenterLaneDriver':
-        return StraightAwareCenterLaneDriver(driving_mode)
-    # You can implement new instances here
-    else:
+    if instance not in MOVEMENT_PARAMS_IDS:
         raise ValueError("Unknown process function specified.")
+    return load_movement_params(instance)(driving_mode, fixed_point)
 
 
 def get_movement_params_id(instance_name):
@@ -33,8 +51,8 @@ def get_movement_params_id(instance_name):
         Retrieves the movement parameter ID corresponding to a given instance name.
 
         This function maps specific movement algorithms (represented by their instance names)
-        to unique numeric IDs. If the provided instance name does not match any predefined
-        algorithm, the function returns a default value of -1.
+        to unique numeric IDs (see MOVEMENT_PARAMS_IDS). If the provided instance name does not match any
+        registered algorithm, the function returns a default value of -1.
 
         Parameters:
             instance_name (str): The name of the movement algorithm instance to retrieve the ID for.
@@ -42,7 +60,4 @@ def get_movement_params_id(instance_name):
         Returns:
             int: The numeric ID corresponding to the instance name, or -1 if the name is not found.
     """
-    movement_algorithm_id = {
-        "StraightAwareCenterLaneDriver": 4
-    }.get(instance_name, -1)  # Default to -1 if not found
-    return movement_algorithm_id
\ No newline at end of file
+    return MOVEMENT_PARAMS_IDS.get(instance_name, -1)  # Default to -1 if not found
@@ -0,0 +1,287 @@
+import struct
+
+TELEMETRY_MAGIC = b"RTLM"
+TELEMETRY_VERSION = 1
+BLOCK_SIZE = 512 # Size of one sd card block. The header and every write have this size
+RECORD_SIZE = 64 # Size of one record. Must divide BLOCK_SIZE, unused bytes are reserved for new fields
+HEADER_FORMAT = "<4sBBHH" # Magic, version, number of heights, record size, description length
+LANE_MISSING = 255 # Value of a lane element that was not found
+
+# Live stream (e.g. USB VCP): Every block is sent as a frame: sync, type, payload length, payload, crc16 (over type,
+# length and payload). The header is repeated, so a recorder that connects later can start recording
+STREAM_SYNC = b"\xaaU" # 0xAA 0x55
+STREAM_FRAME_HEADER_FORMAT = "<2sBH" # Sync, type, payload length
+STREAM_FRAME_HEADER_SIZE = 5
+STREAM_CRC_SIZE = 2
+STREAM_TYPE_HEADER = 0 # Payload: The header block (BLOCK_SIZE)
+STREAM_TYPE_RECORD = 1 # Payload: One record (RECORD_SIZE)
+STREAM_HEADER_INTERVAL = 100 # The header is sent again after this many records
+CRC16_POLYNOMIAL = 0x1021 # CRC-16/CCITT-FALSE (initial value 0xFFFF)
+
+# Name and struct format of every value in a record. "lanes" is replaced by the number of heights
+TELEMETRY_FIELDS = [
+    ("frame", "I"), # Frame index, starts at 1. 0 marks an unused record
+    ("ticks", "I"), # time.ticks_ms() at the start of the frame
+    ("left_x", "lanes"), # x value of the left lane per height, LANE_MISSING if not found
+    ("right_x", "lanes"), # x value of the right lane per height, LANE_MISSING if not found
+    ("lane_distance", "B"),
+    ("speed", "B"),
+    ("steering", "B"),
+    ("finish_line", "B"), # 1 if the finish line was detected
+    ("capture_us", "I"), # Stage timings in microseconds. capture_us is the time the loop waited for the sensor
+    ("preprocess_us", "I"),
+    ("decision_us", "I"),
+    ("output_us", "I"),
+    ("compute_us", "I"), # Time from the end of the capture until the end of the frame
+    ("gc_us", "I"), # Duration of the scheduled garbage collection, 0 if it is disabled
+    ("mem_free", "I"), # Free heap in bytes after the garbage collection
+    ("skipped", "B"), # 1 if the frame was unchanged and the results of the last frame were reused (FrameSkipper)
+    ("skipped_permille", "H"), # Skipped frames per 1000 frames since the start
+    ("errors", "H"), # Exceptions in the main loop since the start (ErrorLog), at most 65535
+    ("error_kinds", "B"), # Number of different kinds (type and location) of these exceptions
+    ("record_dropped", "H"), # Frames the recorder dropped since the start because there was no time to write them
+]
+
+
+def get_telemetry_fields(height_count):
+    """
+    Returns the list of (name, struct format) for a record with height_count lane heights.
+    """
+    return [(name, "{}s".format(height_count) if code == "lanes" else code) for name, code in TELEMETRY_FIELDS]
+
+
+def get_record_format(fields):
+    """
+    Returns the struct format of a record.
+    """
+    return "<" + "".join([code for _, code in fields])
+
+
+def create_header(heights, fields):
+    """
+    Creates the first block of a telemetry file. It describes the record, so the reader does not depend on
+    the version of this file: "name:format,...;height,..."
+    """
+    description = "{};{}".format(",".join(["{}:{}".format(name, code) for name, code in fields]),
+                                 ",".join([str(height) for height in heights])).encode()
+    header = bytearray(BLOCK_SIZE)
+    struct.pack_into(HEADER_FORMAT, header, 0, TELEMETRY_MAGIC, TELEMETRY_VERSION, len(heights), RECORD_SIZE,
+                     len(description))
+    offset = struct.calcsize(HEADER_FORMAT)
+    if offset + len(description) > BLOCK_SIZE:
+        raise ValueError("Telemetry description does not fit into the header")
+    header[offset:offset + len(description)] = description
+    return header
+
+
+def create_crc16_table(polynomial):
+    table = []
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ polynomial) & 0xFFFF if crc & 0x8000 else (crc << 1) & 0xFFFF
+        table.append(crc)
+    return tuple(table)
+
+
+CRC16_TABLE = create_crc16_table(CRC16_POLYNOMIAL)
+
+
+def crc16(data, start, end):
+    """
+    Returns the CRC16 of data[start:end] without slicing the buffer.
+    """
+    crc = 0xFFFF
+    for i in range(start, end):
+        crc = ((crc << 8) & 0xFFFF) ^ CRC16_TABLE[(crc >> 8) ^ data[i]]
+    return crc
+
+
+def create_stream_frame(frame_type, payload_size):
+    """
+    Creates the buffer of a stream frame with the sync and header already set.
+    """
+    frame = bytearray(STREAM_FRAME_HEADER_SIZE + payload_size + STREAM_CRC_SIZE)
+    struct.pack_into(STREAM_FRAME_HEADER_FORMAT, frame, 0, STREAM_SYNC, frame_type, payload_size)
+    return frame
+
+
+def finish_stream_frame(frame):
+    """
+    Writes the crc16 of a stream frame whose payload is set.
+    """
+    end = len(frame) - STREAM_CRC_SIZE
+    struct.pack_into("<H", frame, end, crc16(frame, len(STREAM_SYNC), end))
+
+
+def decode_stream_frames(buffer):
+    """
+    Finds the valid frames in the received bytes. Bytes which do not belong to a valid frame (e.g. print output
+    on the same serial port or a corrupted frame) are skipped.
+
+    Returns:
+        tuple: ([(type, payload), ...], remaining bytes that may be the beginning of the next frame)
+    """
+    frames = []
+    start = 0
+    while True:
+        start = buffer.find(STREAM_SYNC, start)
+        if start < 0:
+            # Keep the last byte, it may be the first byte of the sync
+            return frames, buffer[-1:] if buffer[-1:] == STREAM_SYNC[:1] else buffer[:0]
+        if len(buffer) - start < STREAM_FRAME_HEADER_SIZE:
+            return frames, buffer[start:]
+        _, frame_type, length = struct.unpack_from(STREAM_FRAME_HEADER_FORMAT, buffer, start)
+        if length > BLOCK_SIZE:
+            start += 1
+            continue
+        end = start + STREAM_FRAME_HEADER_SIZE + length
+        if len(buffer) < end + STREAM_CRC_SIZE:
+            return frames, buffer[start:]
+        if struct.unpack_from("<H", buffer, end)[0] != crc16(buffer, start + len(STREAM_SYNC), end):
+            start += 1
+            continue
+        frames.append((frame_type, bytes(buffer[start + STREAM_FRAME_HEADER_SIZE:end])))
+        start = end + STREAM_CRC_SIZE
+
+
+def get_usb_vcp():
+    """
+    Returns the USB serial port of the camera (pyb.USB_VCP) or the raw stdout if pyb is not available.
+    """
+    try:
+        # noinspection PyUnresolvedReferences
+        import pyb
+        return pyb.USB_VCP()
+    except ImportError:
+        import sys
+        return sys.stdout.buffer
+
+
+class TelemetryStream:
+    """
+    Sends the telemetry records live, e.g. over the USB serial port of the camera (get_usb_vcp()).
+
+    Every record is copied into a preallocated frame with a length prefix and a crc16 (see STREAM_SYNC), so
+    sending does not allocate memory and the receiver can skip anything that is not a valid frame. The header
+    block is sent before the first record and again every STREAM_HEADER_INTERVAL records.
+    If the port has isconnected() (USB_VCP), nothing is sent while no host is connected.
+    Use Camera Simulator/telemetry_recorder.py to store the stream as a telemetry file on a PC.
+    """
+
+    def __init__(self, header, stream=None):
+        self.stream = stream if stream is not None else get_usb_vcp()
+        self.is_connected = getattr(self.stream, "isconnected", None)
+        self.header_frame = create_stream_frame(STREAM_TYPE_HEADER, BLOCK_SIZE)
+        self.header_frame[STREAM_FRAME_HEADER_SIZE:STREAM_FRAME_HEADER_SIZE + BLOCK_SIZE] = header
+        finish_stream_frame(self.header_frame)
+        self.record_frame = create_stream_frame(STREAM_TYPE_RECORD, RECORD_SIZE)
+        self.records_since_header = STREAM_HEADER_INTERVAL # The header is sent first
+        self.sent_records = 0
+        self.error_count = 0
+
+    def send(self, record):
+        """
+        Sends a record (TelemetryLog.record). The header is sent before it if it is due.
+        """
+        if self.is_connected is not None and not self.is_connected():
+            self.records_since_header = STREAM_HEADER_INTERVAL # A new host gets the header first
+            return
+        try:
+            if self.records_since_header >= STREAM_HEADER_INTERVAL:
+                self.stream.write(self.header_frame)
+                self.records_since_header = 0
+            self.record_frame[STREAM_FRAME_HEADER_SIZE:STREAM_FRAME_HEADER_SIZE + RECORD_SIZE] = record
+            finish_stream_frame(self.record_frame)
+            self.stream.write(self.record_frame)
+            self.records_since_header += 1
+            self.sent_records += 1
+        except OSError:
+            self.error_count += 1
+
+
+class TelemetryLog:
+    """
+    Writes one fixed size record per frame to a binary file.
+
+    The records are packed with struct into a preallocated buffer. The buffer is only written to the file
+    when it is full, so every write has the size of whole sd card blocks.
+    Without a filename nothing is written, the last record (self.record) can be stored somewhere else
+    (e.g. by the BlackBoxRecorder) together with self.header.
+    Use load_telemetry() from Camera Simulator/log_reader.py to read the file on a PC.
+    """
+
+    def __init__(self, filename, heights, blocks=1):
+        self.heights = heights # The heights (y values) at which lane elements are stored
+        self.height_index = {y: i for i, y in enumerate(heights)}
+        self.fields = get_telemetry_fields(len(heights))
+        self.record_format = get_record_format(self.fields)
+        if struct.calcsize(self.record_format) > RECORD_SIZE:
+            raise ValueError("Telemetry record is bigger than RECORD_SIZE")
+        self.header = create_header(heights, self.fields)
+
+        self.record = bytearray(RECORD_SIZE) # The last record
+        self.left_x = bytearray(len(heights))
+        self.right_x = bytearray(len(heights))
+        self.buffer = None
+        self.offset = 0
+        self.file = None
+
+        if filename is not None:
+            self.buffer = bytearray(BLOCK_SIZE * blocks)
+            self.file = open(filename, "wb")
+            self.file.write(self.header)
+
+    def set_lane(self, lane, lane_x):
+        """
+        Stores the x values of a lane at the position of their height.
+        """
+        for i in range(len(lane_x)):
+            lane_x[i] = LANE_MISSING
+        if lane:
+            for y, x in lane:
+                i = self.height_index.get(y)
+                if i is not None and 0 <= x < LANE_MISSING:
+                    lane_x[i] = x
+
+    def log(self, frame, ticks, left_lane, right_lane, lane_distance, speed, steering, finish_line,
+            capture_us, preprocess_us, decision_us, output_us, compute_us, gc_us, mem_free, skipped,
+            skipped_permille, errors, error_kinds, record_dropped):
+        """
+        Packs the record of a frame into self.record and adds it to the buffer.
+        Writes the buffer to the file if it is full.
+        """
+        self.set_lane(left_lane, self.left_x)
+        self.set_lane(right_lane, self.right_x)
+        struct.pack_into(self.record_format, self.record, 0,
+                         frame, ticks, self.left_x, self.right_x, lane_distance, speed, steering,
+                         1 if finish_line else 0, capture_us, preprocess_us, decision_us, output_us, compute_us,
+                         gc_us, mem_free, 1 if skipped else 0, skipped_permille, min(errors, 0xFFFF), error_kinds,
+                         min(record_dropped, 0xFFFF))
+        if self.file is None:
+            return
+        self.buffer[self.offset:self.offset + RECORD_SIZE] = self.record
+        self.offset += RECORD_SIZE
+        if self.offset >= len(self.buffer):
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffer to the file. A partly filled buffer is written as a whole, the unused records are
+        zero and will be ignored by the reader. The file is flushed after every block, so the records are on
+        the sd card if the camera loses power.
+        """
+        if self.offset == 0:
+            return
+        for i in range(self.offset, len(self.buffer)):
+            self.buffer[i] = 0
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.offset = 0
+
+    def close(self):
+        if self.file is None:
+            return
+        self.flush()
+        self.file.close()
+        self.file = None
@@ -3,15 +3,78 @@
 #include <Servo.h>
 using namespace std;
 
-uint32_t spiRx[10];
+// Frame of SPITeensy (Camera/OpenMV/communication_management/SPITeensy.py), one frame per SPI transaction:
+// sync, sequence, speed, steering, flags, crc8 (polynomial 0x07 over all bytes before it)
+const uint8_t FRAME_SYNC = 0xA5;
+const int FRAME_SIZE = 6;
+const uint8_t CRC8_POLYNOMIAL = 0x07;
+const uint8_t FLAG_FINISH_LINE = 0x01;
+const uint8_t FLAG_STOP = 0x02;
+
+uint8_t crc8Table[256];
+
+volatile uint8_t spiRx[FRAME_SIZE];
 volatile int spiRxIdx;
 volatile int spiRxComplete = 0;
 
+// Statistics of the received frames
+uint32_t validFrames = 0;
+uint32_t invalidFrames = 0; // Wrong length, sync byte or checksum
+uint32_t lostFrames = 0; // Gaps in the sequence numbers
+int lastSequence = -1;
+
 #include "SPISlave_T4.h"
 SPISlave_T4<&SPI, SPI_8_BITS> mySPI;
 
 
 
+void createCrc8Table() {
+  for (int i = 0; i < 256; i++) {
+    uint8_t crc = i;
+    for (int bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x80) ? (uint8_t)((crc << 1) ^ CRC8_POLYNOMIAL) : (uint8_t)(crc << 1);
+    }
+    crc8Table[i] = crc;
+  }
+}
+
+uint8_t crc8(const uint8_t *data, int length) {
+  uint8_t crc = 0;
+  for (int i = 0; i < length; i++) {
+    crc = crc8Table[crc ^ data[i]];
+  }
+  return crc;
+}
+
+// Called by the SPI interrupt for every transaction (CS low until CS high)
+void onSpiReceive() {
+  while (mySPI.active()) {
+    if (mySPI.available()) {
+      uint32_t value = mySPI.popr();
+      if (spiRxIdx < FRAME_SIZE) {
+        spiRx[spiRxIdx] = value;
+      }
+      spiRxIdx++; // Counts longer transactions as well, they are rejected
+    }
+  }
+  spiRxComplete = 1;
+}
+
+// Checks a received frame like decode_frame() of SPITeensy.py. Returns false if it has to be ignored
+bool decodeFrame(const uint8_t *frame, int length, int &sequence, int &speed, int &steering, uint8_t &flags) {
+  if (length != FRAME_SIZE || frame[0] != FRAME_SYNC) {
+    return false;
+  }
+  if (crc8(frame, FRAME_SIZE - 1) != frame[FRAME_SIZE - 1]) {
+    return false;
+  }
+  sequence = frame[1];
+  speed = frame[2];
+  steering = frame[3];
+  flags = frame[4];
+  return true;
+}
+
 void processCameraData(int speed, int angle) {
   // Dummy function
 }
@@ -20,28 +83,54 @@ void setup() {
   Serial.begin(115200);	//Baudrate does not matter (is USB VCP anyway)
   while ( ! Serial) {}
   Serial.println("START...");
+  createCrc8Table();
+  mySPI.onReceive(onSpiReceive);
   mySPI.begin();
   mySPI.swapPins(true);
 }
 
 void loop() {
-  int i;
+  int sequence = 0;
   int speed = 0;
   int steering = 0;
+  uint8_t flags = 0;
   if (spiRxComplete) {
-    //Serial.println(spiRxIdx);
-    for (i = 0; i < spiRxIdx; i++) {
-      //Serial.print(spiRx[i]); Serial.print(" ");
-      speed = spiRx[0];
-      steering = spiRx[1];
+    uint8_t frame[FRAME_SIZE];
+    int length;
+    noInterrupts(); // The next transaction must not change the frame while it is copied
+    length = spiRxIdx;
+    for (int i = 0; i < FRAME_SIZE; i++) {
+      frame[i] = spiRx[i];
+    }
+    spiRxComplete = 0;
+    spiRxIdx = 0;
+    interrupts();
+
+    if (!decodeFrame(frame, length, sequence, speed, steering, flags)) {
+      invalidFrames++;
+      return; // Keep the last valid values
+    }
+    int gap = (sequence - lastSequence) & 0xFF;
+    if (lastSequence >= 0 && gap > 1) {
+      lostFrames += gap - 1;
+    }
+    lastSequence = sequence;
+    validFrames++;
+
+    if (flags & FLAG_STOP) {
+      speed = 0;
     }
-  Serial.print("speed: ");
-  Serial.println(speed);
-  Serial.print("steering: ");
-  Serial.println(steering);
-  processCameraData(speed, steering);
-  spiRxComplete = 0;
-  spiRxIdx = 0;
-  //delay(1000);
+    Serial.print("speed: ");
+    Serial.print(speed);
+    Serial.print(" steering: ");
+    Serial.print(steering);
+    Serial.print(" valid: ");
+    Serial.print(validFrames);
+    Serial.print(" invalid: ");
+    Serial.print(invalidFrames);
+    Serial.print(" lost: ");
+    Serial.println(lostFrames);
+    processCameraData(speed, steering);
+    //delay(1000);
   }
 }
@@ -17,6 +17,8 @@ from libraries.movement_params import *
 from machine import LED
 # noinspection PyUnresolvedReferences
 from machine import SPI, Pin
+# noinspection PyUnresolvedReferences
+from libraries.communication_management.SPITeensy import encode_frame, FRAME_SIZE
 
 
 # region SPI configuration
@@ -39,6 +41,8 @@ clock = time.clock()
 
 speed = 0
 steering = 50
+sequence = 0
+frame = bytearray(FRAME_SIZE) # Frame of SPITeensy: sync, sequence, speed, steering, flags, crc8
 
 while True:
     # Change values (dummy code)
@@ -47,10 +51,11 @@ while True:
     if speed > 100: speed = 0
     if steering > 100: steering = 0
 
+    sequence = (sequence + 1) & 0xFF
+    encode_frame(frame, sequence, speed, steering, 0)
     try:
         cs(0)                           # Select the SPI slave (CS LOW)
-        spi.write(bytes([speed]))       # Send speed (50)
-        spi.write(bytes([steering]))    # Send steering (40)
+        spi.write(frame)                # Send the whole frame in one transaction
         print("Send speed: ", speed, " and steering: ", steering)
     finally:
         cs(1)
\ No newline at end of file